@@ -1,12 +1,15 @@
 import logging
 import json
-from typing import Any, List
+import os
+from typing import Any, Callable, List, Optional
 from enum import Enum
 
-from shared_volume.functions.retry_decorator import retry_on_exception
 from shared_volume.agents.utils.utils import call_llm, trim_response_keep_delimiters, remove_think_tags
 from shared_volume.agents.constants import ERROR_JSON_FORMAT, ERROR_NO_RESPONSE
 from shared_volume.agents.config import MAX_AGENT_RETRIES
+from shared_volume.agents.utils.llm_cache import get_llm_cache, llm_cache_key
+from shared_volume.agents.utils.retry_policy import ProviderGate, RetryPolicy
+from shared_volume.agents.utils.output_repair import extract_percentage, repair_json, repair_counters
 
 class AgentOutput(str, Enum):
     TEXT = "text"
@@ -14,7 +17,10 @@ class AgentOutput(str, Enum):
     PERCENTAGE = "percentage"
     JSON = "json"
 
-async def agent_template(system_prompt: str, user_prompt: str, output_type: AgentOutput, log: logging.Logger = None):
+async def agent_template(system_prompt: str, user_prompt: str, output_type: AgentOutput, log: logging.Logger = None, parse: Optional[Callable[[str], Any]] = None, cache: bool = False):
+    """Run one agent call. `parse` replaces the output type's validation of the response;
+    a ValueError from it is retried like any other invalid output. Only calls made with
+    `cache=True` (the evaluation judges) use the LLM response cache."""
     try:
         if not system_prompt or not user_prompt:
             raise ValueError("System prompt and user prompt are required")
@@ -22,7 +28,7 @@ async def agent_template(system_prompt: str, user_prompt: str, output_type: Agen
             raise ValueError("Output type is required")
 
         system_prompt = append_format_to_prompt(system_prompt, output_type)
-        return await execute_agent(system_prompt, user_prompt, output_type, log)
+        return await execute_agent(system_prompt, user_prompt, output_type, log, parse, cache)
 
     except ValueError as e:
         if log:
@@ -42,15 +48,44 @@ async def agent_template(system_prompt: str, user_prompt: str, output_type: Agen
             return 0
        
 
-@retry_on_exception(max_retries=MAX_AGENT_RETRIES, delay=1, backoff=1.2)
-async def execute_agent(system_prompt: str, user_prompt: str, output_type: AgentOutput, log: logging.Logger = None):
-
-    response = await call_llm(system_prompt, user_prompt)
+# One gate for every agent in the process: a throttled provider is backed off globally.
+provider_gate = ProviderGate(
+    rate=float(os.environ.get("LLM_RATE_LIMIT", "0")),
+    failure_threshold=int(os.environ.get("LLM_CIRCUIT_FAILURE_THRESHOLD", "5")),
+    cooldown=float(os.environ.get("LLM_CIRCUIT_COOLDOWN", "30")),
+)
+agent_retry_policy = RetryPolicy(
+    max_attempts=MAX_AGENT_RETRIES,
+    base_delay=float(os.environ.get("AGENT_RETRY_BASE_DELAY", "1")),
+    max_delay=float(os.environ.get("AGENT_RETRY_MAX_DELAY", "30")),
+    gate=provider_gate,
+)
+
+async def execute_agent(system_prompt: str, user_prompt: str, output_type: AgentOutput, log: logging.Logger = None, parse: Optional[Callable[[str], Any]] = None, use_cache: bool = False):
+    return await agent_retry_policy.run(lambda: execute_agent_attempt(system_prompt, user_prompt, output_type, log, parse, use_cache), log)
+
+async def execute_agent_attempt(system_prompt: str, user_prompt: str, output_type: AgentOutput, log: logging.Logger = None, parse: Optional[Callable[[str], Any]] = None, use_cache: bool = False):
+    cache = get_llm_cache() if use_cache else None
+    cache_key = llm_cache_key(system_prompt, user_prompt, output_type.value) if cache else None
+    if cache:
+        response = await cache.get_or_call(cache_key, lambda: call_llm(system_prompt, user_prompt))
+    else:
+        response = await call_llm(system_prompt, user_prompt)
     if not response:
         raise ValueError(ERROR_NO_RESPONSE)
 
-    response = remove_think_tags(response)
-
+    try:
+        response = remove_think_tags(response)
+        return parse(response) if parse else validate_output(response, output_type, log)
+    except ValueError:
+        # Neither strict validation nor local repair worked, this costs a full LLM retry.
+        repair_counters.record_retried(output_type.value)
+        # The raw response is cached before validation: drop it so the retry asks the LLM again.
+        if cache:
+            await cache.invalidate(cache_key)
+        raise
+
+def validate_output(response: str, output_type: AgentOutput, log: logging.Logger = None) -> Any:
     if output_type == AgentOutput.TEXT:
         return validate_text_output(response)
 
@@ -75,7 +110,14 @@ def validate_boolean_output(response: str) -> bool:
     raise ValueError(f"Invalid boolean response from LLM: {response}")
 
 def validate_percentage_output(response: str) -> int:
-    percentage = int(response.strip().replace("%", ""))
+    try:
+        percentage = int(response.strip().replace("%", ""))
+    except ValueError:
+        # Near misses like "Score: 85" or "85/100" are repaired locally instead of retried.
+        percentage = extract_percentage(response)
+        if percentage is None:
+            raise ValueError(f"Invalid percentage response from LLM: {response}")
+        repair_counters.record_repaired(AgentOutput.PERCENTAGE.value)
     if percentage < 0 or percentage > 100:
         raise ValueError(f"Invalid percentage response from LLM: {response}")
     return percentage
@@ -84,19 +126,49 @@ def validate_json_output(response: str, log: logging.Logger = None) -> List:
     json_output = trim_response_keep_delimiters(response, "[", "]")
     if not json_output:
         json_output = trim_response_keep_delimiters(response, "{", "}")
-    if not json_output:
-        raise ValueError(ERROR_JSON_FORMAT)
 
     try:
+        if not json_output:
+            raise ValueError(ERROR_JSON_FORMAT)
+        parsed = json.loads(json_output)
+    except (ValueError, json.JSONDecodeError) as e:
+        # Trailing commas, code fences or unbalanced brackets are repaired locally instead of retried.
+        parsed = repair_json(response)
+        if parsed is None:
+            if isinstance(e, json.JSONDecodeError):
+                raise ValueError(f"Failed to decode JSON: {e}") from e
+            raise
+        repair_counters.record_repaired(AgentOutput.JSON.value)
+        if log:
+            log.info("Repaired malformed JSON output from LLM")
+
+    if isinstance(parsed, list):
+        return parsed
+    return [parsed]
+
+def validate_json_object_output(response: str, log: logging.Logger = None) -> dict:
+    """Like validate_json_output, for prompts that ask for one JSON object: brackets inside
+    its string values (e.g. a citation "[1]") are never mistaken for the payload."""
+    json_output = trim_response_keep_delimiters(response, "{", "}")
+    try:
+        if not json_output:
+            raise ValueError(ERROR_JSON_FORMAT)
         parsed = json.loads(json_output)
-        if isinstance(parsed, list):
-            return parsed
-        elif isinstance(parsed, dict):
-            return [parsed]
-        else:
-            return [parsed]
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Failed to decode JSON: {e}") from e
+    except (ValueError, json.JSONDecodeError) as e:
+        parsed = repair_json(response)
+        if parsed is None:
+            if isinstance(e, json.JSONDecodeError):
+                raise ValueError(f"Failed to decode JSON: {e}") from e
+            raise
+        repair_counters.record_repaired(AgentOutput.JSON.value)
+        if log:
+            log.info("Repaired malformed JSON output from LLM")
+
+    if isinstance(parsed, list):
+        parsed = next((item for item in parsed if isinstance(item, dict)), None)
+    if not isinstance(parsed, dict):
+        raise ValueError(ERROR_JSON_FORMAT)
+    return parsed
 
 PERCENTAGE_FORMAT = """OUTPUT FORMAT:\nYour entire response must be *only* the number (e.g., "85"). Do not add any preamble, explanation, or the "%" symbol."""
 BOOLEAN_FORMAT = """OUTPUT FORMAT:\nYour response must be *only* "yes" or "no". Do not add any preamble, explanation, or additional text."""
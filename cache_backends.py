@@ -0,0 +1,181 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+
+class MemoryBackend:
+    """In-process LRU with optional TTL."""
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.ttl and time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while self.max_entries and len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # Async API used from the event loop; nothing here blocks, so these run inline.
+    async def aget(self, key: str) -> Optional[Any]:
+        return self.get(key)
+
+    async def aset(self, key: str, value: Any) -> None:
+        self.set(key, value)
+
+    async def adelete(self, key: str) -> None:
+        self.delete(key)
+
+
+class SqliteBackend:
+    """On-disk store shared across processes and restarts. Values are stored as JSON; evicts least recently used rows.
+
+    Hits only record their access time in memory; those are written in one batch with the next
+    set (or every TOUCH_BATCH hits). Eviction runs only once the row count exceeds max_entries and
+    then frees EVICTION_BATCH of the cap at once. The async methods run on one dedicated thread so
+    the event loop never waits on disk I/O.
+    """
+
+    TOUCH_BATCH = 256
+    EVICTION_BATCH = 0.1
+    PURGE_INTERVAL = 60.0
+
+    def __init__(self, path: str, table: str = "cache", max_entries: int = 100_000, ttl: Optional[float] = None):
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"sqlite-{table}")
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_used_at ON {table} (used_at)")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_stored_at ON {table} (stored_at)")
+        self._conn.commit()
+        self._touched: dict = {}
+        self._last_purge = time.time()
+        # Upper bound on the row count (replacing a key counts as an insert until the next recount).
+        self._rows = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(f"SELECT value, stored_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, stored_at = row
+            if self.ttl and now - stored_at > self.ttl:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                self._touched.pop(key, None)
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= self.TOUCH_BATCH:
+                self._write_touched()
+                self._conn.commit()
+        return json.loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, stored_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            self._touched.pop(key, None)
+            self._write_touched()
+            self._rows += 1
+            if self.ttl and now - self._last_purge > min(self.ttl, self.PURGE_INTERVAL):
+                self._last_purge = now
+                self._rows -= self._conn.execute(f"DELETE FROM {self.table} WHERE stored_at < ?", (now - self.ttl,)).rowcount
+            if self.max_entries and self._rows > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _write_touched(self) -> None:
+        if self._touched:
+            self._conn.executemany(
+                f"UPDATE {self.table} SET used_at = ? WHERE key = ?",
+                [(used_at, key) for key, used_at in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self) -> None:
+        self._rows = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        excess = self._rows - self.max_entries
+        if excess <= 0:
+            return
+        count = excess + max(1, int(self.max_entries * self.EVICTION_BATCH))
+        self._rows -= self._conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} ORDER BY used_at LIMIT ?)",
+            (count,),
+        ).rowcount
+
+    def flush(self) -> None:
+        """Write pending access times, e.g. before shutdown."""
+        with self._lock:
+            self._write_touched()
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._touched.pop(key, None)
+            self._rows -= self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,)).rowcount
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+            self._rows = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        return await self._run(self.get, key)
+
+    async def aset(self, key: str, value: Any) -> None:
+        await self._run(self.set, key, value)
+
+    async def adelete(self, key: str) -> None:
+        await self._run(self.delete, key)
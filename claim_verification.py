@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from shared_volume.agents.utils.agent_template import agent_template, AgentOutput, validate_json_object_output
+from shared_volume.agents.utils.rate_limit import AsyncRateLimiter
+from shared_volume.config import SERVICE_NAME
+
+log = logging.getLogger(SERVICE_NAME)
+
+CLAIM_MAX = int(os.environ.get("CLAIM_MAX", "12"))
+CLAIM_TOP_K = int(os.environ.get("CLAIM_TOP_K", "3"))
+CLAIM_CONCURRENCY = int(os.environ.get("CLAIM_CONCURRENCY", "6"))
+PASSAGE_WORDS = 120
+MIN_CLAIM_WORDS = 5
+
+TOKEN_RE = re.compile(r"\w{3,}", re.UNICODE)
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9À-Ý\"'(])")
+MARKDOWN_RE = re.compile(r"^\s*(?:#+|[-*+]|\d+[.)])\s*|[*_`>]+")
+VERDICT_WEIGHTS = {"ja": 1.0, "yes": 1.0, "deels": 0.5, "partial": 0.5, "nee": 0.0, "no": 0.0}
+VERDICT_LABELS = {1.0: "Ondersteund", 0.5: "Deels ondersteund", 0.0: "Niet ondersteund"}
+
+
+@dataclass(frozen=True)
+class Passage:
+    path: str
+    title: str
+    text: str
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def split_claims(answer: str, max_claims: int = CLAIM_MAX) -> List[str]:
+    """Split an answer into sentence-level claims, skipping headings and fragments."""
+    claims = []
+    for line in answer.splitlines():
+        line = MARKDOWN_RE.sub("", line).strip()
+        for sentence in SENTENCE_RE.split(line):
+            sentence = sentence.strip()
+            if len(sentence.split()) >= MIN_CLAIM_WORDS and not sentence.endswith(":"):
+                claims.append(sentence)
+    return claims[:max_claims]
+
+
+def split_passages(sources: Dict[str, List[Dict[str, Any]]], passage_words: int = PASSAGE_WORDS) -> List[Passage]:
+    """Cut every source into passages of roughly passage_words words."""
+    passages = []
+    for source_list in sources.values():
+        for source in source_list or []:
+            path, title = str(source.get("path") or ""), str(source.get("title") or "")
+            words: List[str] = []
+            for paragraph in re.split(r"\n\s*\n", source.get("content") or ""):
+                words.extend(paragraph.split())
+                while len(words) >= passage_words:
+                    passages.append(Passage(path, title, " ".join(words[:passage_words])))
+                    words = words[passage_words:]
+            if words:
+                passages.append(Passage(path, title, " ".join(words)))
+    return passages
+
+
+class PassageIndex:
+    """Small in-memory BM25 index over passages."""
+
+    def __init__(self, passages: List[Passage], k1: float = 1.5, b: float = 0.75):
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(tokenize(f"{p.title} {p.text}")) for p in passages]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        document_frequency: Counter = Counter()
+        for counts in self.term_counts:
+            document_frequency.update(counts.keys())
+        n = len(passages)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()}
+
+    def search(self, query: str, top_k: int = CLAIM_TOP_K) -> List[Passage]:
+        query_terms = set(tokenize(query))
+        scored = []
+        for index, counts in enumerate(self.term_counts):
+            score = 0.0
+            for term in query_terms:
+                tf = counts.get(term)
+                if not tf:
+                    continue
+                norm = 1 - self.b + self.b * self.lengths[index] / (self.avg_length or 1)
+                score += self.idf[term] * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+            if score > 0:
+                scored.append((score, index))
+        scored.sort(reverse=True)
+        return [self.passages[index] for _, index in scored[:top_k]]
+
+
+def parse_claim_prompt(question: str, claim: str, passages: List[Passage]) -> str:
+    passages_str = "".join(f"<source>{p.path}</source>Title: {p.title}\nPassage: {p.text}\n" for p in passages)
+    return f"Question: {question}\nClaim: {claim}\nPassages: {passages_str or 'Geen relevante passages gevonden.'}"
+
+
+async def eval_claim_agent(question: str, claim: str, passages: List[Passage], limiter: Optional[AsyncRateLimiter] = None) -> Dict[str, Any]:
+    if not passages:
+        # Nothing in the sources mentions the claim: no need to ask the judge.
+        return {"claim": claim, "weight": 0.0, "source": "", "explanation": "Geen bronpassage gevonden voor deze claim."}
+    if limiter:
+        await limiter.acquire()
+    # One JSON object: brackets in its values (a "[1]" citation in source) are not the payload.
+    judgement = await agent_template(
+        CLAIM_VERIFICATIE, parse_claim_prompt(question, claim, passages), AgentOutput.JSON, log,
+        parse=lambda response: validate_json_object_output(response, log), cache=True,
+    ) or {}
+    weight = VERDICT_WEIGHTS.get(str(judgement.get("verdict", "")).strip().lower())
+    if weight is None:
+        return {"claim": claim, "weight": None, "source": "", "explanation": "Geen geldig oordeel ontvangen."}
+    return {"claim": claim, "weight": weight, "source": str(judgement.get("source") or ""), "explanation": str(judgement.get("explanation") or "")}
+
+
+def summarize_claims(results: List[Dict[str, Any]]) -> str:
+    counts = Counter(VERDICT_LABELS[r["weight"]] for r in results)
+    lines = [f"**Claims gecontroleerd:** {len(results)} ({', '.join(f'{n}x {label.lower()}' for label, n in counts.items())})", ""]
+    for r in results:
+        source = f" (bron: {r['source']})" if r["source"] else ""
+        lines.append(f"- **{VERDICT_LABELS[r['weight']]}:** {r['claim']}{source} — {r['explanation']}")
+    return "\n".join(lines)
+
+
+async def eval_verification_claims_agent(answer: str, question: str, sources: dict, limiter: Optional[AsyncRateLimiter] = None) -> Optional[tuple]:
+    """Verify each claim against its top-k source passages in parallel.
+
+    Returns (verification text, verification score) like the fused judges, or None when
+    the answer has no checkable claims or no claim could be judged. When a limiter is
+    given every claim judge waits for it first.
+    """
+    claims = split_claims(answer)
+    if not claims:
+        return None
+    index = PassageIndex(split_passages(sources))
+    semaphore = asyncio.Semaphore(max(1, CLAIM_CONCURRENCY))
+
+    async def judge(claim: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await eval_claim_agent(question, claim, index.search(claim), limiter)
+
+    results = [r for r in await asyncio.gather(*[judge(claim) for claim in claims]) if r["weight"] is not None]
+    if not results:
+        return None
+    score = round(100 * sum(r["weight"] for r in results) / len(results))
+    return summarize_claims(results), score
+
+
+CLAIM_VERIFICATIE = """
+Je bent een strikte evaluator (LLM-as-judge) voor "verifieerbaarheid". Je krijgt één claim uit een antwoord en de meest relevante bronpassages.
+Beoordeel of de claim door de bronpassages wordt ondersteund.
+
+Oordeel:
+- "ja": de claim wordt volledig ondersteund door ten minste één passage.
+- "deels": de claim wordt slechts gedeeltelijk of vaag ondersteund.
+- "nee": geen enkele passage ondersteunt de claim, of een passage spreekt de claim tegen.
+
+Volg deze regels strikt:
+1. **Alleen passages:** Gebruik uitsluitend de bijgeleverde passages, geen eigen kennis.
+2. **Taal:** Gebruik dezelfde taal als de claim. Maximaal 250 characters toelichting.
+3. **JSON:** Antwoord uitsluitend met één JSON-object: {"verdict": "ja" | "deels" | "nee", "source": "<bron van de ondersteunende passage of leeg>", "explanation": "<toelichting>"}.
+"""
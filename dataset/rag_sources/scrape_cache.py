@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""Persistent, content-addressed scrape cache shared by the scraper scripts.
+
+Markdown is stored once per content hash under ``objects/``; a SQLite index maps each URL to
+its latest content hash, fetch time and the origin's ETag / Last-Modified.
+
+Rendering a page through the headless-browser scraper API is the expensive part, and the
+API cannot forward conditional headers. Revalidation therefore asks the *origin* directly
+with a conditional HEAD (If-None-Match / If-Modified-Since; a header-only GET when HEAD is
+rejected), so no page body is downloaded. Only pages that actually changed are re-rendered;
+an origin that sends neither validator cannot be revalidated and is re-rendered once stale.
+A page that is not cached yet is rendered straight away, then one HEAD records its validators.
+
+Policies:
+  max-age          reuse entries validated less than max_age ago and after the sources
+                   file's meta.checked_at; revalidate the rest (default)
+  only-if-changed  always revalidate, re-render only changed pages
+  force            always re-render
+
+CLI (used by scrape_sources_pilot_on_server.sh):
+  python3 scrape_cache.py fetch --url URL --out PATH [--policy ...] [--api-url ...]
+  python3 scrape_cache.py stats
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+DEFAULT_CACHE_DIR = os.environ.get("SCRAPE_CACHE_DIR", str(Path.home() / ".cache" / "theon_scrape"))
+DEFAULT_MAX_AGE_SECONDS = 7 * 24 * 3600
+POLICIES = ("max-age", "only-if-changed", "force")
+PROBE_TIMEOUT_SECONDS = 20.0
+USER_AGENT = "theon-scrape-cache/1.0"
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    url: str
+    content_hash: str
+    fetched_at: float
+    validated_at: float
+    etag: str | None
+    last_modified: str | None
+    chars: int
+
+
+@dataclass(frozen=True)
+class OriginProbe:
+    changed: bool | None  # None: could not tell (probe failed, or no validators to compare)
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def parse_checked_at(value: str | None) -> float | None:
+    """meta.checked_at ("YYYY-MM-DD" or ISO timestamp) as a unix timestamp."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _response_headers(url: str, method: str, headers: dict[str, str], timeout_seconds: float):
+    """Status and headers of a request; the body is never read."""
+    try:
+        with urlopen(Request(url, headers=headers, method=method), timeout=timeout_seconds) as response:
+            return response.status, response.headers
+    except HTTPError as exc:
+        return exc.code, exc.headers
+
+
+def probe_origin(url: str, entry: CacheEntry | None, *, timeout_seconds: float = PROBE_TIMEOUT_SECONDS) -> OriginProbe:
+    """Conditional HEAD against the origin to tell whether the page changed since entry.
+
+    Without an entry this only reads the current validators (changed is None).
+    """
+    headers = {"User-Agent": USER_AGENT}
+    if entry and entry.etag:
+        headers["If-None-Match"] = entry.etag
+    if entry and entry.last_modified:
+        headers["If-Modified-Since"] = entry.last_modified
+    try:
+        status, response_headers = _response_headers(url, "HEAD", headers, timeout_seconds)
+        if status >= 400:
+            # Some servers reject HEAD: the same conditional GET, closed before the body.
+            status, response_headers = _response_headers(url, "GET", headers, timeout_seconds)
+    except (URLError, TimeoutError, OSError):
+        return OriginProbe(changed=None)
+    if status >= 400 and status != 304:
+        return OriginProbe(changed=None)
+
+    etag = response_headers.get("ETag")
+    last_modified = response_headers.get("Last-Modified")
+    if status == 304:
+        return OriginProbe(
+            changed=False,
+            etag=etag or (entry.etag if entry else None),
+            last_modified=last_modified or (entry.last_modified if entry else None),
+        )
+
+    changed = None
+    # Servers that ignore conditional headers on HEAD still report the current validators.
+    if entry and entry.etag and etag:
+        changed = etag != entry.etag
+    elif entry and entry.last_modified and last_modified:
+        changed = last_modified != entry.last_modified
+    return OriginProbe(changed=changed, etag=etag, last_modified=last_modified)
+
+
+class ScrapeCache:
+    def __init__(self, cache_dir: str | Path = DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.objects_dir = self.cache_dir / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.cache_dir / "index.sqlite", check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT PRIMARY KEY, content_hash TEXT NOT NULL, fetched_at REAL NOT NULL,"
+            " validated_at REAL NOT NULL, etag TEXT, last_modified TEXT, chars INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _object_path(self, content_hash: str) -> Path:
+        return self.objects_dir / content_hash[:2] / f"{content_hash}.md"
+
+    def get(self, url: str) -> CacheEntry | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, content_hash, fetched_at, validated_at, etag, last_modified, chars"
+                " FROM pages WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        entry = CacheEntry(*row)
+        return entry if self._object_path(entry.content_hash).exists() else None
+
+    def read(self, entry: CacheEntry) -> str:
+        return self._object_path(entry.content_hash).read_text(encoding="utf-8")
+
+    def put(self, url: str, markdown: str, probe: OriginProbe | None = None) -> CacheEntry:
+        data = markdown.encode("utf-8")
+        content_hash = _sha256(data)
+        path = self._object_path(content_hash)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(data)
+            tmp_path.replace(path)
+        now = time.time()
+        entry = CacheEntry(
+            url=url,
+            content_hash=content_hash,
+            fetched_at=now,
+            validated_at=now,
+            etag=probe.etag if probe else None,
+            last_modified=probe.last_modified if probe else None,
+            chars=len(markdown),
+        )
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, content_hash, entry.fetched_at, entry.validated_at, entry.etag, entry.last_modified, entry.chars),
+            )
+            self._conn.commit()
+        return entry
+
+    def mark_validated(self, entry: CacheEntry, probe: OriginProbe) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET validated_at = ?, etag = ?, last_modified = ? WHERE url = ?",
+                (time.time(), probe.etag, probe.last_modified, entry.url),
+            )
+            self._conn.commit()
+
+    def is_fresh(self, entry: CacheEntry, *, max_age_seconds: float, not_before: float | None) -> bool:
+        if not_before is not None and entry.validated_at < not_before:
+            return False
+        return time.time() - entry.validated_at < max_age_seconds
+
+    def fetch(
+        self,
+        url: str,
+        scrape: Callable[[str], str],
+        *,
+        policy: str = "max-age",
+        max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS,
+        not_before: float | None = None,
+    ) -> tuple[str, str]:
+        """Markdown for url and how it was obtained: "fresh", "unchanged" or "scraped"."""
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown cache policy: {policy}")
+        entry = self.get(url)
+        if entry and policy == "max-age" and self.is_fresh(entry, max_age_seconds=max_age_seconds, not_before=not_before):
+            return self.read(entry), "fresh"
+
+        probe = None
+        if entry and policy != "force":
+            probe = probe_origin(url, entry)
+            if probe.changed is False:
+                self.mark_validated(entry, probe)
+                return self.read(entry), "unchanged"
+
+        markdown = scrape(url)
+        # A revalidation probe already carries the current validators; otherwise read them now.
+        self.put(url, markdown, probe or probe_origin(url, None))
+        return markdown, "scraped"
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            pages, chars = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(chars), 0) FROM pages").fetchone()
+            objects = self._conn.execute("SELECT COUNT(DISTINCT content_hash) FROM pages").fetchone()[0]
+        return {"pages": pages, "objects": objects, "chars": chars}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Persistent scrape cache.")
+    parser.add_argument("command", choices=["fetch", "stats"])
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help=f"Cache directory (default: {DEFAULT_CACHE_DIR}).")
+    parser.add_argument("--url", help="URL to fetch (fetch).")
+    parser.add_argument("--out", help="Write the markdown here (fetch).")
+    parser.add_argument("--policy", choices=POLICIES, default="max-age")
+    parser.add_argument("--max-age", type=int, default=DEFAULT_MAX_AGE_SECONDS, help="Seconds an entry stays fresh (max-age policy).")
+    parser.add_argument("--checked-at", default="", help="meta.checked_at of the sources file; older entries are revalidated.")
+    parser.add_argument("--api-url", default="http://localhost:9501/scrape_url_markdown")
+    parser.add_argument("--headless", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--use-proxies", action=argparse.BooleanOptionalAction, default=False)
+    parser.add_argument("--timeout-ms", type=int, default=45_000)
+    args = parser.parse_args()
+
+    cache = ScrapeCache(args.cache_dir)
+    if args.command == "stats":
+        stats = cache.stats()
+        print(f"{stats['pages']} pages, {stats['objects']} unique documents, {stats['chars']} chars in {args.cache_dir}")
+        return 0
+
+    if not args.url or not args.out:
+        parser.error("fetch needs --url and --out")
+
+    from scrape_sources_to_server import scrape_url_markdown
+
+    markdown, status = cache.fetch(
+        args.url,
+        lambda url: scrape_url_markdown(
+            args.api_url,
+            url=url,
+            headless=bool(args.headless),
+            use_proxies=bool(args.use_proxies),
+            timeout_ms=int(args.timeout_ms),
+        ),
+        policy=args.policy,
+        max_age_seconds=args.max_age,
+        not_before=parse_checked_at(args.checked_at),
+    )
+    out_path = Path(args.out)
+    tmp_path = out_path.with_suffix(out_path.suffix + ".tmp")
+    tmp_path.write_text(markdown, encoding="utf-8")
+    tmp_path.replace(out_path)
+    print(status)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
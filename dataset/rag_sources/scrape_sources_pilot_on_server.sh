@@ -8,14 +8,18 @@ set -euo pipefail
 #
 # Hard rule: skips any URL containing "/vraag-en-antwoord/".
 # Idempotent: skips URLs whose .md file already exists.
+# Cached: pages live in a persistent scrape cache (scrape_cache.py); a page is only re-rendered
+# when the origin reports it changed (conditional HEAD) or the cache policy says so.
 # Auto-splits: runs split_markdown_by_heading.py on each new .md file (disable with --no-split).
 #
-# Dependencies: bash, python3, jq, curl, (shasum OR sha256sum)
+# Dependencies: bash, python3 (+ PyYAML), jq, (shasum OR sha256sum)
 
 SCRIPT_DIR="$(cd -- "$(dirname -- "${BASH_SOURCE[0]}")" && pwd)"
 DEFAULT_INPUT_SCRIPT_DIR="$SCRIPT_DIR/sources_pilot.yaml"
 DEFAULT_INPUT_REPO_REL="govtech_hackathon/golden/rag_sources/sources_pilot.yaml"
 SPLITTER_SCRIPT="$SCRIPT_DIR/split_markdown_by_heading.py"
+CACHE_SCRIPT="$SCRIPT_DIR/scrape_cache.py"
+CATALOG_SCRIPT="$SCRIPT_DIR/source_catalog.py"
 
 INPUT="$DEFAULT_INPUT_SCRIPT_DIR"
 INPUT_WAS_SET="false"
@@ -37,7 +41,9 @@ YES="false"
 DO_SPLIT="true"
 FORCE="false"
 
-CACHE_DIR="/tmp/theon_scrape_cache_md"
+CACHE_DIR="${SCRAPE_CACHE_DIR:-$HOME/.cache/theon_scrape}"
+CACHE_POLICY="max-age"
+CACHE_MAX_AGE="604800"
 REMOTE_SSH_TARGET="${REMOTE_SSH_TARGET:-<user>@<server-ip>}"
 
 usage() {
@@ -64,10 +70,15 @@ Options:
   --yes                        Skip interactive confirmation
 
   --no-split                   Do not run the markdown splitter after scraping
-  --force                      Re-scrape even if .md file already exists
+  --force                      Re-scrape even if .md file already exists (bypasses the cache)
+
+  --cache-dir PATH             Persistent scrape cache (default $SCRAPE_CACHE_DIR or ~/.cache/theon_scrape)
+  --cache-policy POLICY        max-age | only-if-changed | force (default max-age)
+  --cache-max-age SECONDS      Freshness window for --cache-policy max-age (default 604800 = 7 days)
 
 Environment:
   REMOTE_SSH_TARGET            Used only for the missing-input scp hint (default: <user>@<server-ip>)
+  SCRAPE_CACHE_DIR             Default for --cache-dir
 
 Examples:
   # Scrape everything (skips already-downloaded, auto-splits)
@@ -78,6 +89,9 @@ Examples:
 
   # Re-scrape everything, skip splitting
   ./scrape_sources_pilot_on_server.sh --force --no-split
+
+  # After bumping meta.checked_at: rewrite all files, re-render only pages that changed
+  ./scrape_sources_pilot_on_server.sh --force --cache-policy only-if-changed --yes
 EOF
 }
 
@@ -119,6 +133,9 @@ while [[ $# -gt 0 ]]; do
     --yes) YES="true"; shift 1 ;;
     --no-split) DO_SPLIT="false"; shift 1 ;;
     --force) FORCE="true"; shift 1 ;;
+    --cache-dir) CACHE_DIR="$2"; shift 2 ;;
+    --cache-policy) CACHE_POLICY="$2"; shift 2 ;;
+    --cache-max-age) CACHE_MAX_AGE="$2"; shift 2 ;;
     -h|--help) usage; exit 0 ;;
     *)
       echo "Unknown arg: $1" >&2
@@ -130,7 +147,28 @@ done
 
 require_cmd python3
 require_cmd jq
-require_cmd curl
+
+case "$CACHE_POLICY" in
+  max-age|only-if-changed|force) ;;
+  *)
+    echo "Unknown --cache-policy: $CACHE_POLICY" >&2
+    exit 2
+    ;;
+esac
+
+# --force alone re-renders everything; combined with an explicit cache policy it only
+# rewrites the output files and lets the cache decide what to re-render.
+if [[ "$FORCE" == "true" && "$CACHE_POLICY" == "max-age" ]]; then
+  CACHE_POLICY="force"
+fi
+
+for helper in "$CACHE_SCRIPT" "$CATALOG_SCRIPT"; do
+  if [[ ! -f "$helper" ]]; then
+    echo "Helper script not found: $helper" >&2
+    echo "Place scrape_cache.py, scrape_sources_to_server.py and source_catalog.py next to this script." >&2
+    exit 1
+  fi
+done
 
 if [[ "$DO_SPLIT" == "true" && ! -f "$SPLITTER_SCRIPT" ]]; then
   echo "Splitter script not found: $SPLITTER_SCRIPT" >&2
@@ -153,112 +191,13 @@ if [[ ! -f "$INPUT" ]]; then
   exit 1
 fi
 
-# Export filters for the Python extractor.
-export INPUT_PATH="$INPUT"
-export DATASET_ID_FILTER="$DATASET_ID_FILTER"
-export QUESTION_KEY_FILTER="$QUESTION_KEY_FILTER"
-export ONLY_URL_FILTER="$ONLY_URL_FILTER"
-
-# Extract scrape jobs as JSON Lines: one record per (dataset_id, question_key, url)
-JOBS_JSONL="$(python3 - <<'PY'
-import json
-import os
-import re
-import sys
-
-input_path = os.environ.get("INPUT_PATH")
-if not input_path:
-    raise SystemExit("Missing INPUT_PATH env var")
-dataset_filter = os.environ.get("DATASET_ID_FILTER") or ""
-question_filter = os.environ.get("QUESTION_KEY_FILTER") or ""
-only_url_filter = os.environ.get("ONLY_URL_FILTER") or ""
-
-dataset_id_re = re.compile(r'^\s*-\s*dataset_id:\s*"([^"]+)"\s*$')
-question_key_re = re.compile(r'^\s*-\s*question_key:\s*"([^"]+)"\s*$')
-question_text_re = re.compile(r'^\s*question_text:\s*"([^"]+)"\s*$')
-
-url_re = re.compile(r'^\s*-\s*url:\s*"([^"]+)"\s*$')
-title_re = re.compile(r'^\s*title:\s*"([^"]+)"\s*$')
-publisher_re = re.compile(r'^\s*publisher:\s*"([^"]+)"\s*$')
-source_type_re = re.compile(r'^\s*source_type:\s*"([^"]+)"\s*$')
-
-current_dataset_id = None
-current_question_key = None
-current_question_text = None
-
-current_url = None
-current_title = None
-current_publisher = None
-current_source_type = None
-
-def flush_source():
-    global current_url, current_title, current_publisher, current_source_type
-    if current_dataset_id and current_question_key and current_question_text and current_url:
-        if dataset_filter and current_dataset_id != dataset_filter:
-            pass
-        elif question_filter and current_question_key != question_filter:
-            pass
-        elif only_url_filter and current_url != only_url_filter:
-            pass
-        else:
-            print(json.dumps({
-                "dataset_id": current_dataset_id,
-                "question_key": current_question_key,
-                "question_text": current_question_text,
-                "url": current_url,
-                "title": current_title,
-                "publisher": current_publisher,
-                "source_type": current_source_type,
-            }, ensure_ascii=False))
-    current_url = None
-    current_title = None
-    current_publisher = None
-    current_source_type = None
-
-with open(input_path, "r", encoding="utf-8") as f:
-    for line in f:
-        m = dataset_id_re.match(line)
-        if m:
-            flush_source()
-            current_dataset_id = m.group(1)
-            continue
-
-        m = question_key_re.match(line)
-        if m:
-            flush_source()
-            current_question_key = m.group(1)
-            current_question_text = None
-            continue
-
-        m = question_text_re.match(line)
-        if m:
-            current_question_text = m.group(1)
-            continue
-
-        m = url_re.match(line)
-        if m:
-            flush_source()
-            current_url = m.group(1)
-            continue
-
-        m = title_re.match(line)
-        if m and current_url is not None:
-            current_title = m.group(1)
-            continue
-
-        m = publisher_re.match(line)
-        if m and current_url is not None:
-            current_publisher = m.group(1)
-            continue
-
-        m = source_type_re.match(line)
-        if m and current_url is not None:
-            current_source_type = m.group(1)
-            continue
-
-flush_source()
-PY
-)"
+# Extract scrape jobs as JSON Lines: one record per (dataset_id, question_key, url).
+# source_catalog.py parses the YAML once and reuses its compiled cache on later runs.
+JOBS_JSONL="$(python3 "$CATALOG_SCRIPT" jobs "$INPUT" \
+  --dataset-id "$DATASET_ID_FILTER" \
+  --question-key "$QUESTION_KEY_FILTER" \
+  --only-url "$ONLY_URL_FILTER")"
+CHECKED_AT="$(python3 "$CATALOG_SCRIPT" checked-at "$INPUT")"
 
 if [[ -z "$JOBS_JSONL" ]]; then
   echo "No URLs matched your filters." >&2
@@ -277,7 +216,7 @@ echo "- Omgevingswet dir: $OMGEVINGSWET_DIR"
 echo "- VACs: $VAC_COUNT"
 echo "- URLs: $URL_COUNT (unique: $UNIQUE_URL_COUNT)"
 echo "- headless=$HEADLESS use_proxies=$USE_PROXIES timeout_ms=$TIMEOUT_MS"
-echo "- cache_dir=$CACHE_DIR"
+echo "- cache_dir=$CACHE_DIR policy=$CACHE_POLICY max_age=${CACHE_MAX_AGE}s checked_at=${CHECKED_AT:-n/a}"
 echo "- dry_run=$DRY_RUN force=$FORCE split=$DO_SPLIT"
 
 if [[ "$DRY_RUN" == "true" ]]; then
@@ -297,31 +236,24 @@ if [[ "$YES" != "true" ]]; then
   fi
 fi
 
-mkdir -p "$CACHE_DIR"
-
 scrape_one() {
   local url="$1"
   local out="$2"
-
-  # Derive stable name from URL (host + slug + hash)
-  local host path_ slug hash
-  host="${url#*://}"; host="${host%%/*}"
-  path_="${url#*://$host}"; path_="${path_#/}"; path_="${path_%/}"
-  slug="$(printf '%s' "${path_:-root}" | tr '/?&=:%' '_' | tr -cd '[:alnum:]_.-')"
-  hash="$(sha256_10 "$url")"
-
-  local tmp_out="${out}.tmp"
-
-  jq -n --arg url "$url" \
-    --argjson headless "$HEADLESS" \
-    --argjson use_proxies "$USE_PROXIES" \
-    --argjson timeout_ms "$TIMEOUT_MS" \
-    '{url:$url, headless:$headless, use_proxies:$use_proxies, timeout_ms:$timeout_ms}' \
-  | curl -sS -X POST "$SCRAPER_API_URL" -H 'Content-Type: application/json' -d @- \
-  | jq -r '.data' > "$tmp_out"
-
-  mv "$tmp_out" "$out"
-  echo "wrote $out"
+  local status
+
+  status="$(python3 "$CACHE_SCRIPT" fetch \
+    --cache-dir "$CACHE_DIR" \
+    --url "$url" \
+    --out "$out" \
+    --policy "$CACHE_POLICY" \
+    --max-age "$CACHE_MAX_AGE" \
+    --checked-at "$CHECKED_AT" \
+    --api-url "$SCRAPER_API_URL" \
+    --timeout-ms "$TIMEOUT_MS" \
+    "$([[ "$HEADLESS" == "true" ]] && echo --headless || echo --no-headless)" \
+    "$([[ "$USE_PROXIES" == "true" ]] && echo --use-proxies || echo --no-use-proxies)")"
+
+  echo "wrote $out ($status)"
 }
 
 SCRAPED_COUNT=0
@@ -379,14 +311,7 @@ while read -r job; do
     continue
   fi
 
-  cache_path="$CACHE_DIR/$out_file"
-  if [[ -f "$cache_path" && "$FORCE" != "true" ]]; then
-    cp -f "$cache_path" "$out_path"
-    echo "copied (cache) $out_path"
-  else
-    scrape_one "$url" "$out_path"
-    cp -f "$out_path" "$cache_path" || true
-  fi
+  scrape_one "$url" "$out_path"
   ((SCRAPED_COUNT++)) || true
 
   # Idempotent manifest: only append if URL not already present
@@ -411,4 +336,5 @@ done < <(printf '%s\n' "$JOBS_JSONL")
 
 echo ""
 echo "Done. Scraped: $SCRAPED_COUNT, Skipped (already exists): $SKIPPED_COUNT"
+python3 "$CACHE_SCRIPT" stats --cache-dir "$CACHE_DIR"
 
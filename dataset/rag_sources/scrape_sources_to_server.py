@@ -7,36 +7,23 @@ import json
 import os
 import re
 import shlex
+import shutil
 import subprocess
 import sys
+import tarfile
 import tempfile
 import time
-from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import replace
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 from urllib.error import HTTPError, URLError
 from urllib.parse import urlparse
 from urllib.request import Request, urlopen
 
-
-@dataclass(frozen=True)
-class SourceToScrape:
-    url: str
-    title: str | None
-    publisher: str | None
-    source_type: str | None
-
-
-@dataclass(frozen=True)
-class QuestionToScrape:
-    dataset_id: str
-    question_key: str
-    question_text: str
-    sources: list[SourceToScrape]
-
-
-def _read_text(path: Path) -> list[str]:
-    return path.read_text(encoding="utf-8").splitlines()
+from scrape_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_AGE_SECONDS, POLICIES, ScrapeCache, parse_checked_at
+from source_catalog import CatalogError, Question, Source, load_catalog
 
 
 def _slugify(value: str) -> str:
@@ -51,104 +38,6 @@ def _short_hash(value: str, *, length: int = 10) -> str:
     return digest[:length]
 
 
-def _extract_questions_from_yaml(lines: list[str]) -> list[QuestionToScrape]:
-    dataset_id_re = re.compile(r'^\s*-\s*dataset_id:\s*"([^"]+)"\s*$')
-    question_key_re = re.compile(r'^\s*-\s*question_key:\s*"([^"]+)"\s*$')
-    question_text_re = re.compile(r'^\s*question_text:\s*"([^"]+)"\s*$')
-
-    url_re = re.compile(r'^\s*-\s*url:\s*"([^"]+)"\s*$')
-    title_re = re.compile(r'^\s*title:\s*"([^"]+)"\s*$')
-    publisher_re = re.compile(r'^\s*publisher:\s*"([^"]+)"\s*$')
-    source_type_re = re.compile(r'^\s*source_type:\s*"([^"]+)"\s*$')
-
-    current_dataset_id: str | None = None
-    current_question_key: str | None = None
-    current_question_text: str | None = None
-    current_sources: list[SourceToScrape] = []
-
-    current_source_url: str | None = None
-    current_source_title: str | None = None
-    current_source_publisher: str | None = None
-    current_source_type: str | None = None
-
-    questions: list[QuestionToScrape] = []
-
-    def flush_source() -> None:
-        nonlocal current_source_url, current_source_title, current_source_publisher, current_source_type
-        if current_source_url is None:
-            return
-        current_sources.append(
-            SourceToScrape(
-                url=current_source_url,
-                title=current_source_title,
-                publisher=current_source_publisher,
-                source_type=current_source_type,
-            )
-        )
-        current_source_url = None
-        current_source_title = None
-        current_source_publisher = None
-        current_source_type = None
-
-    def flush_question() -> None:
-        nonlocal current_question_key, current_question_text, current_sources
-        flush_source()
-        if current_dataset_id and current_question_key and current_question_text:
-            questions.append(
-                QuestionToScrape(
-                    dataset_id=current_dataset_id,
-                    question_key=current_question_key,
-                    question_text=current_question_text,
-                    sources=current_sources,
-                )
-            )
-        current_question_key = None
-        current_question_text = None
-        current_sources = []
-
-    for line in lines:
-        dataset_match = dataset_id_re.match(line)
-        if dataset_match:
-            flush_question()
-            current_dataset_id = dataset_match.group(1)
-            continue
-
-        question_match = question_key_re.match(line)
-        if question_match:
-            flush_question()
-            current_question_key = question_match.group(1)
-            continue
-
-        question_text_match = question_text_re.match(line)
-        if question_text_match:
-            current_question_text = question_text_match.group(1)
-            continue
-
-        url_match = url_re.match(line)
-        if url_match:
-            flush_source()
-            current_source_url = url_match.group(1)
-            continue
-
-        title_match = title_re.match(line)
-        if title_match and current_source_url is not None:
-            current_source_title = title_match.group(1)
-            continue
-
-        publisher_match = publisher_re.match(line)
-        if publisher_match and current_source_url is not None:
-            current_source_publisher = publisher_match.group(1)
-            continue
-
-        source_type_match = source_type_re.match(line)
-        if source_type_match and current_source_url is not None:
-            current_source_type = source_type_match.group(1)
-            continue
-
-    flush_question()
-    return questions
-
-
 def _post_json(url: str, payload: dict[str, Any], *, timeout_seconds: float) -> dict[str, Any]:
     raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
     request = Request(
@@ -197,6 +86,65 @@ def scrape_url_markdown(
     return data
 
 
+def _host_of(url: str) -> str:
+    return urlparse(url).netloc or "unknown_host"
+
+
+def _scrape_unique_urls(
+    urls: list[str],
+    scrape: Callable[[str], str],
+    *,
+    concurrency: int,
+    per_host: int,
+) -> dict[str, str | Exception]:
+    """Scrape each URL once on a bounded pool, with at most per_host requests in flight per host.
+
+    URLs are only handed to the pool when their host has a free slot, so workers never sit
+    blocked on a busy host while other hosts are waiting. Returns markdown or the exception per URL.
+    """
+    pending_by_host: dict[str, deque[str]] = {}
+    for url in urls:
+        pending_by_host.setdefault(_host_of(url), deque()).append(url)
+
+    results: dict[str, str | Exception] = {}
+    in_flight: dict[Future, str] = {}
+    host_in_flight: dict[str, int] = {host: 0 for host in pending_by_host}
+    concurrency = max(1, concurrency)
+    per_host = max(1, per_host)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while pending_by_host or in_flight:
+            # Round-robin over hosts with a free slot until the pool is full.
+            submitted = True
+            while submitted and len(in_flight) < concurrency:
+                submitted = False
+                for host in list(pending_by_host):
+                    if len(in_flight) >= concurrency:
+                        break
+                    if host_in_flight[host] >= per_host:
+                        continue
+                    url = pending_by_host[host].popleft()
+                    if not pending_by_host[host]:
+                        del pending_by_host[host]
+                    in_flight[executor.submit(scrape, url)] = url
+                    host_in_flight[host] += 1
+                    submitted = True
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                url = in_flight.pop(future)
+                host_in_flight[_host_of(url)] -= 1
+                try:
+                    results[url] = future.result()
+                    status = f"ok ({len(results[url])} chars)"
+                except Exception as exc:  # noqa: BLE001 - recorded per URL and written as SCRAPE_ERROR
+                    results[url] = exc
+                    status = f"error: {exc}"
+                print(f"[{len(results)}/{len(urls)}] {url} {status}")
+
+    return results
+
+
 def _run_ssh(ssh_target: str, remote_command: str) -> None:
     subprocess.run(["ssh", ssh_target, remote_command], check=True)
 
@@ -214,6 +162,54 @@ def _scp_dir_to_remote_parent(ssh_target: str, local_dir: Path, remote_parent_di
     )
 
 
+TRANSFERS = ("tar", "rsync", "scp")
+
+
+def _receive_command(ssh_target: str | None, remote_command: str) -> list[str]:
+    # The same shell command runs remotely over one ssh connection, or locally for --local-target.
+    if ssh_target:
+        return ["ssh", ssh_target, remote_command]
+    return ["sh", "-c", remote_command]
+
+
+def _ship_tar_stream(staging_root: Path, ssh_target: str | None, base_dir: str) -> None:
+    """Stream staging_root as one tar archive into base_dir (single connection, no temp archive)."""
+    quoted = shlex.quote(base_dir)
+    command = _receive_command(ssh_target, f"mkdir -p {quoted} && tar -xf - -C {quoted}")
+    process = subprocess.Popen(command, stdin=subprocess.PIPE)
+    assert process.stdin is not None
+    try:
+        with tarfile.open(fileobj=process.stdin, mode="w|") as archive:
+            for child in sorted(staging_root.iterdir()):
+                archive.add(child, arcname=child.name)
+    finally:
+        process.stdin.close()
+        returncode = process.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, command)
+
+
+def _ship_rsync(staging_root: Path, ssh_target: str | None, base_dir: str) -> None:
+    """rsync staging_root into base_dir; unchanged files are not re-sent."""
+    if ssh_target:
+        _mkdir_remote(ssh_target, base_dir)
+        destination = f"{ssh_target}:{base_dir}/"
+    else:
+        Path(base_dir).mkdir(parents=True, exist_ok=True)
+        destination = f"{base_dir}/"
+    subprocess.run(["rsync", "-a", "--checksum", f"{staging_root}/", destination], check=True)
+
+
+def _ship_scp_per_question(staging_root: Path, ssh_target: str, base_dir: str) -> None:
+    """Legacy transfer: one scp -r (and one connection) per VAC folder."""
+    _mkdir_remote(ssh_target, base_dir)
+    for dataset_dir in sorted(p for p in staging_root.iterdir() if p.is_dir()):
+        remote_dataset_dir = f"{base_dir}/{dataset_dir.name}"
+        _mkdir_remote(ssh_target, remote_dataset_dir)
+        for question_dir in sorted(p for p in dataset_dir.iterdir() if p.is_dir()):
+            _scp_dir_to_remote_parent(ssh_target, question_dir, remote_dataset_dir)
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(
         description="Scrape URLs from sources_pilot.yaml via scraper API and store markdowns per VAC on a remote server.",
@@ -231,17 +227,59 @@ def main() -> int:
     parser.add_argument("--headless", action=argparse.BooleanOptionalAction, default=True)
     parser.add_argument("--use-proxies", action=argparse.BooleanOptionalAction, default=False)
     parser.add_argument("--timeout-ms", type=int, default=45_000)
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Unique URLs scraped in parallel (default: 4).",
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=2,
+        help="Max parallel scrapes per host (default: 2).",
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help=f"Persistent scrape cache directory (default: {DEFAULT_CACHE_DIR}).",
+    )
+    parser.add_argument(
+        "--cache-policy",
+        choices=POLICIES,
+        default="max-age",
+        help="max-age: reuse recent pages; only-if-changed: always revalidate; force: always re-scrape.",
+    )
+    parser.add_argument(
+        "--cache-max-age",
+        type=int,
+        default=DEFAULT_MAX_AGE_SECONDS,
+        help="Seconds a cached page stays fresh with --cache-policy max-age (default: 7 days).",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the scrape cache.")
 
     parser.add_argument(
         "--ssh-target",
-        required=True,
+        default="",
         help='SSH target for storing files, e.g. "user@myserver".',
     )
     parser.add_argument(
         "--remote-base-dir",
-        required=True,
+        default="",
         help="Remote base directory to store datasets under.",
     )
+    parser.add_argument(
+        "--local-target",
+        default="",
+        help="Write into this local directory instead of a remote server (same transfer path, no ssh).",
+    )
+    parser.add_argument(
+        "--transfer",
+        choices=TRANSFERS,
+        default="tar",
+        help="tar: one streamed archive over one connection (default); rsync: delta sync; scp: one scp per VAC folder.",
+    )
 
     parser.add_argument("--dataset-id", default="", help="Only scrape one dataset_id (e.g. bzk_pilot).")
     parser.add_argument("--question-key", default="", help="Only scrape one question_key (VAC UUID).")
@@ -285,11 +323,25 @@ def main() -> int:
         print("No mode selected. Defaulting to --dry-run.\n", file=sys.stderr)
         args.dry_run = True
 
+    if args.local_target and (args.ssh_target or args.remote_base_dir):
+        raise SystemExit("Use either --local-target or --ssh-target/--remote-base-dir, not both.")
+    if not args.local_target and not (args.ssh_target and args.remote_base_dir):
+        raise SystemExit("Pass --ssh-target and --remote-base-dir, or --local-target.")
+    if args.local_target and args.transfer == "scp":
+        raise SystemExit("--transfer scp needs --ssh-target.")
+    if args.transfer == "rsync" and shutil.which("rsync") is None:
+        raise SystemExit("rsync not found on PATH; use --transfer tar.")
+
     input_path = Path(args.input)
     if not input_path.exists():
         raise SystemExit(f"Input file not found: {input_path}")
 
-    questions = _extract_questions_from_yaml(_read_text(input_path))
+    try:
+        catalog = load_catalog(input_path)
+    except CatalogError as exc:
+        raise SystemExit(str(exc)) from exc
+    questions = [q for q in catalog.questions if q.question_text]
+    checked_at = catalog.checked_at
 
     # Filters
     if args.dataset_id:
@@ -299,15 +351,7 @@ def main() -> int:
         questions = [q for q in questions if q.question_key == args.question_key]
 
     if args.only_url:
-        questions = [
-            QuestionToScrape(
-                dataset_id=q.dataset_id,
-                question_key=q.question_key,
-                question_text=q.question_text,
-                sources=[s for s in q.sources if s.url == args.only_url],
-            )
-            for q in questions
-        ]
+        questions = [replace(q, sources=tuple(s for s in q.sources if s.url == args.only_url)) for q in questions]
         questions = [q for q in questions if q.sources]
 
     if args.max_questions and args.max_questions > 0:
@@ -317,7 +361,9 @@ def main() -> int:
         print("No matching questions found after filters.", file=sys.stderr)
         return 2
 
-    remote_base_dir = args.remote_base_dir.rstrip("/")
+    ssh_target = args.ssh_target or None
+    remote_base_dir = (args.local_target or args.remote_base_dir).rstrip("/") or "/"
+    destination = f"{ssh_target}:{remote_base_dir}" if ssh_target else remote_base_dir
     dataset_ids = sorted({q.dataset_id for q in questions})
 
     total_sources = sum(len(q.sources) for q in questions)
@@ -326,20 +372,29 @@ def main() -> int:
     print("Plan")
     print(f"- Input: {input_path}")
     print(f"- API: {args.api_url}")
-    print(f"- SSH target: {args.ssh_target}")
-    print(f"- Remote base dir: {remote_base_dir}")
+    if ssh_target:
+        print(f"- SSH target: {ssh_target}")
+        print(f"- Remote base dir: {remote_base_dir}")
+    else:
+        print(f"- Local target dir: {remote_base_dir}")
+    print(f"- Transfer: {args.transfer}")
     print(f"- Datasets: {', '.join(dataset_ids)}")
     print(f"- VAC folders: {len(questions)}")
     print(f"- Sources (total): {total_sources}")
     print(f"- Sources (unique URLs): {len(unique_urls)}")
     if args.max_urls:
         print(f"- Max URL scrapes: {args.max_urls}")
+    print(f"- Concurrency: {args.concurrency} ({args.per_host} per host)")
+    if args.no_cache:
+        print("- Cache: disabled")
+    else:
+        print(f"- Cache: {args.cache_dir} (policy {args.cache_policy}, sources checked_at {checked_at or 'n/a'})")
     if args.dry_run:
         print("- Mode: DRY RUN (no scraping, no remote writes)")
     else:
         print("- Mode: EXECUTE (scrape + upload)")
 
-    print("\nRemote layout (per VAC)")
+    print("\nTarget layout (per VAC)")
     example = questions[0]
     print(f"- {remote_base_dir}/{example.dataset_id}/{example.question_key}/")
 
@@ -347,29 +402,64 @@ def main() -> int:
         return 0
 
     if not args.yes:
-        print("\nAbout to create/update directories on the remote server.")
-        print(f"Remote base dir: {args.ssh_target}:{remote_base_dir}")
+        print("\nAbout to create/update directories on the target.")
+        print(f"Base dir: {destination}")
         confirmation = input('Type \"yes\" to proceed: ').strip().lower()
         if confirmation != "yes":
             print("Aborted.")
             return 3
 
-    # Create remote base + dataset dirs
-    _mkdir_remote(args.ssh_target, remote_base_dir)
-    for ds in dataset_ids:
-        _mkdir_remote(args.ssh_target, f"{remote_base_dir}/{ds}")
-
-    scraped_cache: dict[str, str] = {}
+    # Decide which (question, source) slots are processed, honouring --max-urls, then scrape
+    # every unique URL among them once, concurrently, and fan the results out per question.
+    planned: list[tuple[Question, tuple[Source, ...]]] = []
     scraped_count = 0
+    for q in questions:
+        if args.max_urls and scraped_count >= args.max_urls:
+            break
+        sources = q.sources[: args.max_urls - scraped_count] if args.max_urls else q.sources
+        planned.append((q, sources))
+        scraped_count += len(sources)
+
+    urls_to_scrape = list(dict.fromkeys(s.url for _, sources in planned for s in sources))
+    print(f"\nScraping {len(urls_to_scrape)} unique URLs...")
+
+    def scrape(url: str) -> str:
+        return scrape_url_markdown(
+            args.api_url,
+            url=url,
+            headless=bool(args.headless),
+            use_proxies=bool(args.use_proxies),
+            timeout_ms=int(args.timeout_ms),
+        )
+
+    cache = None if args.no_cache else ScrapeCache(args.cache_dir)
+    cache_status: dict[str, str] = {}
+
+    def scrape_cached(url: str) -> str:
+        markdown, cache_status[url] = cache.fetch(
+            url,
+            scrape,
+            policy=args.cache_policy,
+            max_age_seconds=args.cache_max_age,
+            not_before=parse_checked_at(checked_at),
+        )
+        return markdown
+
+    scraped = _scrape_unique_urls(
+        urls_to_scrape,
+        scrape if cache is None else scrape_cached,
+        concurrency=args.concurrency,
+        per_host=args.per_host,
+    )
+    if cache_status:
+        counts = {status: list(cache_status.values()).count(status) for status in ("fresh", "unchanged", "scraped")}
+        print(f"Cache: {counts['fresh']} fresh, {counts['unchanged']} unchanged at origin, {counts['scraped']} (re-)rendered")
 
     with tempfile.TemporaryDirectory(prefix="theon_rag_scrapes_") as tmpdir:
         staging_root = Path(tmpdir) / "rag_scrapes"
         staging_root.mkdir(parents=True, exist_ok=True)
 
-        for q in questions:
-            if args.max_urls and scraped_count >= args.max_urls:
-                break
-
+        for q, sources in planned:
             local_question_dir = staging_root / q.dataset_id / q.question_key
             local_question_dir.mkdir(parents=True, exist_ok=True)
             local_sources_dir = local_question_dir / "sources"
@@ -384,10 +474,7 @@ def main() -> int:
                 "sources": [],
             }
 
-            for idx, source in enumerate(q.sources, start=1):
-                if args.max_urls and scraped_count >= args.max_urls:
-                    break
-
+            for idx, source in enumerate(sources, start=1):
                 parsed = urlparse(source.url)
                 host = parsed.netloc or "unknown_host"
                 url_slug = _slugify(f"{host}{parsed.path}")
@@ -400,34 +487,24 @@ def main() -> int:
                     "title": source.title,
                     "publisher": source.publisher,
                     "source_type": source.source_type,
+                    "why_relevant": source.why_relevant,
+                    "scrape_notes": source.scrape_notes,
                     "file": f"sources/{filename}",
                     "status": "pending",
                 }
 
-                try:
-                    if source.url in scraped_cache:
-                        markdown = scraped_cache[source.url]
-                    else:
-                        markdown = scrape_url_markdown(
-                            args.api_url,
-                            url=source.url,
-                            headless=bool(args.headless),
-                            use_proxies=bool(args.use_proxies),
-                            timeout_ms=int(args.timeout_ms),
-                        )
-                        scraped_cache[source.url] = markdown
-
-                    out_path.write_text(markdown, encoding="utf-8")
-                    entry["status"] = "success"
-                    entry["chars"] = len(markdown)
-                    scraped_count += 1
-
-                except Exception as exc:  # noqa: BLE001 - CLI tool: record and continue
+                result = scraped[source.url]
+                if isinstance(result, Exception):
                     entry["status"] = "error"
-                    entry["error"] = str(exc)
+                    entry["error"] = str(result)
                     # Still write a file for traceability.
-                    out_path.write_text(f"SCRAPE_ERROR\n\nURL: {source.url}\n\n{exc}\n", encoding="utf-8")
-                    scraped_count += 1
+                    out_path.write_text(f"SCRAPE_ERROR\n\nURL: {source.url}\n\n{result}\n", encoding="utf-8")
+                else:
+                    out_path.write_text(result, encoding="utf-8")
+                    entry["status"] = "success"
+                    entry["chars"] = len(result)
+                    if source.url in cache_status:
+                        entry["cache"] = cache_status[source.url]
 
                 manifest["sources"].append(entry)
 
@@ -436,10 +513,18 @@ def main() -> int:
                 encoding="utf-8",
             )
 
-            remote_dataset_dir = f"{remote_base_dir}/{q.dataset_id}"
-            _scp_dir_to_remote_parent(args.ssh_target, local_question_dir, remote_dataset_dir)
-
-    print(f"\nDone. Uploaded {min(scraped_count, total_sources)} source files to {args.ssh_target}:{remote_base_dir}")
+        # Ship everything at once: per-folder scp costs one connection setup per VAC.
+        print(f"\nTransferring {len(planned)} VAC folders to {destination} ({args.transfer})...")
+        started = time.time()
+        if args.transfer == "tar":
+            _ship_tar_stream(staging_root, ssh_target, remote_base_dir)
+        elif args.transfer == "rsync":
+            _ship_rsync(staging_root, ssh_target, remote_base_dir)
+        else:
+            _ship_scp_per_question(staging_root, args.ssh_target, remote_base_dir)
+        print(f"Transfer took {time.time() - started:.1f}s")
+
+    print(f"\nDone. Uploaded {min(scraped_count, total_sources)} source files to {destination}")
     return 0
 
 
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""Typed, cached view of a RAG source catalog (sources_pilot.yaml and friends).
+
+The YAML is parsed once with a real YAML parser (PyYAML) into frozen dataclasses; every
+field is kept, unknown keys included (``extra``). The parsed catalog is also written as a
+compiled JSON cache next to the YAML (``.<name>.catalog.json``), keyed by the YAML's mtime
+and size, so the scraper, the server shell script and validate_sources.py start instantly
+and all read the same data.
+
+CLI (used by scrape_sources_pilot_on_server.sh):
+  python3 source_catalog.py jobs PATH [--dataset-id ID] [--question-key KEY] [--only-url URL]
+  python3 source_catalog.py checked-at PATH
+  python3 source_catalog.py compile PATH...
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from dataclasses import asdict, dataclass, field
+from functools import cached_property
+from pathlib import Path
+from typing import Any
+
+CACHE_FORMAT_VERSION = 1
+
+
+class CatalogError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Source:
+    url: str
+    title: str | None = None
+    publisher: str | None = None
+    source_type: str | None = None
+    why_relevant: str | None = None
+    scrape_notes: str | None = None
+    extra: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class Question:
+    dataset_id: str
+    question_key: str
+    question_text: str | None
+    sources: tuple[Source, ...] = ()
+    extra: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class Dataset:
+    dataset_id: str
+    dataset_name: str | None = None
+    source_document: str | None = None
+    questions: tuple[Question, ...] = ()
+    extra: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class SourceCatalog:
+    path: str
+    checked_at: str | None
+    url_exclusions: tuple[str, ...]
+    notes: tuple[str, ...]
+    datasets: tuple[Dataset, ...]
+    meta: dict[str, Any] = field(default_factory=dict)
+
+    @cached_property
+    def questions(self) -> tuple[Question, ...]:
+        return tuple(q for ds in self.datasets for q in ds.questions)
+
+    @cached_property
+    def urls(self) -> tuple[str, ...]:
+        """Every source URL in catalog order, duplicates included."""
+        return tuple(s.url for q in self.questions for s in q.sources)
+
+    @cached_property
+    def questions_by_url(self) -> dict[str, tuple[Question, ...]]:
+        index: dict[str, list[Question]] = {}
+        for q in self.questions:
+            for url in dict.fromkeys(s.url for s in q.sources):
+                index.setdefault(url, []).append(q)
+        return {url: tuple(qs) for url, qs in index.items()}
+
+    @cached_property
+    def sources_by_question(self) -> dict[str, tuple[Source, ...]]:
+        """question_key -> sources; a key listed twice keeps its first occurrence."""
+        index: dict[str, tuple[Source, ...]] = {}
+        for q in self.questions:
+            index.setdefault(q.question_key, q.sources)
+        return index
+
+
+_SOURCE_FIELDS = ("url", "title", "publisher", "source_type", "why_relevant", "scrape_notes")
+_QUESTION_FIELDS = ("question_key", "question_text", "sources")
+_DATASET_FIELDS = ("dataset_id", "dataset_name", "source_document", "items")
+
+
+def _text(value: Any) -> str | None:
+    # Unquoted YAML scalars can come back as dates/numbers; the catalog treats them as text.
+    if value is None:
+        return None
+    return value.strip() if isinstance(value, str) else str(value)
+
+
+def _mapping(value: Any, where: str) -> dict[str, Any]:
+    if not isinstance(value, dict):
+        raise CatalogError(f"{where}: expected a mapping, got {type(value).__name__}")
+    return value
+
+
+def _sequence(value: Any, where: str) -> list[Any]:
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        raise CatalogError(f"{where}: expected a list, got {type(value).__name__}")
+    return value
+
+
+def _extra(data: dict[str, Any], known: tuple[str, ...]) -> dict[str, Any]:
+    # Round-trip through JSON so extras survive the compiled cache unchanged.
+    return json.loads(json.dumps({k: v for k, v in data.items() if k not in known}, default=str))
+
+
+def catalog_from_data(data: Any, path: str) -> SourceCatalog:
+    data = _mapping(data or {}, path)
+    meta = _mapping(data.get("meta") or {}, f"{path}: meta")
+
+    datasets: list[Dataset] = []
+    for ds_index, raw_ds in enumerate(_sequence(data.get("datasets"), f"{path}: datasets")):
+        ds_where = f"{path}: datasets[{ds_index}]"
+        raw_ds = _mapping(raw_ds, ds_where)
+        dataset_id = _text(raw_ds.get("dataset_id"))
+        if not dataset_id:
+            raise CatalogError(f"{ds_where}: missing dataset_id")
+
+        questions: list[Question] = []
+        for q_index, raw_q in enumerate(_sequence(raw_ds.get("items"), f"{ds_where}.items")):
+            q_where = f"{ds_where}.items[{q_index}]"
+            raw_q = _mapping(raw_q, q_where)
+            question_key = _text(raw_q.get("question_key"))
+            if not question_key:
+                raise CatalogError(f"{q_where}: missing question_key")
+
+            sources: list[Source] = []
+            for s_index, raw_s in enumerate(_sequence(raw_q.get("sources"), f"{q_where}.sources")):
+                s_where = f"{q_where}.sources[{s_index}]"
+                raw_s = _mapping(raw_s, s_where)
+                url = _text(raw_s.get("url"))
+                if not url:
+                    raise CatalogError(f"{s_where}: missing url")
+                sources.append(
+                    Source(
+                        url=url,
+                        title=_text(raw_s.get("title")),
+                        publisher=_text(raw_s.get("publisher")),
+                        source_type=_text(raw_s.get("source_type")),
+                        why_relevant=_text(raw_s.get("why_relevant")),
+                        scrape_notes=_text(raw_s.get("scrape_notes")),
+                        extra=_extra(raw_s, _SOURCE_FIELDS),
+                    )
+                )
+
+            questions.append(
+                Question(
+                    dataset_id=dataset_id,
+                    question_key=question_key,
+                    question_text=_text(raw_q.get("question_text")),
+                    sources=tuple(sources),
+                    extra=_extra(raw_q, _QUESTION_FIELDS),
+                )
+            )
+
+        datasets.append(
+            Dataset(
+                dataset_id=dataset_id,
+                dataset_name=_text(raw_ds.get("dataset_name")),
+                source_document=_text(raw_ds.get("source_document")),
+                questions=tuple(questions),
+                extra=_extra(raw_ds, _DATASET_FIELDS),
+            )
+        )
+
+    return SourceCatalog(
+        path=path,
+        checked_at=_text(meta.get("checked_at")),
+        url_exclusions=tuple(_text(v) or "" for v in _sequence(meta.get("url_exclusions"), f"{path}: meta.url_exclusions")),
+        notes=tuple(_text(v) or "" for v in _sequence(meta.get("notes"), f"{path}: meta.notes")),
+        datasets=tuple(datasets),
+        meta=_extra(meta, ()),
+    )
+
+
+def parse_catalog(text: str, path: str = "<string>") -> SourceCatalog:
+    try:
+        import yaml
+    except ImportError as exc:
+        raise CatalogError("PyYAML is required to parse source catalogs: pip install pyyaml") from exc
+    try:
+        data = yaml.safe_load(text)
+    except yaml.YAMLError as exc:
+        raise CatalogError(f"{path}: invalid YAML: {exc}") from exc
+    return catalog_from_data(data, path)
+
+
+def _catalog_to_json(catalog: SourceCatalog) -> dict[str, Any]:
+    return {
+        "path": catalog.path,
+        "checked_at": catalog.checked_at,
+        "url_exclusions": list(catalog.url_exclusions),
+        "notes": list(catalog.notes),
+        "meta": catalog.meta,
+        "datasets": [asdict(ds) for ds in catalog.datasets],
+    }
+
+
+def _question_from_json(data: dict[str, Any]) -> Question:
+    return Question(**{**data, "sources": tuple(Source(**s) for s in data["sources"])})
+
+
+def _dataset_from_json(data: dict[str, Any]) -> Dataset:
+    return Dataset(**{**data, "questions": tuple(_question_from_json(q) for q in data["questions"])})
+
+
+def _catalog_from_json(data: dict[str, Any]) -> SourceCatalog:
+    return SourceCatalog(
+        path=data["path"],
+        checked_at=data["checked_at"],
+        url_exclusions=tuple(data["url_exclusions"]),
+        notes=tuple(data["notes"]),
+        meta=data["meta"],
+        datasets=tuple(_dataset_from_json(ds) for ds in data["datasets"]),
+    )
+
+
+def cache_path_for(path: Path) -> Path:
+    return path.with_name(f".{path.name}.catalog.json")
+
+
+def _cache_key(path: Path) -> dict[str, int]:
+    stat = path.stat()
+    return {"version": CACHE_FORMAT_VERSION, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def load_catalog(path: str | Path, *, use_cache: bool = True) -> SourceCatalog:
+    """Parse path, or load its compiled cache when the YAML has not changed since."""
+    path = Path(path)
+    key = _cache_key(path)
+    cache_path = cache_path_for(path)
+
+    if use_cache:
+        try:
+            cached = json.loads(cache_path.read_text(encoding="utf-8"))
+            if cached.get("key") == key:
+                return _catalog_from_json({**cached["catalog"], "path": str(path)})
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    catalog = parse_catalog(path.read_text(encoding="utf-8"), str(path))
+    if use_cache:
+        payload = json.dumps({"key": key, "catalog": _catalog_to_json(catalog)}, ensure_ascii=False)
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            tmp_path.write_text(payload, encoding="utf-8")
+            tmp_path.replace(cache_path)
+        except OSError:
+            # Read-only checkout: parsing still works, just without the cache.
+            tmp_path.unlink(missing_ok=True)
+    return catalog
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Inspect and compile RAG source catalogs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    jobs = sub.add_parser("jobs", help="Print one JSON line per (dataset, question, source).")
+    jobs.add_argument("path")
+    jobs.add_argument("--dataset-id", default="", help="Only this dataset_id.")
+    jobs.add_argument("--question-key", default="", help="Only this question_key (VAC UUID).")
+    jobs.add_argument("--only-url", default="", help="Only this URL.")
+
+    checked_at = sub.add_parser("checked-at", help="Print meta.checked_at.")
+    checked_at.add_argument("path")
+
+    compile_ = sub.add_parser("compile", help="Parse and write the compiled cache.")
+    compile_.add_argument("paths", nargs="+")
+
+    args = parser.parse_args()
+    try:
+        if args.command == "compile":
+            for raw_path in args.paths:
+                cache_path_for(Path(raw_path)).unlink(missing_ok=True)
+                catalog = load_catalog(raw_path)
+                print(f"{raw_path}: {len(catalog.questions)} questions, {len(catalog.questions_by_url)} unique URLs")
+            return 0
+
+        catalog = load_catalog(args.path)
+    except (OSError, CatalogError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+
+    if args.command == "checked-at":
+        print(catalog.checked_at or "")
+        return 0
+
+    for q in catalog.questions:
+        if not q.question_text:
+            continue
+        if args.dataset_id and q.dataset_id != args.dataset_id:
+            continue
+        if args.question_key and q.question_key != args.question_key:
+            continue
+        for s in q.sources:
+            if args.only_url and s.url != args.only_url:
+                continue
+            print(json.dumps({
+                "dataset_id": q.dataset_id,
+                "question_key": q.question_key,
+                "question_text": q.question_text,
+                "url": s.url,
+                "title": s.title,
+                "publisher": s.publisher,
+                "source_type": s.source_type,
+            }, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
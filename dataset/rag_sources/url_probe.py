@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""Cheap, polite URL reachability probing for validate_sources.py.
+
+- HEAD first; when a server rejects HEAD (any 4xx/5xx) fall back to a GET for the first byte
+  (``Range: bytes=0-0``), so PDFs are never downloaded just to read a status code.
+- One keep-alive connection per lane; each host gets at most ``per_host`` lanes and at most
+  ``per_host_rate`` requests per second across them, so a catalog full of
+  wetten.overheid.nl links does not hammer one site (429/503 Retry-After is honoured once).
+- Results are cached in SQLite with a TTL (default under SCRAPE_CACHE_DIR), so re-validating
+  an unchanged catalog only probes URLs whose result expired.
+
+Stdlib only (http.client), like the other scripts in this folder.
+"""
+from __future__ import annotations
+
+import http.client
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+
+from scrape_cache import DEFAULT_CACHE_DIR
+
+DEFAULT_PROBE_CACHE = str(Path(DEFAULT_CACHE_DIR) / "probes.sqlite")
+DEFAULT_TTL_SECONDS = 24 * 3600
+USER_AGENT = "Mozilla/5.0"
+MAX_REDIRECTS = 5
+MAX_RETRY_AFTER_SECONDS = 30.0
+# A server that ignores Range still answers 200 with the full body; read at most this much.
+MAX_BODY_BYTES = 64 * 1024
+
+
+@dataclass(frozen=True)
+class ProbeResult:
+    url: str
+    status: int | None  # final HTTP status; None when no response was received
+    method: str  # "HEAD" or "GET" (range fallback)
+    detail: str = ""
+    checked_at: float = 0.0
+    cached: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.status is not None and 200 <= self.status < 400
+
+
+class ProbeCache:
+    def __init__(self, path: str | Path = DEFAULT_PROBE_CACHE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS probes ("
+            " url TEXT PRIMARY KEY, status INTEGER, method TEXT NOT NULL, detail TEXT NOT NULL, checked_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, url: str, *, ttl_seconds: float) -> ProbeResult | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, method, detail, checked_at FROM probes WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None or time.time() - row[3] >= ttl_seconds:
+            return None
+        return ProbeResult(url=url, status=row[0], method=row[1], detail=row[2], checked_at=row[3], cached=True)
+
+    def put(self, result: ProbeResult) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO probes VALUES (?, ?, ?, ?, ?)",
+                (result.url, result.status, result.method, result.detail, result.checked_at),
+            )
+            self._conn.commit()
+
+
+class _HostLimiter:
+    """Spaces requests to one host at least 1/rate seconds apart, across all its lanes."""
+
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_at)
+            self._next_at = start + self._interval
+        if start > now:
+            time.sleep(start - now)
+
+    def back_off(self, seconds: float) -> None:
+        with self._lock:
+            self._next_at = max(self._next_at, time.monotonic() + seconds)
+
+
+class _Lane:
+    """Keep-alive connections owned by one worker thread (http.client is not thread-safe)."""
+
+    def __init__(self, timeout_seconds: float):
+        self.timeout_seconds = timeout_seconds
+        self._connections: dict[tuple[str, str], http.client.HTTPConnection] = {}
+
+    def request(self, method: str, url: str, headers: dict[str, str]) -> tuple[int, dict[str, str]]:
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        for attempt in range(2):
+            reused = key in self._connections
+            conn = self._connections.get(key) or self._connect(*key)
+            self._connections[key] = conn
+            try:
+                conn.request(method, path, headers=headers)
+                response = conn.getresponse()
+                # The response must be consumed before the connection can be reused.
+                response.read(MAX_BODY_BYTES)
+                status, response_headers = response.status, {k.lower(): v for k, v in response.getheaders()}
+                if response.will_close or not response.isclosed():
+                    # Server closes, or the body was larger than we read: drop the connection.
+                    self.close(key)
+                return status, response_headers
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self.close(key)
+                # A kept-alive connection may have been closed by the server in the meantime.
+                if not reused or attempt:
+                    raise
+            except Exception:
+                self.close(key)
+                raise
+        raise AssertionError("unreachable")
+
+    def _connect(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        if scheme == "https":
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout_seconds)
+        if scheme == "http":
+            return http.client.HTTPConnection(netloc, timeout=self.timeout_seconds)
+        raise ValueError(f"unsupported URL scheme: {scheme!r}")
+
+    def close(self, key: tuple[str, str] | None = None) -> None:
+        keys = [key] if key else list(self._connections)
+        for k in keys:
+            conn = self._connections.pop(k, None)
+            if conn is not None:
+                conn.close()
+
+
+def _retry_after_seconds(headers: dict[str, str]) -> float:
+    try:
+        return min(MAX_RETRY_AFTER_SECONDS, max(0.0, float(headers.get("retry-after", "1"))))
+    except ValueError:
+        return 1.0
+
+
+def _probe_one(lane: _Lane, limiter: _HostLimiter, url: str) -> ProbeResult:
+    base_headers = {"User-Agent": USER_AGENT, "Accept": "*/*"}
+    attempts = (("HEAD", base_headers), ("GET", {**base_headers, "Range": "bytes=0-0"}))
+    status: int | None = None
+    method = "HEAD"
+    for method, headers in attempts:
+        current, retried = url, False
+        redirects = 0
+        while True:
+            limiter.wait()
+            status, response_headers = lane.request(method, current, headers)
+            if status in (429, 503) and not retried:
+                retried = True
+                limiter.back_off(_retry_after_seconds(response_headers))
+                continue
+            location = response_headers.get("location")
+            if 300 <= status < 400 and location and redirects < MAX_REDIRECTS:
+                current, redirects = urljoin(current, location), redirects + 1
+                continue
+            break
+        if status < 400:
+            break
+    return ProbeResult(url=url, status=status, method=method, detail=str(status), checked_at=time.time())
+
+
+def probe_urls(
+    urls: list[str],
+    *,
+    timeout_seconds: float = 20.0,
+    workers: int = 10,
+    per_host: int = 2,
+    per_host_rate: float = 2.0,
+    cache: ProbeCache | None = None,
+    ttl_seconds: float = DEFAULT_TTL_SECONDS,
+) -> dict[str, ProbeResult]:
+    """Probe each URL once; cached results younger than ttl_seconds are reused."""
+    results: dict[str, ProbeResult] = {}
+    pending_by_host: dict[str, deque[str]] = {}
+    for url in dict.fromkeys(urls):
+        cached = cache.get(url, ttl_seconds=ttl_seconds) if cache else None
+        if cached is not None:
+            results[url] = cached
+        else:
+            pending_by_host.setdefault(urlsplit(url).netloc.lower(), deque()).append(url)
+
+    limiters = {host: _HostLimiter(per_host_rate) for host in pending_by_host}
+    results_lock = threading.Lock()
+
+    def run_lane(host: str) -> None:
+        lane = _Lane(timeout_seconds)
+        queue = pending_by_host[host]
+        try:
+            while True:
+                try:
+                    url = queue.popleft()
+                except IndexError:
+                    return
+                try:
+                    result = _probe_one(lane, limiters[host], url)
+                except Exception as exc:  # noqa: BLE001 - reported per URL
+                    result = ProbeResult(url=url, status=None, method="HEAD", detail=f"{type(exc).__name__}: {exc}")
+                with results_lock:
+                    results[url] = result
+                # Timeouts and connection errors are usually transient: only cache real answers.
+                if cache is not None and result.status is not None:
+                    cache.put(result)
+        finally:
+            lane.close()
+
+    # Interleave hosts so the first lanes to start cover as many hosts as possible.
+    lanes = [
+        host
+        for slot in range(max(1, per_host))
+        for host, queue in pending_by_host.items()
+        if slot < len(queue)
+    ]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for future in [pool.submit(run_lane, host) for host in lanes]:
+            future.result()
+    return results
@@ -2,14 +2,12 @@
 from __future__ import annotations
 
 import argparse
-import re
-import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
 from dataclasses import dataclass
 from pathlib import Path
-from urllib.error import HTTPError, URLError
-from urllib.request import Request, urlopen
 
+from source_catalog import CatalogError, load_catalog
+from url_probe import DEFAULT_PROBE_CACHE, DEFAULT_TTL_SECONDS, ProbeCache, ProbeResult, probe_urls
 
 URL_EXCLUSIONS_DEFAULT = ["/vraag-en-antwoord/"]
 
@@ -21,58 +19,16 @@ class UrlIssue:
     detail: str = ""
 
 
-def _extract_question_blocks(lines: list[str]) -> list[tuple[str, list[str]]]:
-    question_key_re = re.compile(r'^\s*-\s*question_key:\s*"([^"]+)"\s*$')
-    blocks: list[tuple[str, list[str]]] = []
-
-    current_key: str | None = None
-    current_lines: list[str] = []
-
-    for line in lines:
-        match = question_key_re.match(line)
-        if match:
-            if current_key is not None:
-                blocks.append((current_key, current_lines))
-            current_key = match.group(1)
-            current_lines = []
-            continue
-
-        if current_key is not None:
-            current_lines.append(line)
-
-    if current_key is not None:
-        blocks.append((current_key, current_lines))
-
-    return blocks
-
-
-def _extract_urls_from_question_block(lines: list[str]) -> list[str]:
-    url_re = re.compile(r'^\s*-\s*url:\s*"([^"]+)"\s*$')
-    return [m.group(1) for l in lines if (m := url_re.match(l))]
-
-
-def _probe_url(url: str, *, timeout_seconds: float) -> UrlIssue | None:
-    headers = {"User-Agent": "Mozilla/5.0", "Accept": "*/*"}
-    req = Request(url, headers=headers, method="GET")
-    try:
-        with urlopen(req, timeout=timeout_seconds) as resp:
-            status = getattr(resp, "status", None) or resp.getcode()
-            if 200 <= int(status) < 400:
-                return None
-            return UrlIssue(url=url, issue="http_status", detail=str(status))
-    except HTTPError as exc:
-        # urllib may raise for some redirects; accept 3xx
-        if 300 <= int(exc.code) < 400:
-            return None
-        return UrlIssue(url=url, issue="http_error", detail=str(exc.code))
-    except URLError as exc:
-        return UrlIssue(url=url, issue="url_error", detail=str(exc))
-    except Exception as exc:  # noqa: BLE001 - CLI tool
-        return UrlIssue(url=url, issue="exception", detail=f"{type(exc).__name__}: {exc}")
+def _probe_issue(result: ProbeResult) -> UrlIssue | None:
+    if result.ok:
+        return None
+    if result.status is None:
+        return UrlIssue(url=result.url, issue="url_error", detail=result.detail)
+    return UrlIssue(url=result.url, issue="http_error", detail=f"{result.status} ({result.method})")
 
 
 def main() -> int:
-    parser = argparse.ArgumentParser(description="Validate RAG source YAML files (regex-based).")
+    parser = argparse.ArgumentParser(description="Validate RAG source YAML files.")
     parser.add_argument("paths", nargs="+", help="YAML files to validate")
     parser.add_argument(
         "--exclude-substring",
@@ -83,10 +39,29 @@ def main() -> int:
     parser.add_argument(
         "--check-http",
         action="store_true",
-        help="Probe each unique URL over HTTP (2xx/3xx ok).",
+        help="Probe each unique URL over HTTP (HEAD, falling back to a 1-byte GET; 2xx/3xx ok).",
     )
     parser.add_argument("--timeout-seconds", type=float, default=20.0)
     parser.add_argument("--workers", type=int, default=10)
+    parser.add_argument("--per-host", type=int, default=2, help="Max parallel probes per host (default: 2).")
+    parser.add_argument(
+        "--per-host-rate",
+        type=float,
+        default=2.0,
+        help="Max probe requests per second per host (default: 2, 0 = unlimited).",
+    )
+    parser.add_argument(
+        "--probe-cache",
+        default=DEFAULT_PROBE_CACHE,
+        help=f"SQLite cache of probe results (default: {DEFAULT_PROBE_CACHE}).",
+    )
+    parser.add_argument(
+        "--probe-ttl",
+        type=float,
+        default=DEFAULT_TTL_SECONDS,
+        help="Seconds a cached probe result is reused (default: 1 day).",
+    )
+    parser.add_argument("--no-probe-cache", action="store_true", help="Probe every URL, ignore the cache.")
     args = parser.parse_args()
 
     url_exclusions = args.exclude_substring or URL_EXCLUSIONS_DEFAULT
@@ -102,11 +77,18 @@ def main() -> int:
             issues.append(UrlIssue(url=str(path), issue="missing_file"))
             continue
 
-        lines = path.read_text(encoding="utf-8").splitlines()
-        blocks = _extract_question_blocks(lines)
-        for question_key, block_lines in blocks:
+        try:
+            catalog = load_catalog(path)
+        except CatalogError as exc:
+            issues.append(UrlIssue(url=str(path), issue="invalid_yaml", detail=" ".join(str(exc).split())))
+            continue
+
+        for question in catalog.questions:
+            question_key = question.question_key
             all_question_keys.append(question_key)
-            urls = _extract_urls_from_question_block(block_lines)
+            if not question.question_text:
+                issues.append(UrlIssue(url=question_key, issue="missing_question_text"))
+            urls = [s.url for s in question.sources]
             all_urls.extend(urls)
 
             # duplicates within question
@@ -131,18 +113,31 @@ def main() -> int:
 
     unique_urls = sorted(set(all_urls))
 
+    probe_summary = ""
     if args.check_http and unique_urls:
-        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
-            futures = {pool.submit(_probe_url, u, timeout_seconds=args.timeout_seconds): u for u in unique_urls}
-            for fut in as_completed(futures):
-                issue = fut.result()
-                if issue is not None:
-                    issues.append(issue)
+        started = time.time()
+        results = probe_urls(
+            unique_urls,
+            timeout_seconds=args.timeout_seconds,
+            workers=args.workers,
+            per_host=args.per_host,
+            per_host_rate=args.per_host_rate,
+            cache=None if args.no_probe_cache else ProbeCache(args.probe_cache),
+            ttl_seconds=args.probe_ttl,
+        )
+        for result in results.values():
+            issue = _probe_issue(result)
+            if issue is not None:
+                issues.append(issue)
+        cached = sum(1 for r in results.values() if r.cached)
+        probe_summary = f"HTTP: {len(results) - cached} probed, {cached} cached, {time.time() - started:.1f}s"
 
     # report
     print(f"Questions: {len(all_question_keys)} (unique: {len(set(all_question_keys))})")
     print(f"URLs: {len(all_urls)} (unique: {len(unique_urls)})")
     print(f"Exclusions: {url_exclusions}")
+    if probe_summary:
+        print(probe_summary)
     print(f"Issues: {len(issues)}")
 
     for issue in sorted(issues, key=lambda x: (x.issue, x.url)):
@@ -1,56 +1,110 @@
 import logging
+from typing import Any
 
-from shared_volume.agents.utils.agent_template import agent_template, AgentOutput
+from shared_volume.agents.utils.agent_template import agent_template, AgentOutput, validate_json_object_output
 from shared_volume.config import SERVICE_NAME
 
 log = logging.getLogger(SERVICE_NAME)
 
 # VOLLEDIGHED
 async def eval_usability_agent(answer: str, question: str) -> str:
-    return await agent_template(BRUIKBAARHEID + EVAL_SUFFIX, parse_question_answer(question, answer), AgentOutput.TEXT, log)
+    return await agent_template(BRUIKBAARHEID + EVAL_SUFFIX, parse_question_answer(question, answer), AgentOutput.TEXT, log, cache=True)
 
 async def eval_usability_score_agent( usability: str) -> str:
-    return await agent_template(SCORE_PREFIX + BRUIKBAARHEID_SCORE + SCORE_SUFFIX, usability, AgentOutput.PERCENTAGE, log)
+    return await agent_template(SCORE_PREFIX + BRUIKBAARHEID_SCORE + SCORE_SUFFIX, usability, AgentOutput.PERCENTAGE, log, cache=True)
 
 # RELEVANTIE
 async def eval_relevance_agent(answer: str, question: str) -> str:
-    return await agent_template(RELEVANTIE + EVAL_SUFFIX, parse_question_answer(question, answer), AgentOutput.TEXT, log)
+    return await agent_template(RELEVANTIE + EVAL_SUFFIX, parse_question_answer(question, answer), AgentOutput.TEXT, log, cache=True)
 
 async def eval_relevance_score_agent(relevance: str) -> str:
-    return await agent_template(SCORE_PREFIX + RELEVANTIE_SCORE + SCORE_SUFFIX, relevance, AgentOutput.PERCENTAGE, log)
+    return await agent_template(SCORE_PREFIX + RELEVANTIE_SCORE + SCORE_SUFFIX, relevance, AgentOutput.PERCENTAGE, log, cache=True)
 
 # NEUTRALITEIT
 async def eval_neutrality_agent(answer: str, question: str) -> str:
-    return await agent_template(NEUTRALITEIT + EVAL_SUFFIX, parse_question_answer(question, answer), AgentOutput.TEXT, log)
+    return await agent_template(NEUTRALITEIT + EVAL_SUFFIX, parse_question_answer(question, answer), AgentOutput.TEXT, log, cache=True)
 
 async def eval_neutrality_score_agent(neutrality: str) -> str:
-    return await agent_template(SCORE_PREFIX + NEUTRALITEIT_SCORE + SCORE_SUFFIX, neutrality, AgentOutput.PERCENTAGE, log)
+    return await agent_template(SCORE_PREFIX + NEUTRALITEIT_SCORE + SCORE_SUFFIX, neutrality, AgentOutput.PERCENTAGE, log, cache=True)
 
 # VEILIGHEID
 async def eval_security_agent(answer: str, question: str) -> str:
-        return await agent_template(VEILIGHEID + EVAL_SUFFIX, parse_question_answer(question, answer), AgentOutput.TEXT, log)
+        return await agent_template(VEILIGHEID + EVAL_SUFFIX, parse_question_answer(question, answer), AgentOutput.TEXT, log, cache=True)
 
 async def eval_security_score_agent(security: str) -> str:
-    return await agent_template(SCORE_PREFIX + VEILIGHEID_SCORE + SCORE_SUFFIX, security, AgentOutput.PERCENTAGE, log)
+    return await agent_template(SCORE_PREFIX + VEILIGHEID_SCORE + SCORE_SUFFIX, security, AgentOutput.PERCENTAGE, log, cache=True)
 
 # VERIFIEERBAARHEID
 async def eval_verification_agent(answer: str, question: str, sources: dict, log: logging.Logger) -> str:
+    return await agent_template(VERIFIEERBAARHEID + EVAL_SUFFIX, parse_verification_prompt(question, answer, sources), AgentOutput.TEXT, log, cache=True)
+
+async def eval_verification_score_agent(verification: str) -> str:
+    return await agent_template(SCORE_PREFIX + VERIFIEERBAARHEID_SCORE + SCORE_SUFFIX, verification, AgentOutput.PERCENTAGE, log, cache=True)
+
+
+def parse_question_answer(question: str, answer: str) -> str:
+    return f"Question: {question}\nAnswer: {answer}"
+
+def parse_verification_prompt(question: str, answer: str, sources: dict) -> str:
     sources_str = ""
-    user_prompt = f"Question: {question}\nAnswer: {answer}"
+    user_prompt = parse_question_answer(question, answer)
     for source_type, source_list in sources.items():
         for source in source_list:
             sources_str += f"<source>{source['path']}</source>"
             sources_str += f"Title: {source['title']}\nContent: {source['content']}\n"
     if len(sources_str.strip()) > 0:
         user_prompt += f"\nSources: {sources_str}"
-    return await agent_template(VERIFIEERBAARHEID + EVAL_SUFFIX, user_prompt, AgentOutput.TEXT, log)
-
-async def eval_verification_score_agent(verification: str) -> str:
-    return await agent_template(SCORE_PREFIX + VERIFIEERBAARHEID_SCORE + SCORE_SUFFIX, verification, AgentOutput.PERCENTAGE, log)
-
-
-def parse_question_answer(question: str, answer: str) -> str:
-    return f"Question: {question}\nAnswer: {answer}"
+    return user_prompt
+
+# FUSED JUDGE (explanation + score in one call)
+async def eval_fused_agent(criteria: str, score_guidelines: str, user_prompt: str) -> tuple[str, int] | None:
+    judgement = await agent_template(criteria + score_guidelines + FUSED_SUFFIX, user_prompt, AgentOutput.JSON, log, parse=parse_fused_output, cache=True)
+    return judgement or None
+
+def parse_fused_output(response: str) -> tuple[str, int]:
+    """Validate a fused judge response; a ValueError makes the agent re-ask the LLM."""
+    judgement = parse_fused_judgement(validate_json_object_output(response, log))
+    if judgement is None:
+        raise ValueError(f"Malformed fused judgement: {response}")
+    return judgement
+
+async def eval_usability_fused_agent(answer: str, question: str) -> tuple[str, int] | None:
+    return await eval_fused_agent(BRUIKBAARHEID, BRUIKBAARHEID_SCORE, parse_question_answer(question, answer))
+
+async def eval_relevance_fused_agent(answer: str, question: str) -> tuple[str, int] | None:
+    return await eval_fused_agent(RELEVANTIE, RELEVANTIE_SCORE, parse_question_answer(question, answer))
+
+async def eval_neutrality_fused_agent(answer: str, question: str) -> tuple[str, int] | None:
+    return await eval_fused_agent(NEUTRALITEIT, NEUTRALITEIT_SCORE, parse_question_answer(question, answer))
+
+async def eval_security_fused_agent(answer: str, question: str) -> tuple[str, int] | None:
+    return await eval_fused_agent(VEILIGHEID, VEILIGHEID_SCORE, parse_question_answer(question, answer))
+
+async def eval_verification_fused_agent(answer: str, question: str, sources: dict) -> tuple[str, int] | None:
+    return await eval_fused_agent(VERIFIEERBAARHEID, VERIFIEERBAARHEID_SCORE, parse_verification_prompt(question, answer, sources))
+
+async def eval_all_fused_agent(answer: str, question: str, sources: dict) -> dict[str, tuple[str, int] | None]:
+    """Judge all five dimensions in a single call. Missing or malformed dimensions map to None."""
+    system_prompt = "".join(
+        f"\n## {dimension}\n{criteria}{score_guidelines}" for dimension, (criteria, score_guidelines) in DIMENSION_PROMPTS.items()
+    ) + FUSED_ALL_SUFFIX
+    judgement = await agent_template(
+        system_prompt, parse_verification_prompt(question, answer, sources), AgentOutput.JSON, log,
+        parse=lambda response: validate_json_object_output(response, log), cache=True,
+    ) or {}
+    return {dimension: parse_fused_judgement(judgement.get(dimension)) for dimension in DIMENSION_PROMPTS}
+
+def parse_fused_judgement(judgement: Any) -> tuple[str, int] | None:
+    if not isinstance(judgement, dict):
+        return None
+    explanation = judgement.get("explanation")
+    try:
+        score = int(judgement.get("score"))
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(explanation, str) or score < 0 or score > 100:
+        return None
+    return explanation.strip(), score
 
 EVAL_SUFFIX = """
 Volg deze regels strikt:
@@ -159,3 +213,29 @@ Score-richtlijnen:
 - 50: Bronverwijzingen zijn vaag, onjuist geformatteerd of missen bij cruciale informatie.
 - 0: Totaal geen bronverwijzingen of de verstrekte bronnen hebben geen betrekking op de claims.
 """
+
+FUSED_SUFFIX = """
+Volg deze regels strikt:
+1. **Criteria:** Behandel in de toelichting elk van de bovengenoemde evaluatiecriteria. Maximaal 250 characters per criterium.
+2. **Score:** Geef op basis van je toelichting een score tussen 0 en 100 volgens de score-richtlijnen.
+3. **Taal:** Gebruik dezelfde taal als de originele tekst.
+4. **Opmaak:** Formatteer de toelichting met markdown.
+5. **JSON:** Antwoord uitsluitend met één JSON-object: {"explanation": "<toelichting>", "score": <score>}.
+"""
+
+FUSED_ALL_SUFFIX = """
+Beoordeel het antwoord op elk van de bovenstaande criteria. Volg deze regels strikt:
+1. **Criteria:** Behandel per criterium elk van de evaluatiecriteria in de toelichting. Maximaal 250 characters per evaluatiecriterium.
+2. **Score:** Geef per criterium een score tussen 0 en 100 volgens de bijbehorende score-richtlijnen.
+3. **Taal:** Gebruik dezelfde taal als de originele tekst.
+4. **Opmaak:** Formatteer de toelichtingen met markdown.
+5. **JSON:** Antwoord uitsluitend met één JSON-object met per criterium een object, bijv.: {"relevance": {"explanation": "<toelichting>", "score": <score>}, "usability": {...}, "neutrality": {...}, "security": {...}, "verification": {...}}.
+"""
+
+DIMENSION_PROMPTS = {
+    "relevance": (RELEVANTIE, RELEVANTIE_SCORE),
+    "usability": (BRUIKBAARHEID, BRUIKBAARHEID_SCORE),
+    "neutrality": (NEUTRALITEIT, NEUTRALITEIT_SCORE),
+    "security": (VEILIGHEID, VEILIGHEID_SCORE),
+    "verification": (VERIFIEERBAARHEID, VERIFIEERBAARHEID_SCORE),
+}
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import re
+from typing import Any, Dict, Optional
+
+from shared_volume.agents import claim_verification
+from shared_volume.agents import eval_verification_agent as prompts
+from shared_volume.agents.utils.cache_backends import MemoryBackend, SqliteBackend
+
+# Every prompt constant that shapes a judgement. Editing any of them changes
+# PROMPT_VERSION and therefore every cache key, so stale entries are never served.
+PROMPT_CONSTANTS = (
+    "EVAL_SUFFIX", "SCORE_PREFIX", "SCORE_SUFFIX", "FUSED_SUFFIX", "FUSED_ALL_SUFFIX",
+    "RELEVANTIE", "RELEVANTIE_SCORE",
+    "BRUIKBAARHEID", "BRUIKBAARHEID_SCORE",
+    "NEUTRALITEIT", "NEUTRALITEIT_SCORE",
+    "VEILIGHEID", "VEILIGHEID_SCORE",
+    "VERIFIEERBAARHEID", "VERIFIEERBAARHEID_SCORE",
+)
+CLAIM_PROMPT_CONSTANTS = ("CLAIM_VERIFICATIE",)
+
+
+def prompt_version() -> str:
+    digest = hashlib.sha256()
+    for name in PROMPT_CONSTANTS:
+        digest.update(name.encode("utf-8"))
+        digest.update(getattr(prompts, name, "").encode("utf-8"))
+    for name in CLAIM_PROMPT_CONSTANTS:
+        digest.update(name.encode("utf-8"))
+        digest.update(getattr(claim_verification, name, "").encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+PROMPT_VERSION = prompt_version()
+
+
+def normalize_text(value: str) -> str:
+    return re.sub(r"\s+", " ", (value or "").strip())
+
+
+def evaluation_cache_key(question: str, answer: str, sources: Dict[str, Any], variant: str = "") -> str:
+    """Hash of the normalized inputs, the prompt version and the judge variant (e.g. judge mode)."""
+    payload = json.dumps(
+        {
+            "question": normalize_text(question),
+            "answer": normalize_text(answer),
+            "sources": sources,
+            "prompt_version": PROMPT_VERSION,
+            "variant": variant,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EvaluationCache:
+    """Evaluation results keyed on evaluation_cache_key, with hit/miss counters."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = await self.backend.aget(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return dict(value)
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        await self.backend.aset(key, dict(value))
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.backend),
+            "prompt_version": PROMPT_VERSION,
+        }
+
+
+def build_evaluation_cache(backend: str, path: str = "", max_entries: int = 0, ttl: Optional[float] = None) -> Optional[EvaluationCache]:
+    """Build a cache for backend "memory" or "sqlite"; anything else (e.g. "off") disables caching."""
+    if backend == "memory":
+        return EvaluationCache(MemoryBackend(max_entries=max_entries or 1024, ttl=ttl))
+    if backend == "sqlite":
+        return EvaluationCache(SqliteBackend(path or "evaluation_cache.sqlite3", table="evaluations", max_entries=max_entries or 100_000, ttl=ttl))
+    return None
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import logging
+from typing import Any, Dict
+
+from backend.db.chats.crud import Chats
+from backend.config import SERVICE_NAME
+
+log = logging.getLogger(SERVICE_NAME)
+
+LOCK_STRIPES = 64
+
+
+def write_evaluations(chat_id: str, evaluations: Dict[str, Dict[str, Any]]) -> bool:
+    """Store several message evaluations on one chat with a single read and a single write."""
+    chat_model = Chats.get_chat_by_id(chat_id)
+    if not chat_model:
+        return False
+    full_chat_data = json.loads(chat_model.chat)
+    msg_dict = full_chat_data.get("history", {}).get("messages")
+    if not msg_dict:
+        return False
+
+    changed = False
+    for message_id, evaluation in evaluations.items():
+        if message_id in msg_dict:
+            msg_dict[message_id]["evaluation"] = evaluation
+            changed = True
+    if changed:
+        Chats.update_chat_by_id(chat_id, full_chat_data)
+    return changed
+
+
+class EvaluationWriteBehind:
+    """Write-behind queue for evaluation results.
+
+    Results submitted for the same chat within `delay` seconds are coalesced into one
+    read-modify-write of the chat JSON; callers that submit must `flush_all` before they
+    finish, interactive callers use `write` instead. Writes per chat are serialized, so concurrent
+    evaluations of one chat no longer overwrite each other (within this process).
+    """
+
+    def __init__(self, delay: float = 0.5):
+        self.delay = delay
+        self.updates = 0
+        self.writes = 0
+        self._pending: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._scheduled: Dict[str, asyncio.Task] = {}
+        self._locks = [asyncio.Lock() for _ in range(LOCK_STRIPES)]
+
+    def submit(self, chat_id: str, message_id: str, evaluation: Dict[str, Any]) -> None:
+        self._pending.setdefault(chat_id, {})[message_id] = evaluation
+        self.updates += 1
+        if chat_id not in self._scheduled:
+            self._scheduled[chat_id] = asyncio.create_task(self._flush_later(chat_id))
+
+    async def write(self, chat_id: str, message_id: str, evaluation: Dict[str, Any]) -> None:
+        """Store an evaluation now, together with anything already pending for its chat.
+
+        Used for interactive evaluations: no batch flushes them later, so a result left
+        queued would be lost if the process stopped first.
+        """
+        self._pending.setdefault(chat_id, {})[message_id] = evaluation
+        self.updates += 1
+        await self.flush(chat_id)
+
+    async def _flush_later(self, chat_id: str) -> None:
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self._scheduled.pop(chat_id, None)
+        await self.flush(chat_id)
+
+    async def flush(self, chat_id: str) -> None:
+        async with self._locks[hash(chat_id) % LOCK_STRIPES]:
+            evaluations = self._pending.pop(chat_id, None)
+            if not evaluations:
+                return
+            try:
+                write_evaluations(chat_id, evaluations)
+                self.writes += 1
+            except Exception as e:
+                log.error(f"Error storing {len(evaluations)} evaluation(s) for chat {chat_id}: {str(e)}")
+
+    async def flush_all(self) -> None:
+        await asyncio.gather(*[self.flush(chat_id) for chat_id in list(self._pending)])
+
+    def stats(self) -> Dict[str, int]:
+        return {"updates": self.updates, "writes": self.writes, "pending_chats": len(self._pending)}
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark against the offline mock servers (mock_servers.py).
+
+Measures evaluations/sec, p50/p95 latency and upstream calls per evaluation for
+    pipeline  evaluate_pipeline.py: Theon chat + batched embeddings + scoring
+    services  backend.apps.generation.services.generate_evaluation (LLM-as-a-judge);
+              needs the platform packages on the path and its LLM client pointed at the
+              mock GreenPT server (the benchmark exports GREENPT_API_URL/GREENPT_API_KEY)
+
+Comparing against a saved baseline exits with status 1 on a regression.
+
+Usage:
+    python benchmark.py pipeline --questions 60 --concurrency 8 --latency 0.2
+    python benchmark.py pipeline --output bench.json
+    python benchmark.py pipeline --baseline bench.json --tolerance 0.15
+    python benchmark.py services --evaluations 20 --concurrency 5
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import urllib.request
+
+import numpy as np
+
+from mock_servers import MockConfig, load_answers, start_mock_servers
+
+DATASET_FILE = os.environ.get("DATASET_FILE", "./evaluation_dataset.json")
+
+# metric -> True when higher is better
+REGRESSION_METRICS = {
+    "evaluations_per_sec": True,
+    "latency_p95": False,
+    "calls_per_evaluation": False,
+}
+
+
+def percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def server_stats(url: str) -> dict:
+    with urllib.request.urlopen(f"{url}/_stats") as response:
+        return json.load(response)
+
+
+def reset_stats(url: str) -> None:
+    urllib.request.urlopen(urllib.request.Request(f"{url}/_stats/reset", data=b"{}", method="POST")).close()
+
+
+def benchmark_questions(count: int) -> list[dict]:
+    """The dataset questions, repeated with unique ids until there are count of them."""
+    with open(DATASET_FILE) as f:
+        base = json.load(f)["questions"]
+    return [{**base[i % len(base)], "question_id": f"{base[i % len(base)]['question_id']}#{i}"} for i in range(count)]
+
+
+def run_pipeline(args, theon_url: str, greenpt_url: str) -> dict:
+    os.environ.update(THEON_API_URL=theon_url, THEON_API_TOKEN="mock", GREENPT_API_URL=f"{greenpt_url}/v1", GREENPT_API_KEY="mock")
+    import evaluate_pipeline
+    from embeddings import EmbeddingClient
+
+    evaluate_pipeline.THEON_API_URL, evaluate_pipeline.THEON_API_TOKEN = theon_url, "mock"
+    questions = benchmark_questions(args.questions)
+
+    reset_stats(theon_url)
+    reset_stats(greenpt_url)
+    start = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = evaluate_pipeline.evaluate_questions(questions, True, args.concurrency)
+        client = EmbeddingClient(f"{greenpt_url}/v1", "mock", batch_size=args.batch_size, backoff=0.1)
+        evaluate_pipeline.score_results(results, client)
+    wall_time = time.time() - start
+
+    ok = [r for r in results if r.error is None]
+    latencies = [r.response_time for r in ok]
+    ttfts = [r.time_to_first_token for r in ok if r.time_to_first_token is not None]
+    theon_calls = sum(server_stats(theon_url)["requests"].values())
+    embedding_calls = sum(server_stats(greenpt_url)["requests"].values())
+    return {
+        "evaluations": len(results),
+        "failed": len(results) - len(ok),
+        "wall_time": wall_time,
+        "evaluations_per_sec": len(results) / wall_time if wall_time else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "ttft_p50": percentile(ttfts, 50),
+        "ttft_p95": percentile(ttfts, 95),
+        "theon_calls_per_evaluation": theon_calls / len(results),
+        "embedding_calls_per_evaluation": embedding_calls / len(results),
+        "calls_per_evaluation": (theon_calls + embedding_calls) / len(results),
+    }
+
+
+def run_services(args, theon_url: str, greenpt_url: str) -> dict:
+    os.environ.update(GREENPT_API_URL=f"{greenpt_url}/v1", GREENPT_API_KEY="mock")
+    try:
+        from backend.apps.generation import services
+        from backend.apps.generation.schemas import GenerateEvaluationForm
+    except ImportError as e:
+        print(f"Skipping services benchmark: platform packages not available ({e})")
+        sys.exit(2)
+
+    # Measure the evaluation itself, not the database.
+    async def skip_write(*a, **k) -> None:
+        return None
+
+    services.evaluation_writer.submit = lambda *a, **k: None
+    services.evaluation_writer.write = skip_write
+    services.evaluation_writer.flush_all = skip_write
+    questions = benchmark_questions(args.evaluations)
+    forms = [
+        GenerateEvaluationForm(
+            chat_id=f"bench-{i}",
+            message_id=f"bench-{i}",
+            question=q["question"],
+            answer=f"{q['ground_truth']}\n\n(run {i})",
+            sources_db=[{"path": q["source_url"], "title": q["question"], "content": q["ground_truth"]}],
+            sources_web=[],
+            sources_verdic=[],
+        )
+        for i, q in enumerate(questions)
+    ]
+
+    async def run() -> list[float]:
+        semaphore = asyncio.Semaphore(max(1, args.concurrency))
+
+        async def one(form) -> float:
+            async with semaphore:
+                start = time.time()
+                await services.generate_evaluation(form)
+                return time.time() - start
+
+        return await asyncio.gather(*[one(form) for form in forms])
+
+    reset_stats(greenpt_url)
+    start = time.time()
+    latencies = asyncio.run(run())
+    wall_time = time.time() - start
+    llm_calls = sum(server_stats(greenpt_url)["requests"].values())
+    return {
+        "evaluations": len(forms),
+        "wall_time": wall_time,
+        "evaluations_per_sec": len(forms) / wall_time if wall_time else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "llm_calls_per_evaluation": llm_calls / len(forms),
+        "calls_per_evaluation": llm_calls / len(forms),
+    }
+
+
+def summarize(runs: list[dict]) -> dict:
+    """Median of every metric over the runs."""
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def regressions(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    found = []
+    for metric, higher_is_better in REGRESSION_METRICS.items():
+        old, new = baseline.get(metric), result.get(metric)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+            found.append(f"{metric}: {old:.4f} -> {new:.4f} ({change:+.1%})")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark against mock Theon/GreenPT servers")
+    parser.add_argument("target", choices=["pipeline", "services"])
+    parser.add_argument("--questions", type=int, default=60, help="Questions per pipeline run")
+    parser.add_argument("--evaluations", type=int, default=20, help="Evaluations per services run")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=64, help="Embedding batch size")
+    parser.add_argument("--runs", type=int, default=3, help="Runs; the median is reported")
+    parser.add_argument("--latency", type=float, default=MockConfig.latency)
+    parser.add_argument("--chunk-delay", type=float, default=MockConfig.chunk_delay)
+    parser.add_argument("--embedding-latency", type=float, default=MockConfig.embedding_latency)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the summary as JSON (use as a later --baseline)")
+    parser.add_argument("--baseline", help="Summary JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency=args.latency,
+        chunk_delay=args.chunk_delay,
+        embedding_latency=args.embedding_latency,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    theon, greenpt = start_mock_servers(config, load_answers(None, DATASET_FILE))
+    run = run_pipeline if args.target == "pipeline" else run_services
+    try:
+        runs = []
+        for i in range(args.runs):
+            runs.append(run(args, theon.url, greenpt.url))
+            print(f"run {i + 1}/{args.runs}: {runs[-1]['evaluations_per_sec']:.2f} evaluations/sec")
+    finally:
+        theon.stop()
+        greenpt.stop()
+
+    summary = {"target": args.target, "concurrency": args.concurrency, "runs": args.runs, **summarize(runs)}
+    print()
+    for key, value in summary.items():
+        print(f"{key:32} {value:.4f}" if isinstance(value, float) else f"{key:32} {value}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(summary, json.load(f), args.tolerance)
+        if found:
+            print("\nREGRESSIONS:")
+            for line in found:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
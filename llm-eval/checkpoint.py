@@ -0,0 +1,108 @@
+"""
+Append-only JSONL checkpoint for evaluation runs.
+
+Every finished question is appended as a "result" record as soon as it is known, and
+similarity scores are appended later as "score" records, so a crashed or interrupted run
+can be resumed (see evaluate_pipeline.py --resume) without redoing finished questions.
+Readers index the file once (byte offsets + scores only) and stream records back from
+disk, so reports never need every response in memory.
+
+Record types:
+    {"type": "run", "run_id": ..., "mode": ..., ...}        first line, run metadata
+    {"type": "result", "question_id": ..., ...}             one per finished question
+    {"type": "score", "question_id": ..., ...}              fields merged into the result
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+
+class RunCheckpoint:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    @classmethod
+    def create(cls, path: Path, metadata: dict) -> "RunCheckpoint":
+        checkpoint = cls(path)
+        checkpoint._append({"type": "run", **metadata})
+        return checkpoint
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def metadata(self) -> dict:
+        for record in self._records():
+            if record.get("type") == "run":
+                return record
+        return {}
+
+    def append_result(self, record: dict) -> None:
+        self._append({"type": "result", **record})
+
+    def append_score(self, question_id: Any, fields: dict) -> None:
+        self._append({"type": "score", "question_id": question_id, **fields})
+
+    def completed_ids(self) -> set:
+        """Question ids whose latest result finished without an error."""
+        return {question_id for question_id, (_, error) in self._index()[0].items() if not error}
+
+    def iter_results(self, order: Optional[list] = None) -> Iterator[dict]:
+        """Stream the latest result per question with its latest score merged in.
+
+        Results follow `order` (question ids) when given, otherwise first-completion order.
+        """
+        offsets, scores = self._index()
+        question_ids = list(offsets)
+        if order is not None:
+            position = {question_id: i for i, question_id in enumerate(order)}
+            question_ids.sort(key=lambda question_id: position.get(question_id, len(position)))
+        with open(self.path, "rb") as f:
+            for question_id in question_ids:
+                f.seek(offsets[question_id][0])
+                record = json.loads(f.readline())
+                record.pop("type", None)
+                record.update(scores.get(question_id, {}))
+                yield record
+
+    def _index(self) -> tuple[dict, dict]:
+        """{question_id: (offset of latest result, had error)} and {question_id: score fields}."""
+        offsets: dict = {}
+        scores: dict = {}
+        for offset, record in self._records(with_offsets=True):
+            question_id = record.get("question_id")
+            if record.get("type") == "result":
+                offsets[question_id] = (offset, bool(record.get("error")))
+                scores.pop(question_id, None)
+            elif record.get("type") == "score":
+                scores[question_id] = {k: v for k, v in record.items() if k not in ("type", "question_id")}
+        return offsets, scores
+
+    def _records(self, with_offsets: bool = False) -> Iterator:
+        if not self.path.exists():
+            return
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                start, offset = offset, offset + len(line)
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn last line from a crash mid-write.
+                    continue
+                yield (start, record) if with_offsets else record
+
+    def _append(self, record: dict) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "ab") as f:
+            if f.tell() and not self._ends_with_newline():
+                f.write(b"\n")
+            f.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Persistent embedding store.
+
+Keeps embeddings in a local SQLite file keyed on (model, sha256 of the input text), so
+texts that do not change between runs - the ground-truth answers - are embedded once.
+EmbeddingClient(..., store=EmbeddingStore(path)) only sends texts that are not stored yet.
+
+Usage:
+    python embedding_store.py prewarm                 # dataset + rijksoverheid_vacs_bzk.csv
+    python embedding_store.py prewarm --csv other.csv
+    python embedding_store.py stats
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+from typing import Iterable, Optional
+
+import numpy as np
+
+EMBEDDING_STORE = os.environ.get("EMBEDDING_STORE", "./embedding_store.sqlite")
+REFERENCE_CSV = os.environ.get("REFERENCE_CSV", "../dataset/rijksoverheid_vacs_bzk.csv")
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    def __init__(self, path: str = EMBEDDING_STORE):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, text_hash TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.commit()
+
+    def get_many(self, model: str, texts: Iterable[str]) -> dict[str, list[float]]:
+        """Return {text: vector} for the texts that are stored."""
+        by_hash = {text_hash(text): text for text in texts}
+        found: dict[str, list[float]] = {}
+        hashes = list(by_hash)
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start : start + 500]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(chunk))})",
+                    [model, *chunk],
+                ).fetchall()
+                for digest, blob in rows:
+                    found[by_hash[digest]] = np.frombuffer(blob, dtype=np.float32).tolist()
+        self.hits += len(found)
+        self.misses += len(by_hash) - len(found)
+        return found
+
+    def put_many(self, model: str, items: dict[str, list[float]]) -> None:
+        rows = []
+        for text, vector in items.items():
+            array = np.asarray(vector, dtype=np.float32)
+            rows.append((model, text_hash(text), array.shape[0], array.tobytes()))
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def count(self, model: Optional[str] = None) -> int:
+        with self._lock:
+            if model is None:
+                return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings WHERE model = ?", (model,)).fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def load_references(dataset_file: str, csv_file: str) -> list[dict]:
+    """Ground truths from the evaluation dataset and reference answers from the VAC export.
+
+    Each reference is {"id", "question", "text", "source"}; duplicate texts are kept once.
+    """
+    references = []
+    if dataset_file and os.path.exists(dataset_file):
+        with open(dataset_file) as f:
+            for q in json.load(f)["questions"]:
+                references.append({"id": str(q["question_id"]), "question": q["question"], "text": q["ground_truth"], "source": "dataset"})
+    else:
+        print(f"Warning: dataset not found: {dataset_file}")
+    if csv_file and os.path.exists(csv_file):
+        with open(csv_file, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if row.get("reference_answer"):
+                    references.append({"id": row["id"], "question": row["question"], "text": row["reference_answer"], "source": "vac"})
+    else:
+        print(f"Warning: reference CSV not found: {csv_file}")
+    seen = set()
+    return [ref for ref in references if not (ref["text"] in seen or seen.add(ref["text"]))]
+
+
+def load_reference_texts(dataset_file: str, csv_file: str) -> list[str]:
+    return [ref["text"] for ref in load_references(dataset_file, csv_file)]
+
+
+def main():
+    from embeddings import EmbeddingClient
+    from evaluate_pipeline import DATASET_FILE, EMBEDDING_BATCH_SIZE, GREENPT_API_KEY, GREENPT_API_URL
+
+    parser = argparse.ArgumentParser(description="Persistent embedding store")
+    parser.add_argument("command", choices=["prewarm", "stats"])
+    parser.add_argument("--store", default=EMBEDDING_STORE, help="SQLite store path")
+    parser.add_argument("--dataset", default=DATASET_FILE, help="Evaluation dataset JSON")
+    parser.add_argument("--csv", default=REFERENCE_CSV, help="CSV with a reference_answer column")
+    args = parser.parse_args()
+
+    store = EmbeddingStore(args.store)
+    if args.command == "stats":
+        print(f"{store.count()} embeddings in {args.store}")
+        return
+
+    if not GREENPT_API_KEY:
+        print("Error: GREENPT_API_KEY environment variable not set")
+        sys.exit(1)
+
+    texts = load_reference_texts(args.dataset, args.csv)
+    client = EmbeddingClient(GREENPT_API_URL, GREENPT_API_KEY, batch_size=EMBEDDING_BATCH_SIZE, store=store)
+    print(f"Pre-warming {len(texts)} reference texts into {args.store}...")
+    vectors = client.embed(texts, allow_partial=True)
+    failed = sum(1 for v in vectors if v is None)
+    print(f"  {store.hits} already stored, {len(texts) - store.hits - failed} embedded, {failed} failed")
+    print(f"  {client.requests_sent} embedding request(s), {store.count(client.model)} embeddings for {client.model}")
+
+
+if __name__ == "__main__":
+    main()
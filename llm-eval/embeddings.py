@@ -0,0 +1,112 @@
+"""
+Batched GreenPT embedding client.
+
+Sends many inputs per /embeddings request (the OpenAI-compatible API accepts a list)
+over one pooled HTTP session, chunks over the provider's batch limit and retries only
+the sub-batches that failed.
+
+Usage:
+    client = EmbeddingClient(GREENPT_API_URL, GREENPT_API_KEY)
+    vectors = client.embed(["first text", "second text"])
+
+Pass store=EmbeddingStore(path) (see embedding_store.py) to reuse stored vectors and
+only embed texts that are new.
+"""
+
+import time
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_MODEL = "green-embedding"
+DEFAULT_BATCH_SIZE = 64
+MAX_INPUT_CHARS = 8000
+
+
+class EmbeddingError(RuntimeError):
+    pass
+
+
+class EmbeddingClient:
+    def __init__(
+        self,
+        api_url: str,
+        api_key: str,
+        model: str = DEFAULT_MODEL,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_chars: int = MAX_INPUT_CHARS,
+        timeout: float = 60,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        session: Optional[requests.Session] = None,
+        store=None,
+    ):
+        self.api_url = api_url.rstrip("/")
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.max_chars = max_chars
+        self.timeout = timeout
+        self.max_retries = max(1, max_retries)
+        self.backoff = backoff
+        self.requests_sent = 0
+        self.store = store
+
+        self.session = session or requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        })
+
+    def _post_batch(self, texts: list[str]) -> list[list[float]]:
+        self.requests_sent += 1
+        response = self.session.post(
+            f"{self.api_url}/embeddings",
+            json={"model": self.model, "input": texts, "encoding_format": "float"},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item.get("index", 0))
+        if len(data) != len(texts):
+            raise EmbeddingError(f"Expected {len(texts)} embeddings, got {len(data)}")
+        return [item["embedding"] for item in data]
+
+    def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        """Embed one sub-batch, retrying it (and only it) with exponential backoff."""
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                return self._post_batch(texts)
+            except (requests.RequestException, KeyError, ValueError, EmbeddingError) as e:
+                if attempt == self.max_retries:
+                    raise EmbeddingError(f"Embedding batch of {len(texts)} failed after {attempt} attempts: {e}") from e
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+        raise AssertionError("unreachable")
+
+    def embed(self, texts: list[str], allow_partial: bool = False) -> list[Optional[list[float]]]:
+        """Embed texts in order. Inputs are truncated to max_chars.
+
+        With allow_partial, a sub-batch that keeps failing yields None for its texts
+        instead of raising, so the other sub-batches are not lost.
+        """
+        texts = [(text or " ")[: self.max_chars] for text in texts]
+        known = self.store.get_many(self.model, texts) if self.store else {}
+        missing = [text for text in dict.fromkeys(texts) if text not in known]
+
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start : start + self.batch_size]
+            try:
+                embedded = dict(zip(batch, self._embed_batch(batch)))
+            except EmbeddingError as e:
+                if not allow_partial:
+                    raise
+                print(f"  Warning: {e}")
+                continue
+            known.update(embedded)
+            if self.store:
+                self.store.put_many(self.model, embedded)
+        return [known.get(text) for text in texts]
+
+    def embed_one(self, text: str) -> list[float]:
+        return self.embed([text])[0]
@@ -8,21 +8,31 @@ and cosine similarity.
 Usage:
     python evaluate_pipeline.py --with-collection [--single]
     python evaluate_pipeline.py --no-collection [--single]
+    python evaluate_pipeline.py --with-collection --concurrency 8
+    python evaluate_pipeline.py --resume with_collection_20250101_120000
 """
 
 import argparse
+import codecs
 import json
 import os
 import sys
+import time
 import uuid
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterable, Iterator, Optional
 
 import numpy as np
 import requests
 
+from checkpoint import RunCheckpoint
+from embedding_store import EMBEDDING_STORE, REFERENCE_CSV, EmbeddingStore, load_references
+from embeddings import EmbeddingClient
+from similarity import normalize_rows, rowwise_cosine, score_stats, similarity_matrix
+
 # Configuration
 THEON_API_URL = os.environ.get("THEON_API_URL", "http://localhost:8080")
 THEON_API_TOKEN = os.environ.get("THEON_API_TOKEN", "")
@@ -30,6 +40,8 @@ GREENPT_API_KEY = os.environ.get("GREENPT_API_KEY", "")
 GREENPT_API_URL = os.environ.get("GREENPT_API_URL", "https://api.greenpt.ai/v1")
 DATASET_FILE = os.environ.get("DATASET_FILE", "./golden/evaluation_dataset.json")
 OUTPUT_DIR = os.environ.get("OUTPUT_DIR", "./evaluation_results")
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", "64"))
+EVAL_CONCURRENCY = int(os.environ.get("EVAL_CONCURRENCY", "4"))
 
 
 @dataclass
@@ -43,38 +55,23 @@ class EvaluationResult:
     response_time: float
     collection_used: Optional[str]
     source_url: str
+    error: Optional[str] = None
+    time_to_first_token: Optional[float] = None
+    nearest_reference: Optional[dict] = None
 
 
-def get_embedding(text: str) -> list[float]:
-    """Get embedding from GreenPT API."""
-    response = requests.post(
-        f"{GREENPT_API_URL}/embeddings",
-        headers={
-            "Authorization": f"Bearer {GREENPT_API_KEY}",
-            "Content-Type": "application/json",
-        },
-        json={
-            "model": "green-embedding",
-            "input": text,
-            "encoding_format": "float",
-        },
-        timeout=30,
-    )
-    response.raise_for_status()
-    return response.json()["data"][0]["embedding"]
-
-
-def cosine_similarity(vec1: list[float], vec2: list[float]) -> float:
-    """Calculate cosine similarity between two vectors."""
-    a = np.array(vec1)
-    b = np.array(vec2)
-    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+def call_theon_api(question: str, collections: list[str]) -> tuple[str, str, float, Optional[float]]:
+    """Call Theon API.
 
+    Returns the answer text, the raw streamed body, the total duration and the
+    time to the first content token (None if no content arrived).
+    """
+    decoder, duration, time_to_first_token = stream_theon_chat(question, collections)
+    return decoder.content, decoder.raw, duration, time_to_first_token
 
-def call_theon_api(question: str, collections: list[str]) -> tuple[str, float]:
-    """Call Theon API and return response text and duration."""
-    import time
 
+def stream_theon_chat(question: str, collections: list[str]) -> tuple["StreamDecoder", float, Optional[float]]:
+    """Stream one Theon chat completion into a StreamDecoder; returns it with duration and TTFT."""
     payload = {
         "messages": [{"role": "user", "content": question}],
         "chat_id": f"eval_{uuid.uuid4()}",
@@ -93,59 +90,129 @@ def call_theon_api(question: str, collections: list[str]) -> tuple[str, float]:
         timeout=120,
         stream=True,
     )
+    response.raise_for_status()
     
-    # Collect streamed response
-    full_response = ""
-    for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
-        if chunk:
-            full_response += chunk
+    decoder = StreamDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    time_to_first_token = None
+    for chunk in response.iter_content(chunk_size=None):
+        if not chunk:
+            continue
+        decoder.feed(text_decoder.decode(chunk))
+        if time_to_first_token is None and decoder.content_parts:
+            time_to_first_token = time.time() - start
+    decoder.feed(text_decoder.decode(b"", final=True))
+    decoder.close()
     
     duration = time.time() - start
-    return full_response, duration
+    return decoder, duration, time_to_first_token
 
 
-def extract_answer_from_stream(stream_response: str) -> str:
-    """Extract the actual answer text from Theon stream response.
-    
+SOURCE_KEYS = ("sources", "sources_db", "sources_web")
+
+
+class StreamDecoder:
+    """Incremental parser for Theon's stream of concatenated JSON objects.
+
     Theon streams JSON objects that may be concatenated without newlines:
     {"message": {"content": "..."}}{"message": {"content": "..."}}...
+    Objects are decoded with raw_decode as soon as their closing brace arrives; OpenAI-style
+    {"choices": [{"delta": {"content": "..."}}]} chunks and "data:" prefixes are also accepted.
+    Retrieved sources streamed as {"sources": [...]} (or sources_db / sources_web) are
+    collected in `sources`.
     """
-    import re
-    
-    content_parts = []
-    
-    # Find all JSON objects matching {"message": {"content": "..."}}
-    # This handles both newline-separated and concatenated JSON
-    pattern = r'\{"message":\s*\{"content":\s*"((?:[^"\\]|\\.)*)"\}\}'
-    matches = re.findall(pattern, stream_response)
-    
-    for match in matches:
-        # Unescape JSON string escapes
-        content = match.replace('\\"', '"').replace('\\n', '\n').replace('\\\\', '\\')
-        content_parts.append(content)
-    
-    if content_parts:
-        return "".join(content_parts)
-    
-    # Fallback: try line-by-line parsing for other formats
-    for line in stream_response.split("\n"):
-        line = line.strip()
-        if not line:
-            continue
-        try:
-            data = json.loads(line)
-            if "message" in data and isinstance(data["message"], dict):
-                content = data["message"].get("content", "")
-                if content:
-                    content_parts.append(content)
-            elif "choices" in data:
-                delta = data["choices"][0].get("delta", {})
-                if "content" in delta:
-                    content_parts.append(delta["content"])
-        except json.JSONDecodeError:
-            continue
-    
-    return "".join(content_parts)
+
+    def __init__(self):
+        self.content_parts: list[str] = []
+        self.sources: list = []
+        self._raw_parts: list[str] = []
+        self._buffer = ""
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, text: str) -> None:
+        if not text:
+            return
+        self._raw_parts.append(text)
+        self._buffer += text
+        self._drain()
+
+    def close(self) -> None:
+        self._drain()
+
+    @property
+    def content(self) -> str:
+        return "".join(self.content_parts)
+
+    @property
+    def raw(self) -> str:
+        return "".join(self._raw_parts)
+
+    def _drain(self) -> None:
+        while True:
+            self._buffer = self._buffer.lstrip()
+            if self._buffer.startswith("data:"):
+                self._buffer = self._buffer[5:].lstrip()
+            if not self._buffer:
+                return
+            if not self._buffer.startswith("{"):
+                # Skip anything that is not an object, e.g. "[DONE]" or stray text.
+                next_object = self._buffer.find("{")
+                self._buffer = self._buffer[next_object:] if next_object != -1 else ""
+                continue
+            if self._object_end() == -1:
+                # The object may still be completed by the next chunk.
+                return
+            try:
+                data, end = self._decoder.raw_decode(self._buffer)
+            except json.JSONDecodeError:
+                self._buffer = self._buffer[1:]
+                continue
+            self._buffer = self._buffer[end:]
+            self._handle(data)
+
+    def _object_end(self) -> int:
+        """Index just past the object starting the buffer, or -1 if it is not complete yet."""
+        depth = 0
+        in_string = escaped = False
+        for index, char in enumerate(self._buffer):
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char in "{[":
+                depth += 1
+            elif char in "}]":
+                depth -= 1
+                if depth == 0:
+                    return index + 1
+        return -1
+
+    def _handle(self, data) -> None:
+        if not isinstance(data, dict):
+            return
+        content = None
+        if isinstance(data.get("message"), dict):
+            content = data["message"].get("content")
+        elif data.get("choices"):
+            content = (data["choices"][0].get("delta") or {}).get("content")
+        if isinstance(content, str) and content:
+            self.content_parts.append(content)
+        for key in SOURCE_KEYS:
+            if isinstance(data.get(key), list):
+                self.sources.extend(data[key])
+
+
+def extract_answer_from_stream(stream_response: str) -> str:
+    """Extract the actual answer text from a complete Theon stream response."""
+    decoder = StreamDecoder()
+    decoder.feed(stream_response)
+    decoder.close()
+    return decoder.content
 
 
 def load_dataset(path: str) -> list[dict]:
@@ -164,67 +231,201 @@ def evaluate_question(question_data: dict, use_collection: bool) -> EvaluationRe
     collections = [dataset] if use_collection else []
     collection_display = dataset if use_collection else None
     
-    print(f"  Calling Theon API...")
-    raw_response, response_time = call_theon_api(question, collections)
-    response = extract_answer_from_stream(raw_response)
+    response, raw_response, response_time, time_to_first_token = call_theon_api(question, collections)
     
     if not response.strip():
         response = raw_response
     
-    print(f"  Getting embeddings...")
-    try:
-        response_embedding = get_embedding(response[:8000])
-        ground_truth_embedding = get_embedding(ground_truth[:8000])
-        similarity = cosine_similarity(response_embedding, ground_truth_embedding)
-    except Exception as e:
-        print(f"  Warning: Embedding failed: {e}")
-        similarity = 0.0
-    
     return EvaluationResult(
         question_id=question_data["question_id"],
         dataset=dataset,
         question=question,
         ground_truth=ground_truth,
         response=response,
-        similarity_score=similarity,
+        similarity_score=0.0,
         response_time=response_time,
+        time_to_first_token=time_to_first_token,
         collection_used=collection_display,
         source_url=question_data["source_url"],
     )
 
 
-def generate_markdown_report(
+def failed_result(question_data: dict, use_collection: bool, error: Exception) -> EvaluationResult:
+    """Placeholder result for a question whose Theon call failed, so the run can continue."""
+    return EvaluationResult(
+        question_id=question_data["question_id"],
+        dataset=question_data["dataset"],
+        question=question_data["question"],
+        ground_truth=question_data["ground_truth"],
+        response="",
+        similarity_score=0.0,
+        response_time=0.0,
+        collection_used=question_data["dataset"] if use_collection else None,
+        source_url=question_data["source_url"],
+        error=f"{type(error).__name__}: {error}",
+    )
+
+
+def evaluate_questions(
+    questions: list[dict],
+    use_collection: bool,
+    concurrency: int,
+    on_result: Optional[Callable[[EvaluationResult], None]] = None,
+) -> list[EvaluationResult]:
+    """Evaluate questions on a thread pool; results keep the dataset order.
+
+    on_result is called (from the calling thread) as soon as each question finishes.
+    """
+    results: list[Optional[EvaluationResult]] = [None] * len(questions)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {executor.submit(evaluate_question, q, use_collection): i for i, q in enumerate(questions)}
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+                status = f"{results[i].response_time:.2f}s"
+            except Exception as e:
+                results[i] = failed_result(questions[i], use_collection, e)
+                status = f"FAILED ({results[i].error})"
+            print(f"[{done}/{len(questions)}] {questions[i]['question'][:60]}... {status}")
+            if on_result:
+                on_result(results[i])
+    return results
+
+
+def score_results(
     results: list[EvaluationResult],
+    client: EmbeddingClient,
+    references: Optional[list[dict]] = None,
+) -> Optional[np.ndarray]:
+    """Embed responses, ground truths and references in batched requests and score them.
+
+    Sets each result's similarity score (row-wise cosine against its ground truth) and,
+    when references are given, its nearest reference. Returns the full
+    response x reference similarity matrix, or None without references.
+    """
+    scored = [r for r in results if r.error is None]
+    references = references or []
+    texts = [r.response for r in scored] + [r.ground_truth for r in scored] + [ref["text"] for ref in references]
+    try:
+        vectors = client.embed(texts, allow_partial=True)
+    except Exception as e:
+        print(f"  Warning: Embedding failed: {e}")
+        vectors = [None] * len(texts)
+
+    n = len(scored)
+    responses, response_ok = normalize_rows(vectors[:n])
+    ground_truths, ground_truth_ok = normalize_rows(vectors[n : 2 * n])
+    # Only rows with both embeddings are compared; when one side failed entirely its
+    # matrix has width 0, so the two are not even the same shape.
+    scores = np.zeros(n, dtype=np.float32)
+    both_ok = response_ok & ground_truth_ok
+    if both_ok.any() and responses.shape[1] == ground_truths.shape[1]:
+        scores[both_ok] = rowwise_cosine(responses[both_ok], ground_truths[both_ok])
+    for result, score in zip(scored, scores):
+        result.similarity_score = float(score)
+
+    if not references or not n:
+        return None
+    reference_matrix, reference_ok = normalize_rows(vectors[2 * n :])
+    if reference_matrix.shape[1] != responses.shape[1]:
+        return None
+    matrix = similarity_matrix(responses, reference_matrix)
+    matrix[:, ~reference_ok] = np.nan
+    for i, result in enumerate(scored):
+        if not response_ok[i] or not reference_ok.any():
+            continue
+        j = int(np.nanargmax(matrix[i]))
+        result.nearest_reference = {
+            "id": references[j]["id"],
+            "question": references[j]["question"],
+            "source": references[j]["source"],
+            "score": float(matrix[i, j]),
+            "is_ground_truth": references[j]["text"] == result.ground_truth,
+        }
+    return matrix
+
+
+class CheckpointResults:
+    """Re-iterable view of the results in a checkpoint; each pass streams from disk.
+
+    Records are turned back into result_type (EvaluationResult, or evaluate_ragas' RagasResult).
+    """
+
+    def __init__(self, checkpoint: RunCheckpoint, order: Optional[list] = None, result_type: type = EvaluationResult):
+        self.checkpoint = checkpoint
+        self.order = order
+        self.result_type = result_type
+
+    def __iter__(self) -> Iterator:
+        for record in self.checkpoint.iter_results(self.order):
+            yield self.result_type(**record)
+
+
+def score_checkpoint(
+    checkpoint: RunCheckpoint,
+    order: list,
+    client: EmbeddingClient,
+    references: Optional[list[dict]] = None,
+) -> tuple[Optional[np.ndarray], list[str]]:
+    """Score every result in the checkpoint and append the scores to it.
+
+    Returns the response x reference matrix and the question ids of its rows.
+    """
+    results = list(CheckpointResults(checkpoint, order))
+    matrix = score_results(results, client, references)
+    for result in results:
+        checkpoint.append_score(
+            result.question_id,
+            {"similarity_score": result.similarity_score, "nearest_reference": result.nearest_reference},
+        )
+    return matrix, [str(r.question_id) for r in results if r.error is None]
+
+
+def dataset_stats(results: Iterable[EvaluationResult]) -> dict:
+    """Similarity stats overall and per dataset.
+
+    Failed questions have no real score: they are left out of avg/min/max/count and
+    counted separately as "failed".
+    """
+    pairs, failed = [], []
+    for r in results:
+        (failed if r.error else pairs).append((r.similarity_score, r.dataset))
+    scores = np.array([score for score, _ in pairs], dtype=np.float32)
+    datasets = np.array([dataset for _, dataset in pairs])
+    stats = score_stats(scores, datasets, ["bzk_pilot", "omgevingswet"])
+    for name, row in stats.items():
+        row["failed"] = sum(1 for _, dataset in failed if name in ("all", dataset))
+    return stats
+
+
+def generate_markdown_report(
+    results: Iterable[EvaluationResult],
     mode: str,
     output_path: Path,
 ) -> None:
-    """Generate markdown report with results."""
-    
-    bzk_results = [r for r in results if r.dataset == "bzk_pilot"]
-    omgevingswet_results = [r for r in results if r.dataset == "omgevingswet"]
-    
-    def calc_stats(res: list[EvaluationResult]) -> tuple[float, float, float]:
-        if not res:
-            return 0.0, 0.0, 0.0
-        scores = [r.similarity_score for r in res]
-        return np.mean(scores), np.min(scores), np.max(scores)
+    """Generate markdown report with results.
+
+    results is iterated twice (summary, then details), so it may be a CheckpointResults.
+    """
     
-    all_avg, all_min, all_max = calc_stats(results)
-    bzk_avg, bzk_min, bzk_max = calc_stats(bzk_results)
-    omg_avg, omg_min, omg_max = calc_stats(omgevingswet_results)
+    stats = dataset_stats(results)
+    nearest = [r.nearest_reference["is_ground_truth"] for r in results if r.nearest_reference]
     
     with open(output_path, "w") as f:
         f.write(f"# Theon RAG Evaluation Report\n\n")
         f.write(f"**Mode:** {mode}\n")
         f.write(f"**Date:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"**Total Questions:** {len(results)}\n\n")
+        f.write(f"**Total Questions:** {stats['all']['count'] + stats['all']['failed']}\n\n")
         
         f.write("## Summary\n\n")
-        f.write("| Dataset | Questions | Avg Similarity | Min | Max |\n")
-        f.write("|---------|-----------|----------------|-----|-----|\n")
-        f.write(f"| **All** | {len(results)} | {all_avg:.4f} | {all_min:.4f} | {all_max:.4f} |\n")
-        f.write(f"| BZK | {len(bzk_results)} | {bzk_avg:.4f} | {bzk_min:.4f} | {bzk_max:.4f} |\n")
-        f.write(f"| Omgevingswet | {len(omgevingswet_results)} | {omg_avg:.4f} | {omg_min:.4f} | {omg_max:.4f} |\n")
+        f.write("| Dataset | Scored | Failed | Avg Similarity | Min | Max |\n")
+        f.write("|---------|--------|--------|----------------|-----|-----|\n")
+        for label, key in (("**All**", "all"), ("BZK", "bzk_pilot"), ("Omgevingswet", "omgevingswet")):
+            row = stats[key]
+            f.write(f"| {label} | {row['count']} | {row['failed']} | {row['avg']:.4f} | {row['min']:.4f} | {row['max']:.4f} |\n")
+        if nearest:
+            f.write(f"\n**Closest to own ground truth:** {sum(nearest)}/{len(nearest)} responses\n")
         f.write("\n---\n\n")
         
         f.write("## Detailed Results\n\n")
@@ -233,8 +434,14 @@ def generate_markdown_report(
             f.write(f"### Question {i}: {result.question}\n\n")
             f.write(f"**Dataset:** {result.dataset}\n")
             f.write(f"**Collection used:** {result.collection_used or 'None'}\n")
-            f.write(f"**Similarity Score:** {result.similarity_score:.4f}\n")
-            f.write(f"**Response Time:** {result.response_time:.2f}s\n\n")
+            f.write(f"**Similarity Score:** {'n/a (failed)' if result.error else f'{result.similarity_score:.4f}'}\n")
+            if result.nearest_reference and not result.nearest_reference["is_ground_truth"]:
+                ref = result.nearest_reference
+                f.write(f"**Nearest Reference:** {ref['question']} ({ref['source']}, {ref['score']:.4f})\n")
+            ttft = f"{result.time_to_first_token:.2f}s" if result.time_to_first_token is not None else "n/a"
+            f.write(f"**Response Time:** {result.response_time:.2f}s (first token after {ttft})\n\n")
+            if result.error:
+                f.write(f"**Error:** {result.error}\n\n")
             
             f.write("#### Theon Response\n\n")
             f.write(f"{result.response}\n\n")
@@ -247,114 +454,163 @@ def generate_markdown_report(
 
 
 def generate_json_report(
-    results: list[EvaluationResult],
+    results: Iterable[EvaluationResult],
     mode: str,
     output_path: Path,
+    wall_time: float = 0.0,
+    concurrency: int = 1,
 ) -> None:
-    """Generate JSON report with results."""
-    
-    bzk_results = [r for r in results if r.dataset == "bzk_pilot"]
-    omgevingswet_results = [r for r in results if r.dataset == "omgevingswet"]
+    """Generate JSON report with results.
+
+    Summary stats come from a first pass; results are then written one at a time, so
+    results may be a CheckpointResults that streams from disk.
+    """
     
-    def calc_stats(res: list[EvaluationResult]) -> dict:
-        if not res:
-            return {"avg": 0.0, "min": 0.0, "max": 0.0, "count": 0}
-        scores = [r.similarity_score for r in res]
-        return {
-            "avg": float(np.mean(scores)),
-            "min": float(np.min(scores)),
-            "max": float(np.max(scores)),
-            "count": len(res),
-        }
+    total = failed = 0
+    response_times, ttfts = [], []
+    for r in results:
+        total += 1
+        if r.error:
+            failed += 1
+            continue
+        response_times.append(r.response_time)
+        if r.time_to_first_token is not None:
+            ttfts.append(r.time_to_first_token)
     
     report = {
         "metadata": {
             "mode": mode,
             "timestamp": datetime.now().isoformat(),
-            "total_questions": len(results),
+            "total_questions": total,
+            "failed_questions": failed,
+            "concurrency": concurrency,
+            "wall_time": round(wall_time, 2),
         },
-        "summary": {
-            "all": calc_stats(results),
-            "bzk_pilot": calc_stats(bzk_results),
-            "omgevingswet": calc_stats(omgevingswet_results),
+        "summary": dataset_stats(results),
+        "latency": {
+            "response_time_avg": float(np.mean(response_times)) if response_times else 0.0,
+            "time_to_first_token_avg": float(np.mean(ttfts)) if ttfts else None,
+            "time_to_first_token_p95": float(np.percentile(ttfts, 95)) if ttfts else None,
         },
-        "results": [
-            {
-                "question_id": r.question_id,
-                "dataset": r.dataset,
-                "question": r.question,
-                "ground_truth": r.ground_truth,
-                "response": r.response,
-                "similarity_score": r.similarity_score,
-                "response_time": r.response_time,
-                "collection_used": r.collection_used,
-                "source_url": r.source_url,
-            }
-            for r in results
-        ],
     }
     
+    write_json_report(report, results, output_path)
+
+
+def write_json_report(report: dict, results: Iterable, output_path: Path) -> None:
+    """Write report with a "results" list, one result (a dataclass) at a time."""
     with open(output_path, "w") as f:
-        json.dump(report, f, indent=2, ensure_ascii=False)
+        # Write everything but the closing brace, then stream the results list.
+        f.write(json.dumps(report, indent=2, ensure_ascii=False)[:-2] + ',\n  "results": [')
+        for i, r in enumerate(results):
+            item = json.dumps(asdict(r), indent=2, ensure_ascii=False).replace("\n", "\n    ")
+            f.write(("," if i else "") + "\n    " + item)
+        f.write("\n  ]\n}\n")
 
 
 def main():
     parser = argparse.ArgumentParser(description="Theon RAG Evaluation Pipeline")
-    group = parser.add_mutually_exclusive_group(required=True)
+    group = parser.add_mutually_exclusive_group()
     group.add_argument("--with-collection", action="store_true", help="Use appropriate collection per question")
     group.add_argument("--no-collection", action="store_true", help="Don't use any collection")
+    group.add_argument("--resume", metavar="RUN_ID", help="Resume a run from its checkpoint, skipping finished questions")
     parser.add_argument("--single", action="store_true", help="Only evaluate first question")
+    parser.add_argument("--concurrency", type=int, default=EVAL_CONCURRENCY, help="Questions evaluated in parallel")
+    parser.add_argument("--no-reference-matrix", action="store_true", help="Skip nearest-reference diagnostics")
+    parser.add_argument("--no-embedding-store", action="store_true", help="Don't reuse stored embeddings")
     args = parser.parse_args()
     
+    if not (args.with_collection or args.no_collection or args.resume):
+        parser.error("one of --with-collection, --no-collection or --resume is required")
+    
     if not THEON_API_TOKEN:
         print("Error: THEON_API_TOKEN environment variable not set")
         sys.exit(1)
     
-    mode = "with_collection" if args.with_collection else "no_collection"
-    use_collection = args.with_collection
+    output_dir = Path(OUTPUT_DIR)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    if args.resume:
+        run_id = args.resume
+        checkpoint = RunCheckpoint(output_dir / f"{run_id}.checkpoint.jsonl")
+        if not checkpoint.exists():
+            print(f"Error: no checkpoint found at {checkpoint.path}")
+            sys.exit(1)
+        run = checkpoint.metadata()
+        mode, single = run["mode"], run.get("single", False)
+    else:
+        mode = "with_collection" if args.with_collection else "no_collection"
+        single = args.single
+        run_id = f"{mode}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        checkpoint = RunCheckpoint.create(
+            output_dir / f"{run_id}.checkpoint.jsonl",
+            {"run_id": run_id, "mode": mode, "single": single, "dataset_file": DATASET_FILE},
+        )
+    use_collection = mode == "with_collection"
     
     print(f"Loading dataset from {DATASET_FILE}...")
     questions = load_dataset(DATASET_FILE)
     
-    if args.single:
+    if single:
         questions = questions[:1]
         print("Running in single-question mode")
     
-    print(f"Evaluating {len(questions)} questions ({mode})...\n")
+    order = [q["question_id"] for q in questions]
+    completed = checkpoint.completed_ids()
+    remaining = [q for q in questions if q["question_id"] not in completed]
+    if args.resume:
+        print(f"Resuming {run_id}: {len(questions) - len(remaining)} questions already done")
     
-    results = []
-    for i, q in enumerate(questions, 1):
-        print(f"[{i}/{len(questions)}] {q['question'][:60]}...")
-        result = evaluate_question(q, use_collection)
-        results.append(result)
-        print(f"  Score: {result.similarity_score:.4f}\n")
+    print(f"Evaluating {len(remaining)} questions ({mode}, concurrency {args.concurrency})...")
+    print(f"Checkpoint: {checkpoint.path}\n")
     
-    output_dir = Path(OUTPUT_DIR)
-    output_dir.mkdir(parents=True, exist_ok=True)
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    md_path = output_dir / f"{mode}_{timestamp}.md"
-    json_path = output_dir / f"{mode}_{timestamp}.json"
+    start = time.time()
+    evaluate_questions(remaining, use_collection, args.concurrency, on_result=lambda r: checkpoint.append_result(asdict(r)))
+
+    store = None if args.no_embedding_store else EmbeddingStore(EMBEDDING_STORE)
+    client = EmbeddingClient(GREENPT_API_URL, GREENPT_API_KEY, batch_size=EMBEDDING_BATCH_SIZE, store=store)
+    references = [] if args.no_reference_matrix else load_references(DATASET_FILE, REFERENCE_CSV)
+    print(f"\nGetting embeddings for {len(questions)} responses, ground truths and {len(references)} references...")
+    matrix, matrix_ids = score_checkpoint(checkpoint, order, client, references)
+    stored = f", {store.hits} reused from {EMBEDDING_STORE}" if store else ""
+    print(f"  {client.requests_sent} embedding request(s){stored}\n")
+    wall_time = time.time() - start
+    
+    results = CheckpointResults(checkpoint, order)
+    md_path = output_dir / f"{run_id}.md"
+    json_path = output_dir / f"{run_id}.json"
+    matrix_path = output_dir / f"{run_id}_similarity.npz"
     
     print("Generating reports...")
     generate_markdown_report(results, mode, md_path)
-    generate_json_report(results, mode, json_path)
-    
-    all_scores = [r.similarity_score for r in results]
-    bzk_scores = [r.similarity_score for r in results if r.dataset == "bzk_pilot"]
-    omg_scores = [r.similarity_score for r in results if r.dataset == "omgevingswet"]
+    generate_json_report(results, mode, json_path, wall_time, args.concurrency)
+    if matrix is not None:
+        np.savez_compressed(
+            matrix_path,
+            similarity=matrix,
+            question_ids=np.array(matrix_ids),
+            reference_ids=np.array([ref["id"] for ref in references]),
+        )
+    
+    stats = dataset_stats(results)
+    failed = stats["all"]["failed"]
     
     print("\n" + "=" * 50)
     print("EVALUATION COMPLETE")
     print("=" * 50)
-    print(f"\nOverall Average: {np.mean(all_scores):.4f}")
-    if bzk_scores:
-        print(f"BZK Average:     {np.mean(bzk_scores):.4f}")
-    if omg_scores:
-        print(f"Omgevingswet:    {np.mean(omg_scores):.4f}")
+    print(f"\nOverall Average: {stats['all']['avg']:.4f}")
+    if failed:
+        print(f"Failed:          {failed}/{stats['all']['count'] + failed} (retry with --resume {run_id})")
+    if stats["bzk_pilot"]["count"]:
+        print(f"BZK Average:     {stats['bzk_pilot']['avg']:.4f}")
+    if stats["omgevingswet"]["count"]:
+        print(f"Omgevingswet:    {stats['omgevingswet']['avg']:.4f}")
+    print(f"Wall time:       {wall_time:.1f}s")
     print(f"\nReports saved to:")
     print(f"  Markdown: {md_path}")
     print(f"  JSON:     {json_path}")
+    if matrix is not None:
+        print(f"  Matrix:   {matrix_path}")
 
 
 if __name__ == "__main__":
@@ -4,31 +4,83 @@ Theon RAG Evaluation with RAGAS
 
 Evaluates Theon responses using RAGAS metrics:
 - Answer Relevancy
-- Faithfulness  
+- Faithfulness
 - Context Precision
 - Context Recall
 
-Requires: pip install ragas
+Theon responses and retrieved contexts are fetched concurrently and checkpointed
+(see checkpoint.py), so --resume reuses fetched responses. Embeddings go through the
+persistent embedding store (see embedding_store.py). Contexts are the sources Theon
+streams with its answer ({"sources": [...]}); when the stream carries none they are
+fetched from Theon's sources endpoint (retrieve_sources, THEON_SOURCES_PATH). Questions
+that still have no contexts are reported and scored on answer relevancy only.
+
+Requires: pip install ragas datasets langchain-openai
 
 Usage:
     python evaluate_ragas.py --with-collection [--single]
     python evaluate_ragas.py --no-collection [--single]
+    python evaluate_ragas.py --with-collection --concurrency 8 --workers 8 --batch-size 16
+    python evaluate_ragas.py --resume ragas_with_collection_20250101_120000
 """
 
 import argparse
 import json
+import math
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
 from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+import requests
+
+from checkpoint import RunCheckpoint
+from embedding_store import EMBEDDING_STORE, EmbeddingStore
+from embeddings import EmbeddingClient
+from evaluate_pipeline import EVAL_CONCURRENCY, SOURCE_KEYS, CheckpointResults, stream_theon_chat, write_json_report
+from similarity import score_stats
 
 # Configuration
 THEON_API_URL = os.environ.get("THEON_API_URL", "http://localhost:8080")
 THEON_API_TOKEN = os.environ.get("THEON_API_TOKEN", "")
+THEON_SOURCES_PATH = os.environ.get("THEON_SOURCES_PATH", "/api/generation/sources")
 GREENPT_API_KEY = os.environ.get("GREENPT_API_KEY", "")
 GREENPT_API_URL = os.environ.get("GREENPT_API_URL", "https://api.greenpt.ai/v1")
 DATASET_FILE = os.environ.get("DATASET_FILE", "./evaluation_dataset.json")
 OUTPUT_DIR = os.environ.get("OUTPUT_DIR", "./evaluation_results")
+RAGAS_WORKERS = int(os.environ.get("RAGAS_WORKERS", "8"))
+RAGAS_BATCH_SIZE = int(os.environ.get("RAGAS_BATCH_SIZE", "16"))
+RAGAS_TIMEOUT = int(os.environ.get("RAGAS_TIMEOUT", "180"))
+
+METRICS = ("faithfulness", "answer_relevancy", "context_precision", "context_recall")
+METRIC_LABELS = {
+    "faithfulness": "Faithfulness",
+    "answer_relevancy": "Answer Relevancy",
+    "context_precision": "Context Precision",
+    "context_recall": "Context Recall",
+}
+DATASETS = ["bzk_pilot", "omgevingswet"]
+
+
+@dataclass
+class RagasResult:
+    question_id: str
+    dataset: str
+    question: str
+    ground_truth: str
+    response: str
+    contexts: list[str]
+    response_time: float
+    collection_used: Optional[str]
+    source_url: str
+    time_to_first_token: Optional[float] = None
+    error: Optional[str] = None
+    scores: dict = field(default_factory=dict)
 
 
 def check_dependencies():
@@ -55,66 +107,336 @@ def load_dataset(path: str) -> list[dict]:
     return data["questions"]
 
 
+def context_text(source) -> str:
+    if isinstance(source, str):
+        return source
+    if isinstance(source, dict):
+        return str(source.get("content") or source.get("text") or source.get("page_content") or "")
+    return ""
+
+
+def fetch_theon_sources(question: str, collections: list[str]) -> list:
+    """Sources Theon retrieves for a question, from its search-only sources endpoint."""
+    response = requests.post(
+        f"{THEON_API_URL}{THEON_SOURCES_PATH}",
+        headers={
+            "Authorization": f"Bearer {THEON_API_TOKEN}",
+            "Content-Type": "application/json",
+        },
+        json={"messages": [{"role": "user", "content": question}], "collections": collections},
+        timeout=120,
+    )
+    response.raise_for_status()
+    data = response.json()
+    if isinstance(data, list):
+        return data
+    if not isinstance(data, dict):
+        raise ValueError(f"unexpected sources response: {type(data).__name__}")
+    return [source for key in SOURCE_KEYS for source in data.get(key) or []]
+
+
+def fetch_question(question_data: dict, use_collection: bool) -> RagasResult:
+    """Get Theon's answer and the contexts it retrieved for one question."""
+    dataset = question_data["dataset"]
+    collections = [dataset] if use_collection else []
+    decoder, response_time, time_to_first_token = stream_theon_chat(question_data["question"], collections)
+    sources = decoder.sources
+    if not sources:
+        # The answer is already in: without contexts it is still scored on answer relevancy.
+        try:
+            sources = fetch_theon_sources(question_data["question"], collections)
+        except (requests.RequestException, ValueError) as e:
+            print(f"  Warning: fetching sources for {question_data['question_id']} failed: {e}")
+            sources = []
+    return RagasResult(
+        question_id=question_data["question_id"],
+        dataset=dataset,
+        question=question_data["question"],
+        ground_truth=question_data["ground_truth"],
+        response=decoder.content or decoder.raw,
+        contexts=[text for text in map(context_text, sources) if text.strip()],
+        response_time=response_time,
+        time_to_first_token=time_to_first_token,
+        collection_used=dataset if use_collection else None,
+        source_url=question_data["source_url"],
+    )
+
+
+def fetch_responses(questions: list[dict], use_collection: bool, concurrency: int, checkpoint: RunCheckpoint) -> None:
+    """Fetch answers on a thread pool and checkpoint each one as soon as it arrives."""
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {executor.submit(fetch_question, q, use_collection): q for q in questions}
+        for done, future in enumerate(as_completed(futures), 1):
+            q = futures[future]
+            try:
+                result = future.result()
+                status = f"{result.response_time:.2f}s, {len(result.contexts)} contexts"
+                if not result.contexts:
+                    status += " (WARNING: no contexts, context metrics will be skipped)"
+            except Exception as e:
+                result = RagasResult(
+                    question_id=q["question_id"],
+                    dataset=q["dataset"],
+                    question=q["question"],
+                    ground_truth=q["ground_truth"],
+                    response="",
+                    contexts=[],
+                    response_time=0.0,
+                    collection_used=q["dataset"] if use_collection else None,
+                    source_url=q["source_url"],
+                    error=f"{type(e).__name__}: {e}",
+                )
+                status = f"FAILED ({result.error})"
+            checkpoint.append_result(asdict(result))
+            print(f"[{done}/{len(questions)}] {q['question'][:60]}... {status}")
+
+
+def build_embeddings(client: EmbeddingClient):
+    """LangChain embeddings backed by the batched client and the persistent store."""
+    from langchain_core.embeddings import Embeddings
+
+    class StoredEmbeddings(Embeddings):
+        def embed_documents(self, texts: list[str]) -> list[list[float]]:
+            return client.embed(texts)
+
+        def embed_query(self, text: str) -> list[float]:
+            return client.embed_one(text)
+
+    return StoredEmbeddings()
+
+
+def run_ragas(results: list[RagasResult], llm, embeddings, workers: int, batch_size: int) -> None:
+    """Score results in place. Rows without contexts only get answer relevancy."""
+    from datasets import Dataset
+    from ragas import evaluate
+    from ragas.metrics import answer_relevancy, context_precision, context_recall, faithfulness
+    from ragas.run_config import RunConfig
+
+    run_config = RunConfig(max_workers=max(1, workers), timeout=RAGAS_TIMEOUT)
+    groups = [
+        ([r for r in results if r.contexts], [faithfulness, answer_relevancy, context_precision, context_recall]),
+        ([r for r in results if not r.contexts], [answer_relevancy]),
+    ]
+    for rows, metrics in groups:
+        if not rows:
+            continue
+        dataset = Dataset.from_dict({
+            "question": [r.question for r in rows],
+            "answer": [r.response for r in rows],
+            "contexts": [r.contexts for r in rows],
+            "ground_truth": [r.ground_truth for r in rows],
+        })
+        scored = evaluate(
+            dataset,
+            metrics=metrics,
+            llm=llm,
+            embeddings=embeddings,
+            run_config=run_config,
+            batch_size=batch_size,
+        ).to_pandas()
+        for row, (_, values) in zip(rows, scored.iterrows()):
+            row.scores = {
+                metric: float(values[metric])
+                for metric in METRICS
+                if metric in values and values[metric] is not None and not math.isnan(values[metric])
+            }
+
+
+def metric_stats(results: Iterable[RagasResult]) -> dict:
+    """Per metric: avg/min/max/count overall and per dataset, ignoring unscored questions."""
+    rows = [(r.dataset, r.scores) for r in results if r.error is None]
+    stats = {}
+    for metric in METRICS:
+        scored = [(dataset, scores[metric]) for dataset, scores in rows if metric in scores]
+        values = np.array([value for _, value in scored], dtype=np.float32)
+        datasets = np.array([dataset for dataset, _ in scored])
+        stats[metric] = score_stats(values, datasets, DATASETS)
+    return stats
+
+
+def count_without_contexts(results: Iterable[RagasResult]) -> int:
+    """Answered questions that got no contexts, so only answer relevancy could be scored."""
+    return sum(1 for r in results if r.error is None and not r.contexts)
+
+
+def generate_markdown_report(results: Iterable[RagasResult], mode: str, output_path: Path) -> None:
+    """Generate markdown report with results (same layout as evaluate_pipeline)."""
+
+    stats = metric_stats(results)
+    total = sum(1 for _ in results)
+
+    with open(output_path, "w") as f:
+        f.write(f"# Theon RAGAS Evaluation Report\n\n")
+        f.write(f"**Mode:** {mode}\n")
+        f.write(f"**Date:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"**Total Questions:** {total}\n")
+        f.write(f"**Without Retrieved Contexts:** {count_without_contexts(results)}\n\n")
+
+        f.write("## Summary\n\n")
+        f.write("| Dataset | " + " | ".join(METRIC_LABELS[m] for m in METRICS) + " |\n")
+        f.write("|---------|" + "|".join("-" * (len(METRIC_LABELS[m]) + 2) for m in METRICS) + "|\n")
+        for label, key in (("**All**", "all"), ("BZK", "bzk_pilot"), ("Omgevingswet", "omgevingswet")):
+            cells = [
+                f"{stats[m][key]['avg']:.4f} (n={stats[m][key]['count']})" if stats[m][key]["count"] else "n/a"
+                for m in METRICS
+            ]
+            f.write(f"| {label} | " + " | ".join(cells) + " |\n")
+        f.write("\n---\n\n")
+
+        f.write("## Detailed Results\n\n")
+
+        for i, result in enumerate(results, 1):
+            f.write(f"### Question {i}: {result.question}\n\n")
+            f.write(f"**Dataset:** {result.dataset}\n")
+            f.write(f"**Collection used:** {result.collection_used or 'None'}\n")
+            for metric in METRICS:
+                if metric in result.scores:
+                    f.write(f"**{METRIC_LABELS[metric]}:** {result.scores[metric]:.4f}\n")
+            f.write(f"**Retrieved Contexts:** {len(result.contexts)}\n")
+            f.write(f"**Response Time:** {result.response_time:.2f}s\n\n")
+            if result.error:
+                f.write(f"**Error:** {result.error}\n\n")
+
+            f.write("#### Theon Response\n\n")
+            f.write(f"{result.response}\n\n")
+
+            f.write("#### Ground Truth\n\n")
+            f.write(f"{result.ground_truth}\n\n")
+
+            f.write(f"**Source:** {result.source_url}\n\n")
+            f.write("---\n\n")
+
+
+def generate_json_report(
+    results: Iterable[RagasResult],
+    mode: str,
+    output_path: Path,
+    wall_time: float = 0.0,
+    concurrency: int = 1,
+) -> None:
+    """Generate JSON report with results (same layout as evaluate_pipeline)."""
+
+    total = sum(1 for _ in results)
+    failed = sum(1 for r in results if r.error)
+    report = {
+        "metadata": {
+            "mode": mode,
+            "framework": "ragas",
+            "timestamp": datetime.now().isoformat(),
+            "total_questions": total,
+            "failed_questions": failed,
+            "questions_without_contexts": count_without_contexts(results),
+            "concurrency": concurrency,
+            "wall_time": round(wall_time, 2),
+        },
+        "summary": metric_stats(results),
+    }
+
+    write_json_report(report, results, output_path)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Theon RAG Evaluation with RAGAS")
-    group = parser.add_mutually_exclusive_group(required=True)
+    group = parser.add_mutually_exclusive_group()
     group.add_argument("--with-collection", action="store_true")
     group.add_argument("--no-collection", action="store_true")
+    group.add_argument("--resume", metavar="RUN_ID", help="Reuse the responses already fetched for this run")
     parser.add_argument("--single", action="store_true")
+    parser.add_argument("--concurrency", type=int, default=EVAL_CONCURRENCY, help="Theon requests in parallel")
+    parser.add_argument("--workers", type=int, default=RAGAS_WORKERS, help="RAGAS max_workers")
+    parser.add_argument("--batch-size", type=int, default=RAGAS_BATCH_SIZE, help="RAGAS batch size")
+    parser.add_argument("--no-embedding-store", action="store_true", help="Don't reuse stored embeddings")
     args = parser.parse_args()
-    
+
+    if not (args.with_collection or args.no_collection or args.resume):
+        parser.error("one of --with-collection, --no-collection or --resume is required")
+
     if not check_dependencies():
         sys.exit(1)
-    
+
     if not THEON_API_TOKEN:
         print("Error: THEON_API_TOKEN environment variable not set")
         sys.exit(1)
-    
-    # Import RAGAS components
-    from ragas import evaluate
-    from ragas.metrics import (
-        answer_relevancy,
-        faithfulness,
-        context_precision,
-        context_recall,
-    )
-    from datasets import Dataset
-    from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-    
-    mode = "with_collection" if args.with_collection else "no_collection"
-    use_collection = args.with_collection
-    
+
+    from langchain_openai import ChatOpenAI
+
+    output_dir = Path(OUTPUT_DIR)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    if args.resume:
+        run_id = args.resume
+        checkpoint = RunCheckpoint(output_dir / f"{run_id}.checkpoint.jsonl")
+        if not checkpoint.exists():
+            print(f"Error: no checkpoint found at {checkpoint.path}")
+            sys.exit(1)
+        run = checkpoint.metadata()
+        mode, single = run["mode"], run.get("single", False)
+    else:
+        mode = "with_collection" if args.with_collection else "no_collection"
+        single = args.single
+        run_id = f"ragas_{mode}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        checkpoint = RunCheckpoint.create(
+            output_dir / f"{run_id}.checkpoint.jsonl",
+            {"run_id": run_id, "mode": mode, "single": single, "dataset_file": DATASET_FILE},
+        )
+    use_collection = mode == "with_collection"
+
     print(f"Loading dataset from {DATASET_FILE}...")
     questions = load_dataset(DATASET_FILE)
-    
-    if args.single:
+
+    if single:
         questions = questions[:1]
-    
-    print(f"Evaluating {len(questions)} questions with RAGAS ({mode})...\n")
-    
+
+    order = [q["question_id"] for q in questions]
+    completed = checkpoint.completed_ids()
+    remaining = [q for q in questions if q["question_id"] not in completed]
+
+    print(f"Fetching {len(remaining)} Theon responses ({mode}, concurrency {args.concurrency})...")
+    print(f"Checkpoint: {checkpoint.path}\n")
+
+    start = time.time()
+    fetch_responses(remaining, use_collection, args.concurrency, checkpoint)
+
     # Configure LLM and embeddings to use GreenPT
     llm = ChatOpenAI(
         openai_api_key=GREENPT_API_KEY,
         openai_api_base=GREENPT_API_URL,
         model_name="green-chat",  # Adjust if different
     )
-    
-    embeddings = OpenAIEmbeddings(
-        openai_api_key=GREENPT_API_KEY,
-        openai_api_base=GREENPT_API_URL,
-        model="green-embedding",
-    )
-    
-    # TODO: Implement full RAGAS evaluation pipeline
-    # This requires:
-    # 1. Getting responses from Theon
-    # 2. Getting retrieved contexts from Theon
-    # 3. Building RAGAS dataset
-    # 4. Running evaluation
-    
-    print("RAGAS evaluation not yet fully implemented.")
-    print("This script will be completed when needed.")
-    print("\nFor now, use evaluate_pipeline.py for cosine similarity evaluation.")
+
+    store = None if args.no_embedding_store else EmbeddingStore(EMBEDDING_STORE)
+    embeddings = build_embeddings(EmbeddingClient(GREENPT_API_URL, GREENPT_API_KEY, store=store))
+
+    results = [r for r in CheckpointResults(checkpoint, order, RagasResult) if r.error is None]
+    print(f"\nRunning RAGAS on {len(results)} responses (workers {args.workers}, batch size {args.batch_size})...")
+    run_ragas(results, llm, embeddings, args.workers, args.batch_size)
+    for result in results:
+        checkpoint.append_score(result.question_id, {"scores": result.scores})
+    wall_time = time.time() - start
+
+    results = CheckpointResults(checkpoint, order, RagasResult)
+    md_path = output_dir / f"{run_id}.md"
+    json_path = output_dir / f"{run_id}.json"
+
+    print("Generating reports...")
+    generate_markdown_report(results, mode, md_path)
+    generate_json_report(results, mode, json_path, wall_time, args.concurrency)
+
+    stats = metric_stats(results)
+
+    print("\n" + "=" * 50)
+    print("RAGAS EVALUATION COMPLETE")
+    print("=" * 50 + "\n")
+    for metric in METRICS:
+        if stats[metric]["all"]["count"]:
+            print(f"{METRIC_LABELS[metric] + ':':19}{stats[metric]['all']['avg']:.4f} (n={stats[metric]['all']['count']})")
+    without_contexts = count_without_contexts(results)
+    if without_contexts:
+        print(f"WARNING: {without_contexts} question(s) without retrieved contexts, scored on answer relevancy only")
+    print(f"Wall time:         {wall_time:.1f}s")
+    print(f"\nReports saved to:")
+    print(f"  Markdown: {md_path}")
+    print(f"  JSON:     {json_path}")
 
 
 if __name__ == "__main__":
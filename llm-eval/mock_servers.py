@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Offline stand-ins for the Theon and GreenPT APIs.
+
+Theon:   POST /api/generation/chat streams concatenated {"message": {"content": ...}} chunks
+         (plus a {"sources": [...]} object when replaying dataset answers),
+         POST /api/generation/sources returns the same {"sources": [...]} object,
+         POST /api/auths/signin returns a token.
+GreenPT: POST /v1/embeddings returns deterministic vectors per input text,
+         POST /v1/chat/completions returns synthetic judge output (score, fused JSON, claim verdict, text).
+Both:    GET /_stats returns request/error counts per path, POST /_stats/reset clears them.
+
+Latency, chunking and error rates are configurable so evaluate_pipeline.py and the
+benchmark harness (benchmark.py) can be run reproducibly without live services.
+Chat answers are replayed from a recording (JSON/JSONL of {"question", "chunks" | "answer"}),
+or else the ground truth from the dataset, or else synthetic text.
+
+Usage:
+    python mock_servers.py --theon-port 8081 --greenpt-port 8082 --latency 0.3 --error-rate 0.05
+    export THEON_API_URL=http://127.0.0.1:8081 GREENPT_API_URL=http://127.0.0.1:8082/v1
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import numpy as np
+
+FUSED_ALL_MARKER = '"relevance": {"explanation"'
+FUSED_MARKER = '{"explanation": "<toelichting>", "score"'
+CLAIM_MARKER = '"verdict"'
+SCORE_MARKER = "geef een score tussen 0 en 100"
+DIMENSIONS = ("relevance", "usability", "neutrality", "security", "verification")
+
+
+@dataclass
+class MockConfig:
+    latency: float = 0.2            # seconds before the first chunk / before a JSON reply
+    chunk_delay: float = 0.01       # seconds between streamed chunks
+    chunk_words: int = 4            # words per streamed chunk
+    embedding_latency: float = 0.05
+    error_rate: float = 0.0         # fraction of requests answered with 503
+    rate_limit_rate: float = 0.0    # fraction of requests answered with 429 + Retry-After
+    dim: int = 256
+    seed: int = 0
+
+
+class MockState:
+    def __init__(self, config: MockConfig, answers: Optional[dict] = None):
+        self.config = config
+        self.answers = answers or {}
+        self.requests: Counter = Counter()
+        self.errors: Counter = Counter()
+        self._random = random.Random(config.seed)
+        self._lock = threading.Lock()
+
+    def record(self, path: str) -> Optional[int]:
+        """Count the request and decide whether it fails (returns the status code)."""
+        with self._lock:
+            self.requests[path] += 1
+            roll = self._random.random()
+        if roll < self.config.rate_limit_rate:
+            status = 429
+        elif roll < self.config.rate_limit_rate + self.config.error_rate:
+            status = 503
+        else:
+            return None
+        with self._lock:
+            self.errors[path] += 1
+        return status
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": dict(self.requests), "errors": dict(self.errors)}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests.clear()
+            self.errors.clear()
+
+
+def embedding(text: str, dim: int) -> list[float]:
+    """Deterministic unit vector per text, so identical texts score 1.0."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def judge_reply(system_prompt: str, user_prompt: str) -> str:
+    score = 50 + int(hashlib.sha256(user_prompt.encode("utf-8")).hexdigest(), 16) % 50
+    if FUSED_ALL_MARKER in system_prompt:
+        return json.dumps({d: {"explanation": f"Mock {d}.", "score": score} for d in DIMENSIONS})
+    if FUSED_MARKER in system_prompt:
+        return json.dumps({"explanation": "Mock toelichting.", "score": score})
+    if CLAIM_MARKER in system_prompt:
+        return json.dumps({"verdict": ("ja", "deels", "nee")[score % 3], "source": "", "explanation": "Mock oordeel."})
+    if SCORE_MARKER in system_prompt:
+        return str(score)
+    return "**Mock evaluatie:** het antwoord behandelt de vraag."
+
+
+def answer_chunks(state: MockState, question: str) -> list[str]:
+    recorded = state.answers.get(question)
+    if isinstance(recorded, list):
+        return recorded
+    text = recorded or f"Dit is een gesimuleerd antwoord op de vraag: {question}"
+    words = text.split(" ")
+    size = max(1, state.config.chunk_words)
+    return [" ".join(words[i : i + size]) + (" " if i + size < len(words) else "") for i in range(0, len(words), size)]
+
+
+def make_handler(state: MockState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _read_json(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b"{}"
+            try:
+                return json.loads(body)
+            except json.JSONDecodeError:
+                return {}
+
+        def _send_json(self, payload, status: int = 200, headers: Optional[dict] = None) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _fail(self, status: int) -> None:
+            headers = {"Retry-After": "1"} if status == 429 else None
+            self._send_json({"error": "mock failure"}, status, headers)
+
+        def do_GET(self):
+            if self.path == "/_stats":
+                self._send_json(state.stats())
+            else:
+                self._send_json({"error": "not found"}, 404)
+
+        def do_POST(self):
+            data = self._read_json()
+            if self.path == "/_stats/reset":
+                state.reset()
+                self._send_json({"ok": True})
+                return
+            if self.path == "/api/auths/signin":
+                self._send_json({"token": "mock-token"})
+                return
+            routes = {
+                "/api/generation/chat": self._chat,
+                "/api/generation/sources": self._sources,
+                "/v1/embeddings": self._embeddings,
+                "/embeddings": self._embeddings,
+                "/v1/chat/completions": self._completions,
+                "/chat/completions": self._completions,
+            }
+            route = routes.get(self.path)
+            if route is None:
+                self._send_json({"error": "not found"}, 404)
+                return
+            status = state.record(self.path)
+            if status:
+                time.sleep(state.config.latency)
+                self._fail(status)
+                return
+            route(data)
+
+        def _chat(self, data: dict) -> None:
+            messages = data.get("messages") or [{}]
+            chunks = answer_chunks(state, messages[-1].get("content", ""))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            time.sleep(state.config.latency)
+            for i, chunk in enumerate(chunks):
+                if i:
+                    time.sleep(state.config.chunk_delay)
+                payload = json.dumps({"message": {"content": chunk}}, ensure_ascii=False).encode("utf-8")
+                self.wfile.write(f"{len(payload):X}\r\n".encode() + payload + b"\r\n")
+                self.wfile.flush()
+            answer = state.answers.get(messages[-1].get("content", ""))
+            if isinstance(answer, str):
+                # Retrieved context for RAGAS-style evaluation: the reference answer itself.
+                payload = json.dumps({"sources": [{"title": "mock", "content": answer}]}, ensure_ascii=False).encode("utf-8")
+                self.wfile.write(f"{len(payload):X}\r\n".encode() + payload + b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _sources(self, data: dict) -> None:
+            messages = data.get("messages") or [{}]
+            answer = state.answers.get(messages[-1].get("content", ""))
+            time.sleep(state.config.latency)
+            self._send_json({"sources": [{"title": "mock", "content": answer}] if isinstance(answer, str) else []})
+
+        def _embeddings(self, data: dict) -> None:
+            inputs = data.get("input") or []
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            time.sleep(state.config.embedding_latency)
+            self._send_json({
+                "object": "list",
+                "model": data.get("model"),
+                "data": [{"object": "embedding", "index": i, "embedding": embedding(text, state.config.dim)} for i, text in enumerate(inputs)],
+            })
+
+        def _completions(self, data: dict) -> None:
+            messages = data.get("messages") or []
+            system_prompt = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+            user_prompt = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+            time.sleep(state.config.latency)
+            self._send_json({
+                "object": "chat.completion",
+                "model": data.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": judge_reply(system_prompt, user_prompt)}, "finish_reason": "stop"}],
+            })
+
+    return Handler
+
+
+def load_answers(recording: Optional[str], dataset_file: Optional[str]) -> dict:
+    """question -> list of chunks (recording) or full answer text (dataset ground truth)."""
+    answers = {}
+    if dataset_file:
+        with open(dataset_file) as f:
+            for q in json.load(f)["questions"]:
+                answers[q["question"]] = q["ground_truth"]
+    if recording:
+        with open(recording) as f:
+            text = f.read()
+        records = json.loads(text) if text.lstrip().startswith("[") else [json.loads(line) for line in text.splitlines() if line.strip()]
+        for record in records:
+            answers[record["question"]] = record.get("chunks") or record.get("answer")
+    return answers
+
+
+class MockServer:
+    """A ThreadingHTTPServer on a background thread; port 0 picks a free port."""
+
+    def __init__(self, state: MockState, host: str = "127.0.0.1", port: int = 0):
+        self.state = state
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(state))
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockServer":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def start_mock_servers(
+    config: MockConfig,
+    answers: Optional[dict] = None,
+    theon_port: int = 0,
+    greenpt_port: int = 0,
+) -> tuple[MockServer, MockServer]:
+    theon = MockServer(MockState(config, answers), port=theon_port).start()
+    greenpt = MockServer(MockState(config), port=greenpt_port).start()
+    return theon, greenpt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Theon and GreenPT servers")
+    parser.add_argument("--theon-port", type=int, default=8081)
+    parser.add_argument("--greenpt-port", type=int, default=8082)
+    parser.add_argument("--latency", type=float, default=MockConfig.latency, help="Seconds before the first chunk / reply")
+    parser.add_argument("--chunk-delay", type=float, default=MockConfig.chunk_delay, help="Seconds between streamed chunks")
+    parser.add_argument("--chunk-words", type=int, default=MockConfig.chunk_words)
+    parser.add_argument("--embedding-latency", type=float, default=MockConfig.embedding_latency)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--dim", type=int, default=MockConfig.dim, help="Embedding dimension")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--recording", help="JSON/JSONL with recorded chat answers per question")
+    parser.add_argument("--dataset", help="Replay ground truths from this evaluation dataset as answers")
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency=args.latency,
+        chunk_delay=args.chunk_delay,
+        chunk_words=args.chunk_words,
+        embedding_latency=args.embedding_latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        dim=args.dim,
+        seed=args.seed,
+    )
+    theon, greenpt = start_mock_servers(config, load_answers(args.recording, args.dataset), args.theon_port, args.greenpt_port)
+    print(f"THEON_API_URL={theon.url}")
+    print(f"GREENPT_API_URL={greenpt.url}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        theon.stop()
+        greenpt.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Vectorized similarity scoring.
+
+Embeddings are stacked into pre-normalized float32 matrices, so row-wise cosine
+similarity is one elementwise product and the full response x reference matrix is
+one matrix product.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+
+def normalize_rows(vectors: list[Optional[list[float]]]) -> tuple[np.ndarray, np.ndarray]:
+    """Stack vectors into an L2-normalized float32 matrix.
+
+    Returns (matrix, valid) where valid marks rows that had a non-zero embedding;
+    missing (None) or zero vectors become zero rows.
+    """
+    dim = next((len(v) for v in vectors if v is not None), 0)
+    matrix = np.zeros((len(vectors), dim), dtype=np.float32)
+    for i, vector in enumerate(vectors):
+        if vector is not None:
+            matrix[i] = vector
+    norms = np.linalg.norm(matrix, axis=1)
+    valid = norms > 0
+    matrix[valid] /= norms[valid, None]
+    return matrix, valid
+
+
+def rowwise_cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Cosine similarity of a[i] and b[i] for normalized matrices."""
+    return np.einsum("ij,ij->i", a, b)
+
+
+def similarity_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Cosine similarity of every row of a against every row of b for normalized matrices."""
+    return a @ b.T
+
+
+def score_stats(scores: np.ndarray, groups: np.ndarray, group_names: list[str]) -> dict:
+    """avg/min/max/count of scores overall ("all") and per group."""
+    stats = {}
+    for name, mask in [("all", np.ones(len(scores), dtype=bool))] + [(g, groups == g) for g in group_names]:
+        selected = scores[mask]
+        if not selected.size:
+            stats[name] = {"avg": 0.0, "min": 0.0, "max": 0.0, "count": 0}
+            continue
+        stats[name] = {
+            "avg": float(selected.mean()),
+            "min": float(selected.min()),
+            "max": float(selected.max()),
+            "count": int(selected.size),
+        }
+    return stats
@@ -0,0 +1,91 @@
+import asyncio
+import hashlib
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from shared_volume.agents.utils.cache_backends import MemoryBackend, SqliteBackend
+
+# "memory" (in-process LRU), "sqlite" (persistent) or "off". Only agent calls that opt in
+# (agent_template(..., cache=True), i.e. the evaluation judges) are cached.
+LLM_CACHE = os.environ.get("LLM_CACHE", "memory")
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", "llm_cache.sqlite3")
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", "0")) or None
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "0"))
+# Part of every cache key, so switching models never serves another model's answers. Read
+# from the environment (the same LLM_NAME the backend config uses) to keep shared_volume
+# independent of the backend package.
+LLM_CACHE_MODEL = os.environ.get("LLM_CACHE_MODEL") or os.environ.get("LLM_NAME", "")
+
+
+def llm_cache_key(system_prompt: str, user_prompt: str, output_type: str, model: str = LLM_CACHE_MODEL) -> str:
+    payload = json.dumps([system_prompt, user_prompt, str(output_type), model], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCallCache:
+    """Raw LLM responses keyed on llm_cache_key. Identical concurrent calls share one in-flight request."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def get_or_call(self, key: str, call: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        cached = await self.backend.aget(key)
+        if cached is not None:
+            self.hits += 1
+            return cached["response"]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await call()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        else:
+            if response:
+                await self.backend.aset(key, {"response": response})
+            future.set_result(response)
+            return response
+        finally:
+            self._inflight.pop(key, None)
+
+    async def invalidate(self, key: str) -> None:
+        """Drop a cached response, e.g. after it failed validation, so the retry asks the LLM again."""
+        await self.backend.adelete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced, "entries": len(self.backend)}
+
+
+def build_llm_cache(backend: str, path: str = "", max_entries: int = 0, ttl: Optional[float] = None) -> Optional[LLMCallCache]:
+    """Build a cache for backend "memory" or "sqlite"; anything else (e.g. "off") disables caching."""
+    if backend == "memory":
+        return LLMCallCache(MemoryBackend(max_entries=max_entries or 4096, ttl=ttl))
+    if backend == "sqlite":
+        return LLMCallCache(SqliteBackend(path or "llm_cache.sqlite3", table="llm_responses", max_entries=max_entries or 100_000, ttl=ttl))
+    return None
+
+
+llm_cache: Optional[LLMCallCache] = build_llm_cache(LLM_CACHE, LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL)
+
+
+def set_llm_cache(cache: Optional[LLMCallCache]) -> None:
+    """Plug in a different cache (or None to disable) for every agent."""
+    global llm_cache
+    llm_cache = cache
+
+
+def get_llm_cache() -> Optional[LLMCallCache]:
+    return llm_cache
@@ -0,0 +1,90 @@
+import json
+import re
+from collections import Counter
+from typing import Any, Dict, Optional
+
+FRACTION_RE = re.compile(r"(\d+(?:\.\d+)?)\s*/\s*(\d+(?:\.\d+)?)")
+NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+CODE_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+CLOSERS = {"{": "}", "[": "]"}
+
+
+class RepairCounters:
+    """Per output type: how many outputs were repaired locally vs. sent back to the LLM."""
+
+    def __init__(self):
+        self.repaired: Counter = Counter()
+        self.retried: Counter = Counter()
+
+    def record_repaired(self, output_type: str) -> None:
+        self.repaired[output_type] += 1
+
+    def record_retried(self, output_type: str) -> None:
+        self.retried[output_type] += 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {"repaired": dict(self.repaired), "retried": dict(self.retried)}
+
+
+repair_counters = RepairCounters()
+
+
+def extract_percentage(response: str) -> Optional[int]:
+    """Pull a 0-100 score out of near-miss output like "Score: 85", "85/100", "17/20" or "0.85"."""
+    fraction = FRACTION_RE.search(response)
+    if fraction:
+        numerator, denominator = float(fraction.group(1)), float(fraction.group(2))
+        if 0 < denominator and numerator <= denominator:
+            return round(numerator / denominator * 100)
+
+    for match in NUMBER_RE.finditer(response):
+        value = float(match.group(0))
+        if "." in match.group(0) and value <= 1:
+            return round(value * 100)
+        if 0 <= value <= 100:
+            return round(value)
+    return None
+
+
+def balance_json(text: str) -> str:
+    """Cut trailing text after the first complete value and close unbalanced strings and brackets."""
+    stack = []
+    in_string = False
+    escaped = False
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in CLOSERS:
+            stack.append(CLOSERS[char])
+        elif char in "}]":
+            if stack and stack[-1] == char:
+                stack.pop()
+            if not stack:
+                return text[: index + 1]
+    if in_string:
+        text += '"'
+    return text + "".join(reversed(stack))
+
+
+def repair_json(response: str) -> Optional[Any]:
+    """Best-effort parse of almost-valid JSON (code fences, trailing commas, unbalanced brackets)."""
+    fenced = CODE_FENCE_RE.search(response)
+    text = fenced.group(1) if fenced else response
+    starts = [i for i in (text.find("["), text.find("{")) if i != -1]
+    if not starts:
+        return None
+    text = TRAILING_COMMA_RE.sub(r"\1", text[min(starts):].strip())
+    text = TRAILING_COMMA_RE.sub(r"\1", balance_json(text))
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return None
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+from enum import Enum
+from typing import Any, Awaitable, Callable, Optional
+
+from shared_volume.agents.utils.rate_limit import AsyncRateLimiter
+
+
+class ErrorKind(str, Enum):
+    RATE_LIMIT = "rate_limit"
+    TRANSIENT = "transient"
+    INVALID_OUTPUT = "invalid_output"
+    FATAL = "fatal"
+
+
+# Only errors that will fail the same way on every attempt are fatal; anything not
+# recognised (httpx/aiohttp connection and protocol errors, ...) is retried as transient.
+FATAL_ERROR_NAMES = ("Authentication", "PermissionDenied", "BadRequest", "NotFound", "Unprocessable")
+
+
+def error_status(exc: BaseException) -> Optional[int]:
+    for candidate in (exc, getattr(exc, "response", None)):
+        for attr in ("status_code", "status"):
+            value = getattr(candidate, attr, None)
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def classify_error(exc: BaseException) -> ErrorKind:
+    status = error_status(exc)
+    name = type(exc).__name__
+    if status == 429 or "RateLimit" in name:
+        return ErrorKind.RATE_LIMIT
+    if (status is not None and status >= 500) or status == 408:
+        return ErrorKind.TRANSIENT
+    if status is not None and 400 <= status < 500:
+        return ErrorKind.FATAL
+    if any(n in name for n in FATAL_ERROR_NAMES):
+        return ErrorKind.FATAL
+    if isinstance(exc, ValueError):
+        return ErrorKind.INVALID_OUTPUT
+    return ErrorKind.TRANSIENT
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Read a Retry-After header (seconds or HTTP date) from the exception or its response."""
+    for candidate in (exc, getattr(exc, "response", None)):
+        headers = getattr(candidate, "headers", None)
+        if not headers:
+            continue
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        if not value:
+            continue
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+class ProviderGate:
+    """Shared by every agent calling the same provider.
+
+    Optionally caps the call rate with a token bucket. Rate limits and consecutive
+    transient failures pause *all* callers (circuit breaker), so a throttled provider is
+    backed off globally instead of every concurrent agent retrying on its own.
+    """
+
+    def __init__(self, rate: float = 0, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.limiter = AsyncRateLimiter(rate, burst=max(1, int(rate))) if rate > 0 else None
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.blocked_until = 0.0
+
+    async def before_call(self) -> None:
+        wait = self.blocked_until - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        if self.limiter:
+            await self.limiter.acquire()
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+
+    def record_failure(self, kind: ErrorKind, retry_after: Optional[float] = None) -> None:
+        if kind not in (ErrorKind.RATE_LIMIT, ErrorKind.TRANSIENT):
+            return
+        self.consecutive_failures += 1
+        pause = 0.0
+        if kind == ErrorKind.RATE_LIMIT:
+            pause = retry_after if retry_after is not None else 1.0
+        if self.consecutive_failures >= self.failure_threshold:
+            pause = max(pause, self.cooldown)
+        if pause:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+
+    @property
+    def is_open(self) -> bool:
+        return time.monotonic() < self.blocked_until
+
+
+class RetryPolicy:
+    """Retries by error kind with full-jitter exponential backoff, honouring Retry-After."""
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        invalid_output_delay: float = 0.0,
+        gate: Optional[ProviderGate] = None,
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.invalid_output_delay = invalid_output_delay
+        self.gate = gate
+        self.retries = {kind: 0 for kind in ErrorKind}
+
+    def should_retry(self, kind: ErrorKind, attempt: int) -> bool:
+        return kind != ErrorKind.FATAL and attempt < self.max_attempts
+
+    def delay(self, kind: ErrorKind, attempt: int, retry_after: Optional[float] = None) -> float:
+        if kind == ErrorKind.INVALID_OUTPUT:
+            # The provider is fine, the answer was not: ask again right away.
+            return self.invalid_output_delay
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            return min(self.max_delay, max(retry_after, backoff))
+        return backoff
+
+    async def run(self, call: Callable[[], Awaitable[Any]], log: logging.Logger = None) -> Any:
+        attempt = 0
+        while True:
+            attempt += 1
+            if self.gate:
+                await self.gate.before_call()
+            try:
+                result = await call()
+            except Exception as e:
+                kind = classify_error(e)
+                retry_after = retry_after_seconds(e)
+                if self.gate:
+                    self.gate.record_failure(kind, retry_after)
+                if not self.should_retry(kind, attempt):
+                    raise
+                delay = self.delay(kind, attempt, retry_after)
+                self.retries[kind] += 1
+                if log:
+                    log.warning(f"Agent attempt {attempt}/{self.max_attempts} failed ({kind.value}): {e}. Retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+            if self.gate:
+                self.gate.record_success()
+            return result
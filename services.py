@@ -1,8 +1,8 @@
 import logging
+import os
 import time
 import asyncio
-from typing import Dict, Any
-from backend.db.chats.crud import Chats
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional
 from shared_volume.send_alerts import send_alert
 import json
 
@@ -16,6 +16,11 @@ from backend.services.search.search_only_sources import retrieve_sources
 from backend.services.search.utils.trim_for_context_size import count_tokens, count_payload_tokens
 from backend.services.agent_router.main import orchestrator_agent
 from shared_volume.agents.eval_verification_agent import eval_verification_agent, eval_verification_score_agent, eval_neutrality_agent, eval_neutrality_score_agent, eval_security_agent, eval_security_score_agent, eval_usability_agent, eval_usability_score_agent, eval_relevance_agent, eval_relevance_score_agent
+from shared_volume.agents.eval_verification_agent import eval_relevance_fused_agent, eval_usability_fused_agent, eval_neutrality_fused_agent, eval_security_fused_agent, eval_verification_fused_agent, eval_all_fused_agent
+from shared_volume.agents.utils.rate_limit import AsyncRateLimiter
+from shared_volume.agents.utils.source_packing import dedupe_sources, pack_sources
+from shared_volume.agents.claim_verification import eval_verification_claims_agent
+from shared_volume.agents.evaluation_cache import build_evaluation_cache, evaluation_cache_key
 from shared_volume.agents.utils.utils import remove_think_tags
 from shared_volume.agents.utils.utils import call_llm
 from backend.apps.generation.utils import (
@@ -27,6 +32,7 @@ from backend.apps.generation.utils import (
 from backend.services.tracking_tasks import run_task_and_track,empty_stream
 from backend.apps.generation.schemas import GenerateChatCompletionForm, GetSourcesForm, GenerateTitleForm, GenerateEvaluationForm
 from backend.services.QueryQueue import query_queue
+from backend.apps.generation.evaluation_store import EvaluationWriteBehind
 from backend.utils.MetricManager import metric_manager
 from backend.config import SERVICE_NAME, LLM_CLIENT, LLM_NAME
 from backend.apps.generation.prompts import TITLE_GENERATION_SYSTEM_PROMPT, TITLE_GENERATION_USER_PROMPT
@@ -38,72 +44,371 @@ tracer = trace.get_tracer(SERVICE_NAME)
 
 # THEON
 
-async def generate_evaluation(form_data: GenerateEvaluationForm) -> Dict[str, Any]:
-    res = {
-        "relevance": "No relevance evaluation generated",
-        "relevance_score": 0,
-        "usability": "No usability evaluation generated",
-        "usability_score": 0,
-        "neutrality": "No neutrality evaluation generated",
-        "neutrality_score": 0,
-        "security": "No security evaluation generated",
-        "security_score": 0,
-        "verification": "No verification evaluation generated",
-        "verification_score": 0,
-        "total_score": 0,
-        "lowest_score": 0
+EVALUATION_CONCURRENCY = int(os.environ.get("EVALUATION_CONCURRENCY", "5"))
+EVALUATION_DIMENSION_TIMEOUT = float(os.environ.get("EVALUATION_DIMENSION_TIMEOUT", "90"))
+# "two_step": eval agent + score agent per dimension (10 calls)
+# "fused": one JSON call per dimension returning explanation + score (5 calls)
+# "fused_single": one JSON call judging all dimensions at once (1 call)
+EVALUATION_JUDGE_MODE = os.environ.get("EVALUATION_JUDGE_MODE", "two_step")
+# "single": one verification judge over answer + all sources
+# "claims": split the answer into claims and verify each against its top-k source passages
+VERIFICATION_MODE = os.environ.get("VERIFICATION_MODE", "single")
+VERIFICATION_SOURCE_TOKEN_BUDGET = int(os.environ.get("VERIFICATION_SOURCE_TOKEN_BUDGET", "12000"))
+EVALUATION_BATCH_CONCURRENCY = int(os.environ.get("EVALUATION_BATCH_CONCURRENCY", "8"))
+EVALUATION_BATCH_RATE_LIMIT = float(os.environ.get("EVALUATION_BATCH_RATE_LIMIT", "0"))
+
+EVALUATION_DIMENSIONS = ("relevance", "usability", "neutrality", "security", "verification")
+
+# "full" judges every dimension; "gate" judges the thresholded dimensions first (in
+# EVALUATION_GATE_ORDER, up to EVALUATION_CONCURRENCY at a time) and stops as soon as one
+# scores below its EVALUATION_GATE_THRESHOLDS entry, before the other dimensions start.
+EVALUATION_MODE = os.environ.get("EVALUATION_MODE", "full")
+EVALUATION_GATE_ORDER = tuple(d.strip() for d in os.environ.get("EVALUATION_GATE_ORDER", "security,neutrality,verification,relevance,usability").split(",") if d.strip())
+EVALUATION_GATE_THRESHOLDS = {
+    dimension.strip(): int(threshold)
+    for dimension, threshold in (
+        item.split(":") for item in os.environ.get("EVALUATION_GATE_THRESHOLDS", "security:50,neutrality:40,verification:25").split(",") if item.strip()
+    )
+}
+
+# "memory" (in-process LRU), "sqlite" (persistent, shared across workers) or "off"
+EVALUATION_CACHE = os.environ.get("EVALUATION_CACHE", "memory")
+EVALUATION_CACHE_PATH = os.environ.get("EVALUATION_CACHE_PATH", "evaluation_cache.sqlite3")
+EVALUATION_CACHE_TTL = float(os.environ.get("EVALUATION_CACHE_TTL", "0")) or None
+EVALUATION_CACHE_MAX_ENTRIES = int(os.environ.get("EVALUATION_CACHE_MAX_ENTRIES", "0"))
+
+evaluation_cache = build_evaluation_cache(EVALUATION_CACHE, EVALUATION_CACHE_PATH, EVALUATION_CACHE_MAX_ENTRIES, EVALUATION_CACHE_TTL)
+
+# Evaluations are written to the chat behind the response; updates to the same chat
+# within this window are coalesced into one chat write.
+EVALUATION_PERSIST_DELAY = float(os.environ.get("EVALUATION_PERSIST_DELAY", "0.5"))
+
+evaluation_writer = EvaluationWriteBehind(EVALUATION_PERSIST_DELAY)
+
+
+def default_evaluation() -> Dict[str, Any]:
+    res: Dict[str, Any] = {}
+    for dimension in EVALUATION_DIMENSIONS:
+        res[dimension] = f"No {dimension} evaluation generated"
+        res[f"{dimension}_score"] = 0
+    res.update({"total_score": 0, "lowest_score": 0})
+    return res
+
+
+def has_question_answer(form_data: GenerateEvaluationForm) -> bool:
+    return bool((form_data.question or "").strip() and (form_data.answer or "").strip())
+
+
+def evaluation_sources(form_data: GenerateEvaluationForm) -> Dict[str, Any]:
+    return {"sources_db": form_data.sources_db or [], "sources_web": form_data.sources_web or [], "sources_verdic": form_data.sources_verdic or []}
+
+
+async def rate_limited(limiter: Optional[AsyncRateLimiter], call: Callable[[], Awaitable]):
+    if limiter:
+        await limiter.acquire()
+    return await call()
+
+
+async def two_step_judge(eval_call, score_agent, limiter: Optional[AsyncRateLimiter] = None) -> Optional[tuple]:
+    text = await rate_limited(limiter, eval_call)
+    if not text:
+        return None
+    score = await rate_limited(limiter, lambda: score_agent(text)) or 0
+    return text, score
+
+
+def dimension_judges(q: str, a: str, sources: Dict[str, Any], limiter: Optional[AsyncRateLimiter] = None) -> Dict[str, Callable[[], Awaitable]]:
+    """Map each dimension to a call returning (text, score) for the configured judge mode.
+
+    When a limiter is given every LLM call waits for it first.
+    """
+    judges = two_step_or_fused_judges(q, a, sources, limiter)
+    if VERIFICATION_MODE == "claims":
+        # One judge call per claim: the claims agent takes a limiter token for each of them.
+        judges["verification"] = lambda: eval_verification_claims_agent(a, q, sources, limiter)
+    return judges
+
+
+def two_step_or_fused_judges(q: str, a: str, sources: Dict[str, Any], limiter: Optional[AsyncRateLimiter] = None) -> Dict[str, Callable[[], Awaitable]]:
+    if EVALUATION_JUDGE_MODE == "fused":
+        return {
+            "relevance": lambda: rate_limited(limiter, lambda: eval_relevance_fused_agent(a, q)),
+            "usability": lambda: rate_limited(limiter, lambda: eval_usability_fused_agent(a, q)),
+            "neutrality": lambda: rate_limited(limiter, lambda: eval_neutrality_fused_agent(a, q)),
+            "security": lambda: rate_limited(limiter, lambda: eval_security_fused_agent(a, q)),
+            "verification": lambda: rate_limited(limiter, lambda: eval_verification_fused_agent(a, q, sources)),
+        }
+    return {
+        "relevance": lambda: two_step_judge(lambda: eval_relevance_agent(a, q), eval_relevance_score_agent, limiter),
+        "usability": lambda: two_step_judge(lambda: eval_usability_agent(a, q), eval_usability_score_agent, limiter),
+        "neutrality": lambda: two_step_judge(lambda: eval_neutrality_agent(a, q), eval_neutrality_score_agent, limiter),
+        "security": lambda: two_step_judge(lambda: eval_security_agent(a, q), eval_security_score_agent, limiter),
+        "verification": lambda: two_step_judge(lambda: eval_verification_agent(a, q, sources, log), eval_verification_score_agent, limiter),
     }
-    
+
+
+async def run_dimension(dimension: str, judge: Callable[[], Awaitable], semaphore: asyncio.Semaphore, timeout: float):
+    """Run one dimension judge. Returns (text, score) or None on failure/timeout.
+
+    The timeout covers the judge call only, not the time spent waiting for a semaphore slot.
+    """
+    try:
+        async with semaphore:
+            outcome = await asyncio.wait_for(judge(), timeout=timeout)
+    except asyncio.TimeoutError:
+        log.error(f"Evaluation of {dimension} timed out after {timeout}s")
+        return None
+    except Exception as e:
+        log.error(f"Error evaluating {dimension}: {str(e)}")
+        return None
+
+    if outcome is None:
+        log.error(f"No valid {dimension} evaluation returned")
+        return None
+    log.info(f"{dimension.capitalize()}: {outcome[1]}")
+    return outcome
+
+
+async def iter_dimension_outcomes(q: str, a: str, sources: Dict[str, Any], limiter: Optional[AsyncRateLimiter] = None) -> AsyncIterator[tuple]:
+    """Yield (dimension, outcome) as each dimension finishes. Failed dimensions yield None."""
+    if EVALUATION_JUDGE_MODE == "fused_single":
+        try:
+            outcomes = await asyncio.wait_for(rate_limited(limiter, lambda: eval_all_fused_agent(a, q, sources)), timeout=EVALUATION_DIMENSION_TIMEOUT)
+        except Exception as e:
+            log.error(f"Error in single-call evaluation: {str(e)}")
+            outcomes = {dimension: None for dimension in EVALUATION_DIMENSIONS}
+        for dimension, outcome in outcomes.items():
+            yield dimension, outcome
+        return
+
+    # The five dimensions are independent: run them side by side, capped by
+    # EVALUATION_CONCURRENCY (1 = the old sequential behaviour). A failing or
+    # timed out dimension keeps its default and does not cancel the others.
+    semaphore = asyncio.Semaphore(max(1, EVALUATION_CONCURRENCY))
+
+    async def named(dimension, judge):
+        return dimension, await run_dimension(dimension, judge, semaphore, EVALUATION_DIMENSION_TIMEOUT)
+
+    tasks = [asyncio.ensure_future(named(dimension, judge)) for dimension, judge in dimension_judges(q, a, sources, limiter).items()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Consumer stopped early (e.g. a closed stream): don't leave judges running.
+        for task in tasks:
+            task.cancel()
+
+
+async def judge_dimensions(q: str, a: str, sources: Dict[str, Any], limiter: Optional[AsyncRateLimiter] = None) -> Dict[str, Optional[tuple]]:
+    """Judge all dimensions for the configured mode. Failed dimensions map to None."""
+    return {dimension: outcome async for dimension, outcome in iter_dimension_outcomes(q, a, sources, limiter)}
+
+
+def aggregate_scores(res: Dict[str, Any], dimensions: Iterable[str] = EVALUATION_DIMENSIONS) -> Dict[str, Any]:
+    scores = [res[f"{dimension}_score"] for dimension in dimensions] or [0]
+    res["total_score"] = round(sum(scores) / len(scores))
+    log.info(f"Total score: {res['total_score']}")
+    res["lowest_score"] = min(scores)
+    log.info(f"Lowest score: {res['lowest_score']}")
+    return res
+
+
+def gate_failed(dimension: str, outcome: Optional[tuple]) -> bool:
+    threshold = EVALUATION_GATE_THRESHOLDS.get(dimension)
+    return threshold is not None and (outcome is None or outcome[1] < threshold)
+
+
+async def iter_gated_outcomes(q: str, a: str, sources: Dict[str, Any], limiter: Optional[AsyncRateLimiter] = None) -> AsyncIterator[tuple]:
+    """Yield (dimension, outcome) as each dimension finishes, stopping at the first gate failure.
+
+    Thresholded dimensions run first, in EVALUATION_GATE_ORDER and in waves of at most
+    EVALUATION_CONCURRENCY; the other dimensions only start once every gate passed. A
+    failure cancels the rest of its wave and skips all later ones.
+    """
+    judges = dimension_judges(q, a, sources, limiter)
+    order = [d for d in EVALUATION_GATE_ORDER if d in judges] + [d for d in judges if d not in EVALUATION_GATE_ORDER]
+    gating = [d for d in order if d in EVALUATION_GATE_THRESHOLDS]
+    wave_size = max(1, EVALUATION_CONCURRENCY)
+    waves = [gating[i : i + wave_size] for i in range(0, len(gating), wave_size)] + [[d for d in order if d not in gating]]
+    semaphore = asyncio.Semaphore(wave_size)
+
+    async def named(dimension):
+        return dimension, await run_dimension(dimension, judges[dimension], semaphore, EVALUATION_DIMENSION_TIMEOUT)
+
+    for wave in waves:
+        tasks = [asyncio.ensure_future(named(dimension)) for dimension in wave]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                dimension, outcome = await next_done
+                yield dimension, outcome
+                if gate_failed(dimension, outcome):
+                    log.info(f"Quality gate failed on {dimension}, skipping remaining dimensions")
+                    return
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def gate_verdict(res: Dict[str, Any], evaluated: Iterable[str]) -> Dict[str, Any]:
+    evaluated = list(evaluated)
+    failed = [d for d in evaluated if d in EVALUATION_GATE_THRESHOLDS and res[f"{d}_score"] < EVALUATION_GATE_THRESHOLDS[d]]
+    skipped = [d for d in EVALUATION_DIMENSIONS if d not in evaluated]
+    for dimension in skipped:
+        res[dimension] = f"Skipped: quality gate already failed on {failed[0]}" if failed else f"No {dimension} evaluation generated"
+    return {"passed": not failed, "failed_dimensions": failed, "skipped_dimensions": skipped, "thresholds": dict(EVALUATION_GATE_THRESHOLDS)}
+
+
+def dimension_event(res: Dict[str, Any], dimension: str, failed: bool = False) -> Dict[str, Any]:
+    return {"event": "dimension", "dimension": dimension, "explanation": res[dimension], "score": res[f"{dimension}_score"], "failed": failed}
+
+
+async def evaluate_answer_stream(form_data: GenerateEvaluationForm, limiter: Optional[AsyncRateLimiter] = None, gate: Optional[bool] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Judge one question/answer pair without persisting the result.
+
+    Yields a "dimension" event as each dimension is scored, then one "evaluation" event
+    with the full result including total_score and lowest_score. In gate mode (default:
+    EVALUATION_MODE) the result also carries a "gate" verdict listing failed and skipped
+    dimensions, and the aggregate scores cover the judged dimensions only.
+    """
+    gate = EVALUATION_MODE == "gate" if gate is None else gate
+    res = default_evaluation()
+
+    if not has_question_answer(form_data):
+        yield {"event": "evaluation", "evaluation": res}
+        return
+
+    q, a = form_data.question, form_data.answer
+
+    if VERIFICATION_MODE == "claims" and EVALUATION_JUDGE_MODE != "fused_single":
+        # The claim judges retrieve their own passages: index every source, only deduplicated.
+        sources, packing = dedupe_sources(evaluation_sources(form_data))
+    else:
+        # Dedupe and fit the sources into the verification judge's token budget.
+        sources, packing = pack_sources(evaluation_sources(form_data), a, VERIFICATION_SOURCE_TOKEN_BUDGET, count_tokens)
+    if packing.trimmed or packing.dropped:
+        log.info(f"Verification sources: kept {len(packing.kept)}, trimmed {len(packing.trimmed)}, dropped {len(packing.dropped)} ({packing.tokens_used}/{packing.token_budget} tokens)")
+    res["verification_sources"] = packing.as_dict()
+
+    cache_key = evaluation_cache_key(q, a, sources, f"{EVALUATION_JUDGE_MODE}:{VERIFICATION_MODE}") if evaluation_cache else None
+    cached = await evaluation_cache.get(cache_key) if cache_key else None
+
+    if cached:
+        log.info("Evaluation cache hit")
+        res.update(cached)
+        for dimension in EVALUATION_DIMENSIONS:
+            yield dimension_event(res, dimension)
+        if gate:
+            res["gate"] = gate_verdict(res, EVALUATION_DIMENSIONS)
+        yield {"event": "evaluation", "evaluation": res}
+        return
+
+    outcomes = {}
+    iter_outcomes = iter_gated_outcomes if gate and EVALUATION_JUDGE_MODE != "fused_single" else iter_dimension_outcomes
+    async for dimension, outcome in iter_outcomes(q, a, sources, limiter):
+        outcomes[dimension] = outcome
+        if outcome is not None:
+            res[dimension], res[f"{dimension}_score"] = outcome
+        yield dimension_event(res, dimension, failed=outcome is None)
+
+    aggregate_scores(res, [d for d in EVALUATION_DIMENSIONS if d in outcomes])
+
+    # Only cache complete evaluations, a failed or skipped dimension should be judged next time.
+    complete = len(outcomes) == len(EVALUATION_DIMENSIONS) and all(outcome is not None for outcome in outcomes.values())
+    if cache_key and complete:
+        await evaluation_cache.set(cache_key, res)
+    if gate:
+        res["gate"] = gate_verdict(res, outcomes)
+    yield {"event": "evaluation", "evaluation": res}
+
+
+async def evaluate_answer(form_data: GenerateEvaluationForm, limiter: Optional[AsyncRateLimiter] = None, gate: Optional[bool] = None) -> Dict[str, Any]:
+    """Judge one question/answer pair without persisting the result."""
+    async for event in evaluate_answer_stream(form_data, limiter, gate):
+        if event["event"] == "evaluation":
+            return event["evaluation"]
+    return default_evaluation()
+
+
+async def generate_evaluation(form_data: GenerateEvaluationForm, gate: Optional[bool] = None) -> Dict[str, Any]:
+    res = default_evaluation()
+
     try:
-        q = form_data.question or ""
-        a = form_data.answer or ""
-        
-        if not q.strip() or not a.strip():
-            return res
-
-        relevance = await eval_relevance_agent(a, q)
-        r_score = await eval_relevance_score_agent(relevance) or 0
-        log.info(f"Relevance: {r_score}")
-
-        neutrality = await eval_neutrality_agent(a, q)
-        n_score = await eval_neutrality_score_agent(neutrality) or 0
-        log.info(f"Neutrality: {n_score}")
-
-        security = await eval_security_agent(a, q)
-        s_score = await eval_security_score_agent(security) or 0
-        log.info(f"Security: {s_score}")
-
-        usability = await eval_usability_agent(a, q)
-        u_score = await eval_usability_score_agent(usability) or 0
-        log.info(f"Usability: {u_score}")
-
-        sources = {"sources_db": form_data.sources_db, "sources_web": form_data.sources_web, "sources_verdic": form_data.sources_verdic}
-
-        verification = await eval_verification_agent(a, q, sources, log)
-        v_score = await eval_verification_score_agent(verification) or 0
-        log.info(f"Verification: {v_score}")
-
-        total_score = round((n_score + s_score + u_score + r_score + v_score) / 5)
-        log.info(f"Total score: {total_score}")
-        lowest_score = min(n_score, s_score, u_score, r_score, v_score)
-        log.info(f"Lowest score: {lowest_score}")
-
-        res.update({
-            "relevance": relevance, "neutrality": neutrality, "security": security, "usability": usability, "verification": verification,
-            "neutrality_score": n_score, "security_score": s_score, "usability_score": u_score, "relevance_score": r_score, "verification_score": v_score,
-            "total_score": total_score, "lowest_score": lowest_score
-        })
-
-        chat_model = Chats.get_chat_by_id(form_data.chat_id)
-        if chat_model:
-            full_chat_data = json.loads(chat_model.chat)
-            if "history" in full_chat_data and "messages" in full_chat_data["history"]:
-                msg_dict = full_chat_data["history"]["messages"]
-                if form_data.message_id in msg_dict:
-                    msg_dict[form_data.message_id]["evaluation"] = res
-                    Chats.update_chat_by_id(form_data.chat_id, full_chat_data)
+        res = await evaluate_answer(form_data, gate=gate)
+        if has_question_answer(form_data):
+            await evaluation_writer.write(form_data.chat_id, form_data.message_id, res)
 
     except Exception as e:
         log.error(f"Error in generate_evaluation: {str(e)}")
     
-    return res
\ No newline at end of file
+    return res
+
+
+async def generate_evaluation_stream(form_data: GenerateEvaluationForm, gate: Optional[bool] = None) -> StreamingResponse:
+    """NDJSON variant of generate_evaluation: one line per scored dimension, then the full result."""
+    async def stream():
+        try:
+            async for event in evaluate_answer_stream(form_data, gate=gate):
+                if event["event"] == "evaluation" and has_question_answer(form_data):
+                    await evaluation_writer.write(form_data.chat_id, form_data.message_id, event["evaluation"])
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except Exception as e:
+            log.error(f"Error in generate_evaluation_stream: {str(e)}")
+            yield json.dumps({"event": "error", "detail": str(e)}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+async def generate_evaluations_batch(
+    items: Iterable[GenerateEvaluationForm],
+    concurrency: int = EVALUATION_BATCH_CONCURRENCY,
+    rate_limit: float = EVALUATION_BATCH_RATE_LIMIT,
+    persist: bool = True,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Evaluate many messages, yielding one result per item as soon as it completes.
+
+    A fixed pool of `concurrency` workers pulls items lazily, so thousands of items never
+    become thousands of pending tasks. Every judge call across the whole batch shares one
+    limiter of `rate_limit` calls per second (0 = unlimited). A failing item yields an
+    "error" entry instead of stopping the batch; if `items` itself raises, an "error" entry
+    with index None is yielded and the batch ends after the items already taken.
+    """
+    limiter = AsyncRateLimiter(rate_limit, burst=max(1, concurrency)) if rate_limit > 0 else None
+    pending = iter(enumerate(items))
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def worker():
+        # Always signal completion, even if the items iterator itself raises, or the
+        # consumer below would wait for this worker forever.
+        try:
+            for index, form_data in pending:
+                item = {"index": index}
+                try:
+                    item.update(chat_id=form_data.chat_id, message_id=form_data.message_id)
+                    item["evaluation"] = await evaluate_answer(form_data, limiter)
+                    if persist and has_question_answer(form_data):
+                        evaluation_writer.submit(form_data.chat_id, form_data.message_id, item["evaluation"])
+                except Exception as e:
+                    log.error(f"Error in batch evaluation of item {index}: {str(e)}")
+                    item["error"] = str(e)
+                await results.put(item)
+        except Exception as e:
+            log.error(f"Error reading batch evaluation items: {str(e)}")
+            await results.put({"index": None, "error": str(e)})
+        finally:
+            results.put_nowait(None)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    try:
+        finished = 0
+        while finished < len(workers):
+            item = await results.get()
+            if item is None:
+                finished += 1
+                continue
+            yield item
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        if persist:
+            await evaluation_writer.flush_all()
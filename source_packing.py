@@ -0,0 +1,137 @@
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+WORD_RE = re.compile(r"\w{4,}", re.UNICODE)
+MIN_TRIMMED_TOKENS = 200
+
+
+@dataclass
+class PackingReport:
+    token_budget: int
+    tokens_used: int = 0
+    kept: List[str] = field(default_factory=list)
+    trimmed: List[str] = field(default_factory=list)
+    dropped: List[Dict[str, str]] = field(default_factory=list)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "token_budget": self.token_budget,
+            "tokens_used": self.tokens_used,
+            "kept": self.kept,
+            "trimmed": self.trimmed,
+            "dropped": self.dropped,
+        }
+
+
+def approx_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def terms(text: str) -> set:
+    return set(WORD_RE.findall((text or "").lower()))
+
+
+def render_source(source: Dict[str, Any]) -> str:
+    """Same layout eval_verification_agent uses in its prompt."""
+    return f"<source>{source.get('path')}</source>Title: {source.get('title')}\nContent: {source.get('content')}\n"
+
+
+def overlap_score(answer_terms: set, source: Dict[str, Any]) -> float:
+    if not answer_terms:
+        return 0.0
+    source_terms = terms(f"{source.get('title') or ''} {source.get('content') or ''}")
+    return len(answer_terms & source_terms) / len(answer_terms)
+
+
+def trim_source(source: Dict[str, Any], token_budget: int, count_tokens: Callable[[str], int]) -> Optional[Dict[str, Any]]:
+    """Cut the content so the rendered source fits token_budget, or None if too little would remain."""
+    content = source.get("content") or ""
+    overhead = count_tokens(render_source({**source, "content": ""}))
+    if token_budget - overhead < MIN_TRIMMED_TOKENS:
+        return None
+    full_tokens = max(1, count_tokens(content))
+    keep_chars = int(len(content) * (token_budget - overhead) / full_tokens)
+    while keep_chars > 0:
+        trimmed = {**source, "content": content[:keep_chars].rstrip() + " …"}
+        if count_tokens(render_source(trimmed)) <= token_budget:
+            return trimmed
+        keep_chars = int(keep_chars * 0.9)
+    return None
+
+
+def unique_sources(sources: Dict[str, List[Dict[str, Any]]], report: PackingReport) -> List[tuple]:
+    """(source_type, position, source) for every source whose path and content were not seen before."""
+    unique = []
+    seen_paths, seen_content = set(), set()
+    for source_type, source_list in sources.items():
+        for position, source in enumerate(source_list or []):
+            path = str(source.get("path") or "").strip()
+            content_hash = hashlib.sha256((source.get("content") or "").strip().encode("utf-8")).hexdigest()
+            if path and path in seen_paths:
+                report.dropped.append({"path": path, "reason": "duplicate_path"})
+                continue
+            if content_hash in seen_content:
+                report.dropped.append({"path": path, "reason": "duplicate_content"})
+                continue
+            seen_paths.add(path)
+            seen_content.add(content_hash)
+            unique.append((source_type, position, source))
+    return unique
+
+
+def dedupe_sources(sources: Dict[str, List[Dict[str, Any]]]) -> tuple:
+    """Drop duplicate sources without a token budget, for judges that select passages themselves.
+
+    Returns (sources in the original {source_type: [...]} layout and order, PackingReport).
+    """
+    report = PackingReport(token_budget=0)
+    deduped: Dict[str, List[Dict[str, Any]]] = {source_type: [] for source_type in sources}
+    for source_type, _, source in unique_sources(sources, report):
+        deduped[source_type].append(source)
+        report.kept.append(str(source.get("path") or ""))
+    return deduped, report
+
+
+def pack_sources(
+    sources: Dict[str, List[Dict[str, Any]]],
+    answer: str,
+    token_budget: int,
+    count_tokens: Callable[[str], int] = approx_tokens,
+) -> tuple:
+    """Dedupe and fit sources into token_budget, preferring sources that overlap most with the answer.
+
+    Returns (packed sources in the original {source_type: [...]} layout and order, PackingReport).
+    """
+    report = PackingReport(token_budget=token_budget)
+    answer_terms = terms(answer)
+
+    candidates = [
+        (source_type, position, source, overlap_score(answer_terms, source))
+        for source_type, position, source in unique_sources(sources, report)
+    ]
+
+    selected = []
+    remaining = token_budget
+    for source_type, position, source, _ in sorted(candidates, key=lambda c: -c[3]):
+        path = str(source.get("path") or "")
+        tokens = count_tokens(render_source(source))
+        if tokens <= remaining:
+            selected.append((source_type, position, source))
+            report.kept.append(path)
+            remaining -= tokens
+            continue
+        trimmed = trim_source(source, remaining, count_tokens)
+        if trimmed is None:
+            report.dropped.append({"path": path, "reason": "token_budget"})
+            continue
+        selected.append((source_type, position, trimmed))
+        report.trimmed.append(path)
+        remaining -= count_tokens(render_source(trimmed))
+
+    packed: Dict[str, List[Dict[str, Any]]] = {source_type: [] for source_type in sources}
+    for source_type, _, source in sorted(selected, key=lambda s: (list(sources).index(s[0]), s[1])):
+        packed[source_type].append(source)
+    report.tokens_used = token_budget - remaining
+    return packed, report
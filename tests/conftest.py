@@ -0,0 +1,150 @@
+"""Stand-ins for the Theon platform, so the evaluation modules can be tested from this repo.
+
+The top-level modules are deployed inside the platform (shared_volume.agents.* and
+backend.apps.generation.*). Here they are loaded under those names, next to minimal
+replacements for the platform modules they import; tests patch the LLM call itself.
+"""
+import contextlib
+import importlib.util
+import os
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+REPO = Path(__file__).resolve().parent.parent
+
+os.environ.update(LLM_CACHE="off", EVALUATION_CACHE="off", AGENT_RETRY_BASE_DELAY="0")
+
+
+def stand_in(name: str, **attrs) -> types.ModuleType:
+    module = sys.modules.get(name) or types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    parts = name.split(".")
+    for i in range(1, len(parts)):
+        sys.modules.setdefault(".".join(parts[:i]), types.ModuleType(".".join(parts[:i])))
+    return module
+
+
+def load(name: str, filename: str) -> types.ModuleType:
+    spec = importlib.util.spec_from_file_location(name, REPO / filename)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def trim_response_keep_delimiters(response: str, start: str, end: str) -> str:
+    first, last = response.find(start), response.rfind(end)
+    return response[first : last + 1] if first != -1 and last > first else ""
+
+
+async def call_llm(system_prompt: str, user_prompt: str) -> str:
+    raise AssertionError("tests must patch call_llm")
+
+
+class Form:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class Tracer:
+    def start_as_current_span(self, *args, **kwargs):
+        return contextlib.nullcontext()
+
+
+async def retrieve_sources(*args, **kwargs):
+    return {}
+
+
+stand_in("shared_volume.config", SERVICE_NAME="theon-test")
+stand_in("shared_volume.agents.config", MAX_AGENT_RETRIES=3)
+stand_in("shared_volume.agents.constants", ERROR_JSON_FORMAT="Invalid JSON format", ERROR_NO_RESPONSE="No response")
+stand_in(
+    "shared_volume.agents.utils.utils",
+    call_llm=call_llm,
+    trim_response_keep_delimiters=trim_response_keep_delimiters,
+    remove_think_tags=lambda response: response,
+)
+stand_in("shared_volume.send_alerts", send_alert=lambda *args, **kwargs: None)
+stand_in("shared_volume.error_mapper", map_llm_error=lambda error: error)
+stand_in("fastapi", HTTPException=Exception)
+stand_in("starlette.responses", StreamingResponse=Form)
+stand_in("opentelemetry", trace=Form(get_tracer=lambda *args: Tracer()))
+stand_in("backend.config", SERVICE_NAME="theon-test", LLM_CLIENT=None, LLM_NAME="test-model")
+stand_in("backend.db.chats.crud", Chats=None)
+stand_in("backend.db.users.models", UserModel=object)
+stand_in("backend.services.search.search_only_sources", retrieve_sources=retrieve_sources)
+stand_in(
+    "backend.services.search.utils.trim_for_context_size",
+    count_tokens=lambda text: len(str(text)) // 4 + 1,
+    count_payload_tokens=lambda *args: 0,
+)
+stand_in("backend.services.agent_router.main", orchestrator_agent=None)
+stand_in(
+    "backend.apps.generation.utils",
+    select_system_prompt=None,
+    validate_payload=None,
+    validate_user_request_limits=None,
+    manage_title_length=None,
+)
+stand_in("backend.services.tracking_tasks", run_task_and_track=None, empty_stream=None)
+stand_in(
+    "backend.apps.generation.schemas",
+    GenerateChatCompletionForm=Form,
+    GetSourcesForm=Form,
+    GenerateTitleForm=Form,
+    GenerateEvaluationForm=Form,
+)
+stand_in("backend.services.QueryQueue", query_queue=None)
+stand_in("backend.utils.MetricManager", metric_manager=None)
+stand_in("backend.apps.generation.prompts", TITLE_GENERATION_SYSTEM_PROMPT="", TITLE_GENERATION_USER_PROMPT="")
+
+for module_name, filename in (
+    ("shared_volume.agents.utils.rate_limit", "rate_limit.py"),
+    ("shared_volume.agents.utils.cache_backends", "cache_backends.py"),
+    ("shared_volume.agents.utils.llm_cache", "llm_cache.py"),
+    ("shared_volume.agents.utils.retry_policy", "retry_policy.py"),
+    ("shared_volume.agents.utils.output_repair", "output_repair.py"),
+    ("shared_volume.agents.utils.source_packing", "source_packing.py"),
+    ("shared_volume.agents.utils.agent_template", "agent_template.py"),
+    ("shared_volume.agents.eval_verification_agent", "eval_verification_agent.py"),
+    ("shared_volume.agents.claim_verification", "claim_verification.py"),
+    ("shared_volume.agents.evaluation_cache", "evaluation_cache.py"),
+    ("backend.apps.generation.evaluation_store", "evaluation_store.py"),
+    ("backend.apps.generation.services", "services.py"),
+):
+    load(module_name, filename)
+
+
+@pytest.fixture
+def agent_template():
+    return sys.modules["shared_volume.agents.utils.agent_template"]
+
+
+@pytest.fixture
+def claim_verification():
+    return sys.modules["shared_volume.agents.claim_verification"]
+
+
+@pytest.fixture
+def services():
+    return sys.modules["backend.apps.generation.services"]
+
+
+@pytest.fixture
+def evaluation_form():
+    return lambda **fields: Form(
+        **{
+            "question": "Hoe vraag ik huurtoeslag aan?",
+            "answer": "Via de Belastingdienst.",
+            "chat_id": "chat",
+            "message_id": "message",
+            "sources_db": [],
+            "sources_web": [],
+            "sources_verdic": [],
+            **fields,
+        }
+    )
@@ -0,0 +1,55 @@
+import asyncio
+
+from conftest import Form
+
+SOURCES = {
+    "sources_db": [
+        {
+            "path": "[1]",
+            "title": "Huurtoeslag",
+            "content": "Huurtoeslag vraagt u aan bij de Belastingdienst via Mijn toeslagen.",
+        }
+    ]
+}
+CLAIM = "Huurtoeslag vraagt u aan bij de Belastingdienst."
+
+
+def judge_replies(monkeypatch, agent_template, replies):
+    calls = []
+
+    async def call_llm(system_prompt, user_prompt):
+        calls.append(user_prompt)
+        return replies[min(len(calls), len(replies)) - 1]
+
+    monkeypatch.setattr(agent_template, "call_llm", call_llm)
+    return calls
+
+
+def test_bracketed_citation_in_source_is_not_the_payload(monkeypatch, agent_template, claim_verification):
+    judge_replies(monkeypatch, agent_template, ['{"verdict": "ja", "source": "[1]", "explanation": "Staat in de bron."}'])
+
+    passages = claim_verification.split_passages(SOURCES)
+    result = asyncio.run(claim_verification.eval_claim_agent("Hoe vraag ik huurtoeslag aan?", CLAIM, passages))
+
+    assert result == {"claim": CLAIM, "weight": 1.0, "source": "[1]", "explanation": "Staat in de bron."}
+
+
+def test_malformed_judgement_is_asked_again(monkeypatch, agent_template, claim_verification):
+    calls = judge_replies(monkeypatch, agent_template, ["[1]", '{"verdict": "deels", "source": "[1]", "explanation": "Vaag."}'])
+
+    passages = claim_verification.split_passages(SOURCES)
+    result = asyncio.run(claim_verification.eval_claim_agent("Hoe vraag ik huurtoeslag aan?", CLAIM, passages))
+
+    assert len(calls) == 2
+    assert result["weight"] == 0.5
+
+
+def test_limiter_token_per_judge_call(monkeypatch, agent_template, claim_verification):
+    calls = judge_replies(monkeypatch, agent_template, ['{"verdict": "ja", "source": "[1]", "explanation": "Ok."}'])
+    acquired = []
+    limiter = Form(acquire=lambda: asyncio.sleep(0, acquired.append(1)))
+    answer = f"{CLAIM} Kinderen onder de achttien jaar krijgen nooit zomaar een ruimtereis."
+
+    asyncio.run(claim_verification.eval_verification_claims_agent(answer, "Hoe vraag ik huurtoeslag aan?", SOURCES, limiter))
+
+    assert len(acquired) == len(calls) == 1
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+PASSING = {"relevance": 90, "usability": 90, "neutrality": 90, "security": 90, "verification": 90}
+
+
+@pytest.fixture
+def judge_calls(monkeypatch, services):
+    """Replace the dimension judges with instant ones scoring `scores`; returns the judges started."""
+    calls = []
+
+    def use_scores(scores):
+        def judge(dimension):
+            async def call():
+                calls.append(dimension)
+                await asyncio.sleep(0.01)
+                return f"{dimension} toelichting", scores[dimension]
+
+            return call
+
+        monkeypatch.setattr(services, "dimension_judges", lambda q, a, sources, limiter=None: {d: judge(d) for d in scores})
+        return calls
+
+    return use_scores
+
+
+def evaluate_gated(services, form):
+    return asyncio.run(services.evaluate_answer(form, gate=True))
+
+
+def test_gate_failure_skips_later_judges(monkeypatch, services, judge_calls, evaluation_form):
+    monkeypatch.setattr(services, "EVALUATION_CONCURRENCY", 1)
+    calls = judge_calls({**PASSING, "security": 10})
+
+    res = evaluate_gated(services, evaluation_form())
+
+    assert calls == ["security"]
+    assert res["gate"]["failed_dimensions"] == ["security"]
+    assert sorted(res["gate"]["skipped_dimensions"]) == ["neutrality", "relevance", "usability", "verification"]
+
+
+def test_gate_failure_never_starts_non_gating_judges(monkeypatch, services, judge_calls, evaluation_form):
+    monkeypatch.setattr(services, "EVALUATION_CONCURRENCY", 5)
+    calls = judge_calls({**PASSING, "neutrality": 10})
+
+    res = evaluate_gated(services, evaluation_form())
+
+    assert sorted(calls) == ["neutrality", "security", "verification"]
+    assert not res["gate"]["passed"]
+
+
+def test_passing_gate_judges_every_dimension(monkeypatch, services, judge_calls, evaluation_form):
+    monkeypatch.setattr(services, "EVALUATION_CONCURRENCY", 2)
+    calls = judge_calls(PASSING)
+
+    res = evaluate_gated(services, evaluation_form())
+
+    assert calls[:3] == ["security", "neutrality", "verification"]
+    assert sorted(calls[3:]) == ["relevance", "usability"]
+    assert res["gate"] == {"passed": True, "failed_dimensions": [], "skipped_dimensions": [], "thresholds": services.EVALUATION_GATE_THRESHOLDS}
+    assert res["total_score"] == 90